@@ -2,8 +2,8 @@ import logging
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import Comment, STATUS_PENDING, STATUS_APPROVED
-# Import the trigger task carefully to avoid circular imports if tasks import models
-# from apps.webhooks.tasks import trigger_webhooks_for_event
+# Import the outbox helper carefully to avoid circular imports
+# from apps.webhooks.outbox import enqueue_webhook_event
 
 logger = logging.getLogger(__name__)
 
@@ -13,8 +13,8 @@ def comment_post_save_handler(sender, instance, created, **kwargs):
     Handle actions after a comment is saved.
     Trigger webhooks for 'comment_submitted' or 'comment_approved'.
     """
-    # Import task here to avoid potential circular dependency at module level
-    from apps.webhooks.tasks import trigger_webhooks_for_event
+    # Import here to avoid potential circular dependency at module level
+    from apps.webhooks.outbox import enqueue_webhook_event
 
     event_name = None
     if created and instance.status == STATUS_PENDING:
@@ -44,6 +44,6 @@ def comment_post_save_handler(sender, instance, created, **kwargs):
             'body_excerpt': instance.body[:100] + ('...' if len(instance.body) > 100 else ''),
             'submission_timestamp': instance.submission_timestamp.isoformat(),
         }
-        trigger_webhooks_for_event.delay(event_name, payload)
+        enqueue_webhook_event(event_name, payload)
 
 # Note: Need to connect signals in apps.comments.apps.CommentsConfig ready() method
\ No newline at end of file
@@ -6,6 +6,7 @@ from .models import (
 )
 # Import component models for inline
 from apps.components.models import PageComponent
+from .tasks import rebuild_published_documents_on_commit
 
 # Inline admin for Field Definitions within Content Type
 class FieldDefinitionInline(admin.TabularInline):
@@ -142,6 +143,11 @@ class ContentInstanceAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
         # TODO: Trigger ContentVersion creation here or via signals
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Terms/components are saved here, so rebuild delivery documents afterwards
+        rebuild_published_documents_on_commit(form.instance.pk)
+
     def get_queryset(self, request):
         # Prefetch related data for efficiency
         return super().get_queryset(request).select_related('content_type', 'author')
@@ -202,8 +208,9 @@ class ContentVersionAdmin(admin.ModelAdmin):
     """Admin configuration for ContentVersion (read-only)."""
     list_display = ('content_instance', 'created_at', 'created_by_email', 'status_snapshot', 'version_message')
     list_filter = ('content_instance__content_type', 'created_by', 'created_at')
-    search_fields = ('content_instance__id', 'created_by__email', 'version_message', 'data_snapshot')
-    readonly_fields = [f.name for f in ContentVersion._meta.fields] # Make all fields read-only
+    search_fields = ('content_instance__id', 'created_by__email', 'version_message')
+    # Make all fields read-only; the stored (compressed) data is shown reconstructed
+    readonly_fields = [f.name for f in ContentVersion._meta.fields if f.name != 'data'] + ['data_snapshot']
     list_select_related = ('content_instance', 'created_by')
 
     def created_by_email(self, obj):
@@ -1,13 +1,17 @@
 from rest_framework import serializers
 from django.utils.translation import get_language, gettext_lazy as _
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.conf import settings
 
 from .models import (
     ContentType, FieldDefinition, Taxonomy, Term,
-    ContentInstance, ContentFieldInstance, ContentVersion
+    ContentInstance, ContentFieldInstance, ContentVersion, PublishedDocument,
+    ContentFieldIndex, STATUS_PUBLISHED, get_language_fallback_order, resolve_content_data
 )
 # Import serializers from other apps if needed (e.g., for user/language)
+from .schema import get_schema
+from .validation import check_references, validate_content_data
 from apps.core.models import Language
 from apps.users.api import CMSUserSerializer
 # Import component models for layout data
@@ -82,10 +86,11 @@ class TermSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError({"parent": _("Cannot assign parent in a non-hierarchical taxonomy.")})
             if parent.taxonomy != taxonomy:
                 raise serializers.ValidationError({"parent": _("Parent term must belong to the same taxonomy.")})
-            # Prevent self-assignment or circular references (basic check)
+            # Prevent self-assignment or circular references
             if self.instance and parent.pk == self.instance.pk:
                  raise serializers.ValidationError({"parent": _("Term cannot be its own parent.")})
-            # Add more robust circular reference check if needed (e.g., checking ancestors)
+            if self.instance and parent.is_below(self.instance):
+                 raise serializers.ValidationError({"parent": _("A term cannot be moved below one of its descendants.")})
 
         # Validate translated_names and translated_slugs structure if needed
         # Ensure keys are valid language codes?
@@ -93,6 +98,14 @@ class TermSerializer(serializers.ModelSerializer):
         return data
 
 
+class TermNodeSerializer(TermSerializer):
+    """Term with its position in the hierarchy, for the descendants/ancestors/tree endpoints."""
+
+    class Meta(TermSerializer.Meta):
+        fields = TermSerializer.Meta.fields + ['depth']
+        read_only_fields = TermSerializer.Meta.read_only_fields + ['depth']
+
+
 class TaxonomySerializer(serializers.ModelSerializer):
     """Serializer for Taxonomies."""
     content_types_api_ids = serializers.SlugRelatedField(
@@ -149,6 +162,65 @@ class PageComponentSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+def get_content_instance_prefetches(lang_code):
+    """
+    Prefetch lookups needed to serialize any ContentInstance in a fixed number
+    of queries, independent of how many instances are serialized: published
+    instances are served from their document for `lang_code`. The others also
+    need get_unpublished_prefetches() (see prefetch_content_instances).
+    Expects 'content_type' and 'author' to be select_related.
+    """
+    return [
+        'author__roles', # For author_detail.roles_detail
+        # Only the requested language's delivery document is needed
+        Prefetch('published_documents', queryset=PublishedDocument.objects.filter(language_id=lang_code)),
+    ]
+
+
+def get_unpublished_prefetches():
+    """Prefetch lookups of the live data serialized for instances without a published document."""
+    return [
+        Prefetch('field_instances', queryset=ContentFieldInstance.objects.select_related('field_definition', 'language')),
+        Prefetch('terms', queryset=Term.objects.select_related('taxonomy')),
+        Prefetch('components', queryset=PageComponent.objects.select_related('component_definition')),
+    ]
+
+
+def get_published_document(instance, lang_code):
+    """
+    The PublishedDocument of `instance` for `lang_code` (from the
+    'published_documents' prefetch), or None if it is not published or its
+    document has not been built yet.
+    """
+    if instance.status != STATUS_PUBLISHED:
+        return None
+    return next((doc for doc in instance.published_documents.all() if doc.language_id == lang_code), None)
+
+
+def prefetch_content_instances(instances, lang_code):
+    """
+    Loads what serializing `instances` needs. Field instances, terms and
+    components are only fetched for the instances without a published document
+    for `lang_code`, so a page of published content never reads the EAV rows.
+    Lookups already prefetched are skipped.
+    """
+    prefetch_related_objects(instances, *get_content_instance_prefetches(lang_code))
+    unpublished = [instance for instance in instances if get_published_document(instance, lang_code) is None]
+    if unpublished:
+        prefetch_related_objects(unpublished, *get_unpublished_prefetches())
+
+
+class ContentInstanceListSerializer(serializers.ListSerializer):
+    """
+    Loads related data for the whole list (e.g. a page) up front instead of
+    per instance, see prefetch_content_instances.
+    """
+    def to_representation(self, data):
+        instances = list(data.all() if hasattr(data, 'all') else data)
+        prefetch_content_instances(instances, self.child._get_requested_language())
+        return super().to_representation(instances)
+
+
 class ContentInstanceSerializer(serializers.ModelSerializer):
     """
     Serializer for ContentInstance. Handles dynamic fields based on ContentType.
@@ -161,25 +233,22 @@ class ContentInstanceSerializer(serializers.ModelSerializer):
     term_ids = serializers.PrimaryKeyRelatedField(
         source='terms', queryset=Term.objects.all(), many=True, write_only=True, required=False
     )
-    # Represent terms with more detail on read
-    terms_detail = TermSerializer(source='terms', many=True, read_only=True)
+    # Represent terms with more detail on read (served from the published document when available)
+    terms_detail = serializers.SerializerMethodField(read_only=True)
 
     # Dynamic field handling: Use a dictionary for input/output
     # Structure: {"lang_code": {"field_api_id": value, ...}, "non_localizable": {"field_api_id": value, ...}}
     # Or simpler: {"field_api_id": value} for non-localizable, {"field_api_id": {"lang_code": value, ...}} for localizable
     # Let's try the simpler approach for input/output representation:
     content_data = serializers.SerializerMethodField(read_only=True) # Renamed from 'fields'
-    # Add field for layout components
-    layout_components = PageComponentSerializer(
-        source='components', # Use the related name from ContentInstance to PageComponent FK
-        many=True,
-        read_only=True
-    )
+    # Layout components (PageComponentSerializer output), served from the published document when available
+    layout_components = serializers.SerializerMethodField(read_only=True)
     # For write operations, we'll expect a similar structure in request.data['content_data']
     # Layout component data is saved via the admin inline for now.
 
     class Meta:
         model = ContentInstance
+        list_serializer_class = ContentInstanceListSerializer
         fields = [
             'id', 'content_type', 'content_type_api_id', 'status',
             'author', 'author_detail', 'created_at', 'updated_at', 'published_at',
@@ -198,97 +267,98 @@ class ContentInstanceSerializer(serializers.ModelSerializer):
             'terms': {'write_only': True}, # Use term_ids for input
         }
 
+    def _get_requested_language(self):
+        """Language code requested via ?lang=, defaulting to the site default."""
+        request = self.context.get('request')
+        requested_lang_code = request.query_params.get('lang') if request else None
+        return requested_lang_code or settings.LANGUAGE_CODE
+
+    def _get_published_document(self, obj):
+        """
+        Returns the PublishedDocument for the requested language, or None if the
+        instance is not published or its document has not been built yet.
+        """
+        lang_code = self._get_requested_language()
+        cache = obj.__dict__.setdefault('_published_document_cache', {})
+        if lang_code not in cache:
+            cache[lang_code] = get_published_document(obj, lang_code)
+        return cache[lang_code]
+
     def get_content_data(self, obj): # Renamed from get_fields
         """
         Retrieve and structure field data for output, applying language fallback.
         """
-        # Determine requested language and fallbacks
-        request = self.context.get('request')
-        requested_lang_code = request.query_params.get('lang') if request else None
-        if not requested_lang_code:
-            requested_lang_code = settings.LANGUAGE_CODE # Site default
-
-        base_lang_code = requested_lang_code.split('-')[0]
-        site_default_lang_code = settings.LANGUAGE_CODE
-        fallback_order = [requested_lang_code]
-        if base_lang_code != requested_lang_code:
-            fallback_order.append(base_lang_code)
-        if site_default_lang_code not in fallback_order:
-             fallback_order.append(site_default_lang_code)
-        # Add base of site default if different
-        site_default_base = site_default_lang_code.split('-')[0]
-        if site_default_base not in fallback_order:
-            fallback_order.append(site_default_base)
-
-
-        structured_fields = {}
-        # Optimize: Fetch all field instances at once
-        field_instances = obj.field_instances.select_related('field_definition', 'language').all()
-        # Group instances by field definition API ID and language code
-        instances_map = {} # { "field_api_id": { "lang_code": value, ... }, ... }
-        non_localizable_map = {} # { "field_api_id": value }
-
-        for fi in field_instances:
-            api_id = fi.field_definition.api_id
-            if fi.language: # Localizable
-                if api_id not in instances_map:
-                    instances_map[api_id] = {}
-                instances_map[api_id][fi.language.code] = fi.value
-            else: # Non-localizable
-                non_localizable_map[api_id] = fi.value
-
-        # Iterate through definitions to ensure all fields are considered
-        definitions = obj.content_type.field_definitions.all()
-        for definition in definitions:
-            api_id = definition.api_id
-            if definition.is_localizable:
-                found_value = None
-                found_lang_code = None
-                # Try fallbacks in order
-                lang_values = instances_map.get(api_id, {})
-                for lang_code in fallback_order:
-                    if lang_code in lang_values:
-                        found_value = lang_values[lang_code]
-                        found_lang_code = lang_code
-                        break
-                # Final fallback: first available language for this field
-                if found_value is None and lang_values:
-                     first_lang = next(iter(lang_values.keys()))
-                     found_value = lang_values[first_lang]
-                     found_lang_code = first_lang
-
-                # Structure output to include value and language it came from
-                if found_value is not None:
-                     structured_fields[api_id] = {
-                         "value": found_value,
-                         "language": found_lang_code
-                     }
-                else:
-                     structured_fields[api_id] = None # Or {"value": None, "language": None}
-
-            else:
-                # Non-localizable field
-                structured_fields[api_id] = non_localizable_map.get(api_id) # Value is directly stored
-
-        return structured_fields
+        document = self._get_published_document(obj)
+        if document is not None:
+            return document.content_data
+
+        # Not published (or no document yet): resolve from field instances
+        fallback_order = get_language_fallback_order(self._get_requested_language())
+        # Plain .all() so the prefetch caches (see prefetch_content_instances) are used
+        field_instances = obj.field_instances.all()
+        schema = get_schema(obj.content_type_id, memo=self.context.setdefault('_schemas', {}))
+        return resolve_content_data(schema.fields, field_instances, fallback_order)
+
+    def get_terms_detail(self, obj):
+        document = self._get_published_document(obj)
+        if document is not None:
+            return document.terms
+        return TermSerializer(obj.terms.all(), many=True, context=self.context).data
+
+    def get_layout_components(self, obj):
+        document = self._get_published_document(obj)
+        if document is not None:
+            return document.layout
+        return PageComponentSerializer(obj.components.all(), many=True, context=self.context).data
+
+    def validate(self, data):
+        """
+        Validates content_data (read from the raw request data, key matching the
+        input structure) against the content type's field definitions, see
+        apps.content.validation. The validated values are passed on as 'field_values'.
+        """
+        data = super().validate(data)
+        content_input_data = self.context['request'].data.get('content_data', None)
+        if self.instance is not None:
+            if content_input_data is None:
+                return data # Fields untouched
+            content_type = self.instance.content_type_id
+        else:
+            content_type = data['content_type']
+            if content_input_data is None:
+                content_input_data = {}
+        schema = get_schema(content_type, memo=self.context.setdefault('_schemas', {}))
+        languages = {language.code: language for language in Language.get_active()}
+        # Updates only change the fields they include
+        field_values, references, errors = validate_content_data(
+            schema, content_input_data, languages, partial=self.instance is not None
+        )
+        if not errors:
+            errors = check_references([references])[0]
+        if errors:
+            raise serializers.ValidationError({'content_data': errors})
+        data['field_values'] = field_values
+        return data
 
     @transaction.atomic
     def create(self, validated_data):
         """Handle creation of ContentInstance and its ContentFieldInstances."""
         term_data = validated_data.pop('terms', None) # Use term_ids source
-        # Get content_data from raw request data (key should match input structure)
-        content_input_data = self.context['request'].data.get('content_data', {})
+        field_values = validated_data.pop('field_values', [])
         validated_data['author'] = self.context['request'].user # Set author
 
         instance = super().create(validated_data)
 
-        self._save_field_instances(instance, content_input_data) # Pass renamed data
+        self._save_field_instances(instance, field_values)
+        ContentFieldIndex.rebuild_for_instance(instance)
 
         if term_data is not None:
             instance.terms.set(term_data)
 
         # Optionally create initial version
         ContentVersion.create_version(instance, user=instance.author, message="Initial creation")
+        # Build delivery documents (no-op unless created as published)
+        PublishedDocument.rebuild_for_instance(instance)
 
         return instance
 
@@ -296,8 +366,8 @@ class ContentInstanceSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """Handle update of ContentInstance and its ContentFieldInstances."""
         term_data = validated_data.pop('terms', None) # Use term_ids source
-        # Get content_data if provided in the update request
-        content_input_data = self.context['request'].data.get('content_data', None)
+        # Validated content_data, if provided in the update request
+        field_values = validated_data.pop('field_values', None)
 
         # Prevent changing content_type after creation
         validated_data.pop('content_type', None)
@@ -309,12 +379,13 @@ class ContentInstanceSerializer(serializers.ModelSerializer):
         instance = super().update(instance, validated_data)
         new_status = instance.status
 
-        if content_input_data is not None:
+        if field_values is not None:
             # Option 1: Replace all fields (simpler, but destructive)
             # instance.field_instances.all().delete()
-            # self._save_field_instances(instance, content_input_data)
+            # self._save_field_instances(instance, field_values)
             # Option 2: Update existing/create new (more complex, preserves IDs)
-            self._update_field_instances(instance, content_input_data) # Pass renamed data
+            self._update_field_instances(instance, field_values)
+            ContentFieldIndex.rebuild_for_instance(instance)
 
 
         if term_data is not None:
@@ -326,7 +397,7 @@ class ContentInstanceSerializer(serializers.ModelSerializer):
         if new_status != original_status:
              create_new_version = True
              # If changing to published, update published_at (handled by model save)
-        if content_input_data is not None: # Assume field update means version change for now
+        if field_values is not None: # Assume field update means version change for now
              create_new_version = True
 
         if create_new_version:
@@ -334,91 +405,43 @@ class ContentInstanceSerializer(serializers.ModelSerializer):
              user = self.context['request'].user if self.context['request'].user.is_authenticated else None
              ContentVersion.create_version(instance, user=user, message="Content updated")
 
+        # Refresh (or drop, if unpublished) the delivery documents
+        PublishedDocument.rebuild_for_instance(instance)
 
         return instance
 
-    def _save_field_instances(self, instance, content_input_data): # Renamed parameter
-        """Helper to create ContentFieldInstance objects from structured data."""
-        definitions = instance.content_type.field_definitions.all()
-        def_map = {d.api_id: d for d in definitions}
-        active_languages = Language.objects.filter(is_active=True)
-        lang_map = {l.code: l for l in active_languages}
-
-        instances_to_create = []
-        for api_id, value_data in content_input_data.items(): # Use renamed parameter
-            definition = def_map.get(api_id)
-            if not definition: continue # Ignore data for unknown fields
-
-            if definition.is_localizable:
-                if isinstance(value_data, dict):
-                    for lang_code, value in value_data.items():
-                        language = lang_map.get(lang_code)
-                        if not language: continue # Ignore data for inactive languages
-                        # TODO: Add validation based on definition.field_type
-                        instances_to_create.append(ContentFieldInstance(
-                            content_instance=instance,
-                            field_definition=definition,
-                            language=language,
-                            value=value
-                        ))
-            else:
-                # TODO: Add validation based on definition.field_type
-                instances_to_create.append(ContentFieldInstance(
-                    content_instance=instance,
-                    field_definition=definition,
-                    language=None,
-                    value=value_data
-                ))
-
+    def _save_field_instances(self, instance, field_values):
+        """Helper to create ContentFieldInstance objects from validated (field, language, value) triples."""
+        instances_to_create = [
+            ContentFieldInstance(
+                content_instance=instance, field_definition=field.definition, language=language, value=value
+            )
+            for field, language, value in field_values
+        ]
         if instances_to_create:
             ContentFieldInstance.objects.bulk_create(instances_to_create)
 
-    def _update_field_instances(self, instance, content_input_data): # Renamed parameter
+    def _update_field_instances(self, instance, field_values):
          """Helper to update/create ContentFieldInstance objects (more complex)."""
-         definitions = instance.content_type.field_definitions.all()
-         def_map = {d.api_id: d for d in definitions}
-         active_languages = Language.objects.filter(is_active=True)
-         lang_map = {l.code: l for l in active_languages}
          existing_fis = instance.field_instances.all()
          fi_map = {} # {(field_def_id, lang_id_or_None): fi_instance}
          for fi in existing_fis:
-             fi_map[(fi.field_definition_id, getattr(fi.language, 'pk', None))] = fi
+             fi_map[(fi.field_definition_id, fi.language_id)] = fi
 
          instances_to_update = []
          instances_to_create = []
 
-         for api_id, value_data in content_input_data.items(): # Use renamed parameter
-             definition = def_map.get(api_id)
-             if not definition: continue
-
-             if definition.is_localizable:
-                 if isinstance(value_data, dict):
-                     for lang_code, value in value_data.items():
-                         language = lang_map.get(lang_code)
-                         if not language: continue
-                         # TODO: Add validation
-                         key = (definition.pk, language.pk)
-                         if key in fi_map:
-                             fi = fi_map[key]
-                             if fi.value != value: # Only update if changed
-                                 fi.value = value
-                                 instances_to_update.append(fi)
-                         else:
-                             instances_to_create.append(ContentFieldInstance(
-                                 content_instance=instance, field_definition=definition, language=language, value=value
-                             ))
+         for field, language, value in field_values:
+             key = (field.id, getattr(language, 'pk', None))
+             if key in fi_map:
+                 fi = fi_map[key]
+                 if fi.value != value: # Only update if changed
+                     fi.value = value
+                     instances_to_update.append(fi)
              else:
-                 # TODO: Add validation
-                 key = (definition.pk, None)
-                 if key in fi_map:
-                     fi = fi_map[key]
-                     if fi.value != value_data: # Only update if changed
-                         fi.value = value_data
-                         instances_to_update.append(fi)
-                 else:
-                     instances_to_create.append(ContentFieldInstance(
-                         content_instance=instance, field_definition=definition, language=None, value=value_data
-                     ))
+                 instances_to_create.append(ContentFieldInstance(
+                     content_instance=instance, field_definition=field.definition, language=language, value=value
+                 ))
 
          if instances_to_create:
              ContentFieldInstance.objects.bulk_create(instances_to_create)
@@ -429,13 +452,23 @@ class ContentInstanceSerializer(serializers.ModelSerializer):
          # TODO: Optionally delete field instances that were present before but are not in fields_data?
 
 
+class ContentVersionListSerializer(serializers.ListSerializer):
+    """Reconstructs the snapshots of the whole list (e.g. a page) with one query."""
+    def to_representation(self, data):
+        versions = list(data.all() if hasattr(data, 'all') else data)
+        ContentVersion.load_snapshots(versions)
+        return super().to_representation(versions)
+
+
 class ContentVersionSerializer(serializers.ModelSerializer):
     """Serializer for ContentVersion (Read-Only)."""
     content_instance_id = serializers.UUIDField(source='content_instance.id', read_only=True)
     created_by_email = serializers.EmailField(source='created_by.email', read_only=True, allow_null=True)
+    data_snapshot = serializers.JSONField(read_only=True) # Reconstructed from keyframe and patches
 
     class Meta:
         model = ContentVersion
+        list_serializer_class = ContentVersionListSerializer
         fields = [
             'id', 'content_instance_id', 'data_snapshot', 'status_snapshot',
             'version_message', 'created_by_email', 'created_at'
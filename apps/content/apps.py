@@ -8,3 +8,4 @@ class ContentConfig(AppConfig):
     def ready(self):
         # Import and connect signals (assuming signals are in apps.webhooks)
         import apps.webhooks.signals
+        import apps.content.signals
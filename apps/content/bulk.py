@@ -0,0 +1,211 @@
+"""
+Bulk ingestion of ContentInstances (see ContentInstanceViewSet.bulk_ingest).
+
+Records use the same structure as a single `POST /content-instances/` body.
+They are validated against content type definitions loaded once per request
+(term, relationship and media references with one query per batch), then
+written per batch with one bulk INSERT per table (instances, field instances,
+term links, field index rows and initial versions) instead of the
+per-instance queries and signals of ContentInstanceSerializer.create.
+"""
+import uuid
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from apps.core.models import Language
+from apps.core.cache import invalidate_tags_on_commit
+from .models import (
+    ContentType, ContentInstance, ContentFieldInstance, ContentVersion, ContentFieldIndex,
+    Term, STATUS_CHOICES, STATUS_DRAFT, STATUS_PUBLISHED
+)
+from .cache import ALL_CONTENT_INSTANCES_TAG, content_type_tag
+from .schema import get_schema
+from .signals import content_batch_ingested
+from .tasks import rebuild_published_documents
+from .validation import check_references, validate_content_data
+
+BULK_BATCH_SIZE = getattr(settings, 'CONTENT_BULK_BATCH_SIZE', 1000)
+VALID_STATUSES = {choice[0] for choice in STATUS_CHOICES}
+
+
+class BulkContentIngestor:
+    """
+    Validates and inserts content records in batches of `batch_size`.
+    Invalid records are skipped and reported, valid ones are created.
+    """
+
+    def __init__(self, user, batch_size=BULK_BATCH_SIZE):
+        self.user = user if user and user.is_authenticated else None
+        self.batch_size = batch_size
+        self.languages = {language.code: language for language in Language.get_active()}
+        self._content_types = {} # {api_id or UUID string: (ContentType, CompiledSchema) or None}
+        self.created_ids = []
+        self.errors = []
+
+    def ingest(self, records):
+        """Ingests an iterable of record dicts and returns a summary."""
+        numbered = enumerate(records, 1)
+        while True:
+            batch = list(islice(numbered, self.batch_size))
+            if not batch:
+                break
+            self._ingest_batch(batch)
+        return {
+            'created': len(self.created_ids),
+            'failed': len(self.errors),
+            'ids': self.created_ids,
+            'errors': sorted(self.errors, key=lambda error: error['record']),
+        }
+
+    def _ingest_batch(self, batch):
+        prepared = []
+        for record_number, record in batch:
+            errors, item = self._prepare_record(record)
+            if errors:
+                self.errors.append({'record': record_number, 'errors': errors})
+            else:
+                prepared.append((record_number, item))
+
+        # Check all term, relationship and media references of the batch with one query per model
+        referenced_terms = {term_id for __, item in prepared for term_id in item['term_ids']}
+        existing_terms = set(Term.objects.filter(id__in=referenced_terms).values_list('id', flat=True))
+        reference_errors = check_references([item['references'] for __, item in prepared])
+        valid = []
+        for (record_number, item), field_errors in zip(prepared, reference_errors):
+            errors = {'content_data': field_errors} if field_errors else {}
+            missing = [str(term_id) for term_id in item['term_ids'] if term_id not in existing_terms]
+            if missing:
+                errors['term_ids'] = [_("Terms do not exist: %(ids)s") % {'ids': ', '.join(missing)}]
+            if errors:
+                self.errors.append({'record': record_number, 'errors': errors})
+            else:
+                valid.append(item)
+        if valid:
+            self._write_batch(valid)
+
+    def _prepare_record(self, record):
+        """Returns (errors, prepared_item) for one input record."""
+        if not isinstance(record, dict):
+            return {'non_field_errors': [_("Expected a JSON object.")]}, None
+        errors = {}
+
+        content_type_ref = record.get('content_type')
+        resolved = self._get_content_type(content_type_ref) if content_type_ref else None
+        if resolved is None:
+            errors['content_type'] = [_("Unknown content type.") if content_type_ref else _("This field is required.")]
+
+        status = record.get('status') or STATUS_DRAFT
+        if status not in VALID_STATUSES:
+            errors['status'] = [_("\"%(status)s\" is not a valid choice.") % {'status': status}]
+
+        term_ids = []
+        raw_term_ids = record.get('term_ids') or []
+        if not isinstance(raw_term_ids, list):
+            errors['term_ids'] = [_("Expected a list of term IDs.")]
+        else:
+            try:
+                term_ids = [uuid.UUID(str(term_id)) for term_id in raw_term_ids]
+            except ValueError:
+                errors['term_ids'] = [_("Term IDs must be valid UUIDs.")]
+
+        content_data = record.get('content_data') or {}
+        if not isinstance(content_data, dict):
+            errors['content_data'] = [_("Expected an object keyed by field API ID.")]
+        if errors:
+            return errors, None
+
+        content_type, schema = resolved
+        field_values, references, field_errors = validate_content_data(schema, content_data, self.languages)
+        if field_errors:
+            return {'content_data': field_errors}, None
+        return None, {
+            'content_type': content_type,
+            'status': status,
+            'term_ids': term_ids,
+            'field_values': field_values,
+            'references': references,
+        }
+
+    def _get_content_type(self, content_type_ref):
+        """Resolves a content type by api_id or UUID, with its compiled schema, once per ingest."""
+        key = str(content_type_ref)
+        if key not in self._content_types:
+            try:
+                lookup = {'pk': uuid.UUID(key)}
+            except ValueError:
+                lookup = {'api_id': key}
+            content_type = ContentType.objects.filter(**lookup).first()
+            self._content_types[key] = (content_type, get_schema(content_type)) if content_type else None
+        return self._content_types[key]
+
+    @transaction.atomic
+    def _write_batch(self, items):
+        now = timezone.now()
+        instances = []
+        field_instances = []
+        term_links = []
+        index_rows = []
+        versions = []
+        TermLink = ContentInstance.terms.through
+
+        for item in items:
+            instance = ContentInstance(
+                content_type=item['content_type'],
+                author=self.user,
+                status=item['status'],
+                published_at=now if item['status'] == STATUS_PUBLISHED else None,
+            )
+            instances.append(instance)
+            instance_field_instances = [
+                ContentFieldInstance(
+                    content_instance=instance, field_definition=field.definition, language=language, value=value
+                )
+                for field, language, value in item['field_values']
+            ]
+            field_instances.extend(instance_field_instances)
+            index_rows.extend(
+                ContentFieldIndex.from_field_instance(fi, fi.field_definition)
+                for fi in instance_field_instances if fi.field_definition.is_indexed
+            )
+            term_links.extend(
+                TermLink(contentinstance_id=instance.pk, term_id=term_id) for term_id in item['term_ids']
+            )
+            versions.append(ContentVersion.build_version(
+                instance, ContentVersion.build_snapshot(instance_field_instances),
+                status_snapshot=instance.status,
+                created_by=self.user,
+                version_message="Initial creation (bulk import)",
+            ))
+
+        ContentInstance.objects.bulk_create(instances)
+        ContentFieldInstance.objects.bulk_create(field_instances)
+        TermLink.objects.bulk_create(term_links)
+        ContentFieldIndex.objects.bulk_create([row for row in index_rows if row is not None])
+        ContentVersion.objects.bulk_create(versions)
+
+        instance_ids = [str(instance.pk) for instance in instances]
+        self.created_ids.extend(instance_ids)
+        self._after_batch(instances, instance_ids)
+
+    def _after_batch(self, instances, instance_ids):
+        """Work normally done by per-instance signals, once per batch."""
+        content_type_api_ids = sorted({instance.content_type.api_id for instance in instances})
+        invalidate_tags_on_commit(
+            ALL_CONTENT_INSTANCES_TAG, *[content_type_tag(api_id) for api_id in content_type_api_ids]
+        )
+        published_ids = [
+            instance_id for instance, instance_id in zip(instances, instance_ids)
+            if instance.status == STATUS_PUBLISHED
+        ]
+        if published_ids:
+            transaction.on_commit(lambda: rebuild_published_documents.delay(published_ids))
+        transaction.on_commit(lambda: content_batch_ingested.send(
+            sender=ContentInstance,
+            instance_ids=instance_ids,
+            content_type_api_ids=content_type_api_ids,
+            published_ids=published_ids,
+        ))
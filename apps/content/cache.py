@@ -0,0 +1,95 @@
+"""
+Response caching for ContentInstanceViewSet.
+
+Responses are cached per content type, language, query string and auth scope,
+and tagged with everything they embed (instances, content types, terms, media,
+component definitions). Signal handlers in apps.content.signals invalidate the
+tags, see apps.core.cache for the versioning scheme.
+"""
+from django.conf import settings
+
+from apps.core.cache import make_cache_key
+
+from .models import FieldDefinition
+
+# Seconds a cached response may be served (tags normally invalidate much sooner)
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'CONTENT_RESPONSE_CACHE_TIMEOUT', 60 * 15)
+
+# Tag shared by every list response that is not filtered by content type
+ALL_CONTENT_INSTANCES_TAG = 'content_instances'
+# Tag of list responses filtered by term (?term=), whose results follow the term hierarchy
+TERM_TREE_TAG = 'term_tree'
+
+
+def content_instance_tag(pk):
+    return f"content_instance:{pk}"
+
+def content_type_tag(api_id):
+    return f"content_type:{api_id}"
+
+def term_tag(pk):
+    return f"term:{pk}"
+
+def media_tag(pk):
+    return f"media:{pk}"
+
+def component_definition_tag(api_id):
+    return f"component_definition:{api_id}"
+
+
+def get_auth_scope(request):
+    """
+    Coarse auth scope: responses do not vary per user, only by access level.
+    ContentInstanceViewSet only serves staff (IsEditorUser) today; the scope
+    keeps entries apart should it let other users in.
+    """
+    return 'staff' if request.user.is_staff else 'authenticated'
+
+
+def response_cache_key(request, action, pk=None):
+    """Cache key for a list/retrieve response, independent of query param order."""
+    query = sorted(request.query_params.lists())
+    return make_cache_key(
+        'content-response', action, pk or '',
+        request.query_params.get('content_type', ''),
+        request.query_params.get('lang') or settings.LANGUAGE_CODE,
+        query, get_auth_scope(request),
+    )
+
+
+def _iter_media_ids(value):
+    """Yields media asset ids from a content_data value (plain, localized or list)."""
+    if isinstance(value, dict) and 'value' in value:
+        value = value['value']
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_media_ids(item)
+    elif isinstance(value, str) and value:
+        yield value
+
+
+def collect_response_tags(items):
+    """Returns the dependency tags for serialized ContentInstance representations."""
+    tags = set()
+    content_type_ids = set()
+    for item in items:
+        tags.add(content_instance_tag(item['id']))
+        content_type_ids.add(item['content_type_api_id'])
+        tags.update(term_tag(term['id']) for term in item.get('terms_detail') or [])
+        tags.update(
+            component_definition_tag(component['component_api_id'])
+            for component in item.get('layout_components') or []
+        )
+    tags.update(content_type_tag(api_id) for api_id in content_type_ids)
+
+    # Media references are only known through the field definitions
+    media_fields = {}
+    for ct_api_id, field_api_id in FieldDefinition.objects.filter(
+        content_type__api_id__in=content_type_ids, field_type='media'
+    ).values_list('content_type__api_id', 'api_id'):
+        media_fields.setdefault(ct_api_id, []).append(field_api_id)
+    for item in items:
+        content_data = item.get('content_data') or {}
+        for field_api_id in media_fields.get(item['content_type_api_id'], []):
+            tags.update(media_tag(media_id) for media_id in _iter_media_ids(content_data.get(field_api_id)))
+    return tags
@@ -0,0 +1,161 @@
+"""
+Server-side diffs between two ContentVersions
+(GET /content-instances/<id>/versions/<a>/diff/<b>/).
+
+The diff lists the changed values per field and language, with word-level
+changes for rich text fields, so review UIs don't need to download and compare
+two full snapshots. Versions are immutable, so the changes between their
+snapshots are cached by version pair without invalidation; what can change
+(the authors' emails, which fields are rich text in the current schema) is
+applied to the cached changes on each request.
+"""
+import difflib
+import re
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ContentVersion
+from .schema import get_schema
+from .versioning import NON_LOCALIZABLE
+
+# Seconds a computed diff is cached
+CONTENT_VERSION_DIFF_CACHE_TIMEOUT = getattr(settings, 'CONTENT_VERSION_DIFF_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# Differing tokens (after the common prefix and suffix) above which a word diff
+# is not computed (SequenceMatcher is quadratic) and the value is shown replaced
+CONTENT_VERSION_DIFF_MAX_TOKENS = getattr(settings, 'CONTENT_VERSION_DIFF_MAX_TOKENS', 2000)
+
+# Whitespace runs, HTML tags and words, so markup changes show up as whole tokens
+WORD_TOKEN_RE = re.compile(r'\s+|<[^>]*>|[^\s<]+')
+
+
+def version_diff_cache_key(content_instance_id, from_version_id, to_version_id):
+    return f"content:version_changes:{content_instance_id}:{from_version_id}:{to_version_id}"
+
+
+def word_diff(old, new):
+    """
+    Word-level diff of two strings, as a list of {'op': 'equal' | 'delete' |
+    'insert', 'text': ...} chunks which, in order, spell both strings. If more
+    than CONTENT_VERSION_DIFF_MAX_TOKENS tokens differ, the differing part is a
+    single delete and insert.
+    """
+    old_tokens = WORD_TOKEN_RE.findall(old)
+    new_tokens = WORD_TOKEN_RE.findall(new)
+    prefix = 0
+    while prefix < min(len(old_tokens), len(new_tokens)) and old_tokens[prefix] == new_tokens[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < min(len(old_tokens), len(new_tokens)) - prefix
+        and old_tokens[-suffix - 1] == new_tokens[-suffix - 1]
+    ):
+        suffix += 1
+    old_middle = old_tokens[prefix:len(old_tokens) - suffix]
+    new_middle = new_tokens[prefix:len(new_tokens) - suffix]
+
+    chunks = []
+    if prefix:
+        chunks.append({'op': 'equal', 'text': ''.join(old_tokens[:prefix])})
+    if len(old_middle) + len(new_middle) > CONTENT_VERSION_DIFF_MAX_TOKENS:
+        opcodes = [('replace', 0, len(old_middle), 0, len(new_middle))]
+    else:
+        opcodes = difflib.SequenceMatcher(None, old_middle, new_middle, autojunk=False).get_opcodes()
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            chunks.append({'op': 'equal', 'text': ''.join(old_middle[i1:i2])})
+            continue
+        if i2 > i1: # 'delete' or 'replace'
+            chunks.append({'op': 'delete', 'text': ''.join(old_middle[i1:i2])})
+        if j2 > j1: # 'insert' or 'replace'
+            chunks.append({'op': 'insert', 'text': ''.join(new_middle[j1:j2])})
+    if suffix:
+        chunks.append({'op': 'equal', 'text': ''.join(old_tokens[len(old_tokens) - suffix:])})
+    return chunks
+
+
+def diff_snapshots(old, new):
+    """
+    Returns the changes between two data_snapshots, ordered by field and
+    language: {'field', 'language' (None if not localizable), 'change'
+    ('added', 'removed' or 'modified'), 'from', 'to'}, plus 'words' (see
+    word_diff) for modified string values.
+    """
+    changes = []
+    for group in old.keys() | new.keys():
+        old_values = old.get(group) or {}
+        new_values = new.get(group) or {}
+        language = None if group == NON_LOCALIZABLE else group
+        for api_id in old_values.keys() | new_values.keys():
+            if api_id not in new_values:
+                change = {'change': 'removed', 'from': old_values[api_id], 'to': None}
+            elif api_id not in old_values:
+                change = {'change': 'added', 'from': None, 'to': new_values[api_id]}
+            elif old_values[api_id] != new_values[api_id]:
+                change = {'change': 'modified', 'from': old_values[api_id], 'to': new_values[api_id]}
+                if isinstance(change['from'], str) and isinstance(change['to'], str):
+                    change['words'] = word_diff(change['from'], change['to'])
+            else:
+                continue
+            changes.append({'field': api_id, 'language': language, **change})
+    changes.sort(key=lambda change: (change['field'], change['language'] or ''))
+    return changes
+
+
+def diff_versions(from_version, to_version, changes, schema):
+    """
+    The diff response for two versions of an instance, from the `changes`
+    between their snapshots (see diff_snapshots): word diffs are kept for the
+    fields that are rich text in `schema`.
+    """
+    rich_text_fields = frozenset(field.api_id for field in schema.fields if field.field_type == 'rich_text')
+
+    def describe(version):
+        return {
+            'id': str(version.pk),
+            'sequence': version.sequence,
+            'created_at': version.created_at,
+            'created_by_email': version.created_by.email if version.created_by else None,
+            'version_message': version.version_message,
+        }
+    diff = {
+        'from_version': describe(from_version),
+        'to_version': describe(to_version),
+        'changes': [
+            change if 'words' not in change or change['field'] in rich_text_fields
+            else {key: value for key, value in change.items() if key != 'words'}
+            for change in changes
+        ],
+    }
+    if from_version.status_snapshot != to_version.status_snapshot:
+        diff['status'] = {'from': from_version.status_snapshot, 'to': to_version.status_snapshot}
+    return diff
+
+
+def get_version_diff(content_instance, from_version_id, to_version_id):
+    """
+    Returns the diff from one version of `content_instance` to another, or
+    None if either version does not exist. The changes between the snapshots
+    are cached; the versions themselves are read on each call (one query).
+    """
+    try:
+        from_version_id, to_version_id = uuid.UUID(str(from_version_id)), uuid.UUID(str(to_version_id))
+    except ValueError:
+        return None
+    versions = {
+        version.pk: version
+        for version in content_instance.versions.select_related('created_by').defer('data')
+        .filter(pk__in={from_version_id, to_version_id})
+    }
+    from_version, to_version = versions.get(from_version_id), versions.get(to_version_id)
+    if from_version is None or to_version is None:
+        return None
+    cache_key = version_diff_cache_key(content_instance.pk, from_version_id, to_version_id)
+    changes = cache.get(cache_key)
+    if changes is None:
+        ContentVersion.load_snapshots([from_version, to_version])
+        changes = diff_snapshots(from_version.data_snapshot, to_version.data_snapshot)
+        cache.set(cache_key, changes, timeout=CONTENT_VERSION_DIFF_CACHE_TIMEOUT)
+    return diff_versions(from_version, to_version, changes, get_schema(content_instance.content_type_id))
@@ -0,0 +1,64 @@
+"""
+Streaming NDJSON export of ContentInstances, shared by the export API action
+and the `export_content` management command.
+
+Instances are read with a server-side cursor (`iterator(chunk_size=...)`,
+related data is prefetched per chunk) and encoded one line at a time, so
+memory use does not depend on the number of exported instances.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from apps.core.models import Language
+from .models import (
+    ContentInstance, ContentFieldInstance, Term,
+    get_language_fallback_order, resolve_content_data
+)
+from .schema import get_schema
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'CONTENT_EXPORT_CHUNK_SIZE', 2000)
+
+
+def get_export_languages(lang_codes=None):
+    """Active language codes to resolve content_data for, optionally limited to `lang_codes`."""
+    languages = sorted(Language.get_active(), key=lambda language: (not language.is_default, language.code))
+    return [language.code for language in languages if not lang_codes or language.code in lang_codes]
+
+
+def iter_export_records(content_type, lang_codes, status=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields one export dict per ContentInstance of `content_type`, in primary key order."""
+    definitions = get_schema(content_type).fields
+    fallback_orders = {code: get_language_fallback_order(code) for code in lang_codes}
+
+    instances = ContentInstance.objects.filter(content_type=content_type).prefetch_related(
+        Prefetch('field_instances', queryset=ContentFieldInstance.objects.select_related('field_definition')),
+        Prefetch('terms', queryset=Term.objects.only('id')),
+    ).order_by('pk')
+    if status:
+        instances = instances.filter(status=status)
+
+    for instance in instances.iterator(chunk_size=chunk_size):
+        field_instances = instance.field_instances.all()
+        yield {
+            'id': instance.pk,
+            'content_type': content_type.api_id,
+            'status': instance.status,
+            'author_id': instance.author_id,
+            'created_at': instance.created_at,
+            'updated_at': instance.updated_at,
+            'published_at': instance.published_at,
+            'term_ids': [term.pk for term in instance.terms.all()],
+            'content_data': {
+                code: resolve_content_data(definitions, field_instances, fallback_order)
+                for code, fallback_order in fallback_orders.items()
+            },
+        }
+
+
+def iter_export_lines(content_type, lang_codes, status=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields the export as NDJSON lines (str, newline terminated)."""
+    for record in iter_export_records(content_type, lang_codes, status=status, chunk_size=chunk_size):
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
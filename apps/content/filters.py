@@ -0,0 +1,160 @@
+"""
+Filter backends for dynamic content fields, backed by ContentFieldIndex.
+
+Only fields with `config.indexed` can be used, and the content type must be
+given (`?content_type=`) since field API IDs are only unique per content type:
+
+    ?content_type=product&filter[price__lt]=100&ordering=-field.price
+
+Localizable fields are matched against the value in the requested language
+(`?lang=`, default site language), without fallback.
+"""
+import re
+import uuid
+
+from django.conf import settings
+from django.db.models import F, FilteredRelation, Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .models import ContentInstance, FieldDefinition, Term, INDEX_COLUMN_BY_FIELD_TYPE, coerce_index_value
+
+# filter[<field_api_id>] or filter[<field_api_id>__<operator>]
+FIELD_FILTER_PARAM = re.compile(r'^filter\[(?P<api_id>[\w-]+?)(?:__(?P<op>exact|lt|lte|gt|gte|in))?\]$')
+FIELD_ORDERING_PREFIX = 'field.'
+
+
+def get_indexed_field_definitions(request):
+    """Indexed FieldDefinitions of the requested content type, keyed by api_id (memoized per request)."""
+    if not hasattr(request, '_indexed_field_definitions'):
+        content_type_api_id = request.query_params.get('content_type')
+        definitions = {}
+        if content_type_api_id:
+            definitions = {
+                d.api_id: d
+                for d in FieldDefinition.objects.filter(content_type__api_id=content_type_api_id)
+                if d.is_indexed
+            }
+        request._indexed_field_definitions = definitions
+    return request._indexed_field_definitions
+
+
+def join_field_index(request, queryset, definition):
+    """
+    LEFT JOINs the field's ContentFieldIndex row (one per instance) and returns
+    (queryset, alias). Filters and ordering on the same field share the join;
+    whether it exists is read from the queryset itself, so any number of
+    querysets can be filtered within a request.
+    """
+    alias = f"_field_index_{definition.api_id.replace('-', '_')}"
+    if alias not in queryset.query._filtered_relations:
+        if definition.is_localizable:
+            lang_code = request.query_params.get('lang') or settings.LANGUAGE_CODE
+            language_condition = Q(field_index_entries__language_id=lang_code)
+        else:
+            language_condition = Q(field_index_entries__language__isnull=True)
+        queryset = queryset.alias(**{alias: FilteredRelation(
+            'field_index_entries',
+            condition=Q(field_index_entries__field_definition=definition) & language_condition
+        )})
+    return queryset, alias
+
+
+class IndexedFieldFilter(BaseFilterBackend):
+    """Filters on indexed dynamic fields via `filter[<api_id>__<op>]=<value>`."""
+
+    def filter_queryset(self, request, queryset, view):
+        lookups = {}
+        for param, raw_value in request.query_params.items():
+            match = FIELD_FILTER_PARAM.match(param)
+            if not match:
+                continue
+            definition = self.get_definition(request, match.group('api_id'))
+            op = match.group('op') or 'exact'
+            queryset, alias = join_field_index(request, queryset, definition)
+            column = INDEX_COLUMN_BY_FIELD_TYPE[definition.field_type]
+            if op == 'in':
+                value = [self.coerce(definition, v, param) for v in raw_value.split(',')]
+            else:
+                value = self.coerce(definition, raw_value, param)
+            lookups[f'{alias}__{column}__{op}'] = value
+        return queryset.filter(**lookups) if lookups else queryset
+
+    def get_definition(self, request, api_id):
+        if not request.query_params.get('content_type'):
+            raise ValidationError({'content_type': _("Required when filtering on content fields.")})
+        definition = get_indexed_field_definitions(request).get(api_id)
+        if definition is None:
+            raise ValidationError({f'filter[{api_id}]': _("Unknown or non-indexed field.")})
+        return definition
+
+    def coerce(self, definition, raw_value, param):
+        value = coerce_index_value(definition.field_type, raw_value)
+        if value is None:
+            raise ValidationError({param: _("Invalid value for a '%(type)s' field.") % {'type': definition.field_type}})
+        return value
+
+
+class IndexedFieldOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter that also accepts `field.<api_id>` terms for indexed dynamic
+    fields (e.g. `?ordering=-field.price,-updated_at`). Instances without a
+    value for the field sort last in either direction.
+    """
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        definitions = get_indexed_field_definitions(request)
+        model_fields = [term for term in fields if not term.lstrip('-').startswith(FIELD_ORDERING_PREFIX)]
+        valid_model_fields = set(super().remove_invalid_fields(queryset, model_fields, view, request))
+        return [
+            term for term in fields
+            if term in valid_model_fields
+            or term.lstrip('-')[len(FIELD_ORDERING_PREFIX):] in definitions
+        ]
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+
+        order_by = []
+        uses_field_index = False
+        for term in ordering:
+            name = term.lstrip('-')
+            if not name.startswith(FIELD_ORDERING_PREFIX):
+                order_by.append(term)
+                continue
+            definition = get_indexed_field_definitions(request)[name[len(FIELD_ORDERING_PREFIX):]]
+            queryset, alias = join_field_index(request, queryset, definition)
+            expression = F(f'{alias}__{INDEX_COLUMN_BY_FIELD_TYPE[definition.field_type]}')
+            descending = term.startswith('-')
+            order_by.append(expression.desc(nulls_last=True) if descending else expression.asc(nulls_last=True))
+            uses_field_index = True
+        if uses_field_index:
+            order_by.append('-id') # Stable order for equal field values
+        return queryset.order_by(*order_by)
+
+
+class TermFilter(BaseFilterBackend):
+    """
+    ?term=<id>[,<id>...]: instances tagged with one of the terms or any term
+    below it, matched by materialized path (see Term.path) rather than by
+    walking the hierarchy level by level.
+    """
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get('term')
+        if not value:
+            return queryset
+        try:
+            term_ids = [uuid.UUID(term_id) for term_id in value.split(',')]
+        except ValueError:
+            raise ValidationError({'term': [_("Expected comma-separated term IDs.")]})
+        paths = list(Term.objects.filter(pk__in=term_ids).values_list('path', flat=True))
+        if not paths:
+            return queryset.none()
+        condition = Q()
+        for path in paths:
+            condition |= Q(term__path__startswith=path)
+        TermLink = ContentInstance.terms.through
+        return queryset.filter(pk__in=TermLink.objects.filter(condition).values('contentinstance_id'))
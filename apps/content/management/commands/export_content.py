@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.content.models import ContentType
+from apps.content.export import EXPORT_CHUNK_SIZE, get_export_languages, iter_export_lines
+
+
+class Command(BaseCommand):
+    help = "Exports all content instances of a content type as NDJSON (one instance per line)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('content_type', help="ContentType api_id to export.")
+        parser.add_argument('--status', help="Only export instances with this status (e.g. 'published').")
+        parser.add_argument('--lang', help="Comma-separated language codes (default: all active languages).")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument('--output', '-o', help="File to write to (default: stdout).")
+
+    def handle(self, *args, **options):
+        try:
+            content_type = ContentType.objects.get(api_id=options['content_type'])
+        except ContentType.DoesNotExist:
+            raise CommandError(f"Content type '{options['content_type']}' does not exist.")
+        lang_codes = get_export_languages(options['lang'].split(',') if options['lang'] else None)
+        lines = iter_export_lines(
+            content_type, lang_codes, status=options['status'], chunk_size=options['chunk_size']
+        )
+
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        count = 0
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            for line in lines:
+                output.write(line)
+                count += 1
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} content instance(s) to {options['output']}."))
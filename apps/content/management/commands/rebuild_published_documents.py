@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.content.models import ContentInstance, PublishedDocument, STATUS_PUBLISHED
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the denormalized PublishedDocument rows used by the content delivery API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--content-type', help="Only rebuild instances of this ContentType api_id.")
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        instances = ContentInstance.objects.filter(status=STATUS_PUBLISHED).select_related('content_type')
+        if options['content_type']:
+            instances = instances.filter(content_type__api_id=options['content_type'])
+
+        count = 0
+        for instance in instances.iterator(chunk_size=options['chunk_size']):
+            PublishedDocument.rebuild_for_instance(instance)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt published documents for {count} content instance(s)."))
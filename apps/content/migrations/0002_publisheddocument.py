@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:43
+
+import django.core.serializers.json
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0001_initial'),
+        ('core', '0002_systemsetting_default_content_status_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublishedDocument',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('content_data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Resolved field data (language fallback already applied).', verbose_name='Content Data')),
+                ('terms', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Serialized taxonomy terms attached to the instance.', verbose_name='Terms')),
+                ('layout', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Serialized page components for layout-builder content types.', verbose_name='Layout')),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='Built At')),
+                ('content_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='published_documents', to='content.contentinstance', verbose_name='Content Instance')),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.language', verbose_name='Language')),
+            ],
+            options={
+                'verbose_name': 'Published Document',
+                'verbose_name_plural': 'Published Documents',
+                'unique_together': {('content_instance', 'language')},
+            },
+        ),
+    ]
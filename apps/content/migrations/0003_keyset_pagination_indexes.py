@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0002_publisheddocument'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='contentversion',
+            name='content_con_content_1c2629_idx',
+        ),
+        migrations.AddIndex(
+            model_name='contentinstance',
+            index=models.Index(fields=['-updated_at', '-id'], name='content_con_updated_fe2163_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contentinstance',
+            index=models.Index(fields=['content_type', '-updated_at', '-id'], name='content_con_content_443a46_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contentversion',
+            index=models.Index(fields=['content_instance', '-created_at', '-id'], name='content_con_content_c5e5ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contentversion',
+            index=models.Index(fields=['-created_at', '-id'], name='content_con_created_06864f_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:50
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0003_keyset_pagination_indexes'),
+        ('core', '0002_systemsetting_default_content_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fielddefinition',
+            name='config',
+            field=models.JSONField(blank=True, default=dict, help_text="Field-specific settings (JSON format). Keys include: 'required' (bool), 'unique' (bool, requires careful implementation), 'default_value', 'help_text' (str), 'validation_rules' (e.g., min_length, max_length, regex), 'localizable' (bool), 'select_options' (list for 'select' type), 'allowed_content_types' (list of api_ids for 'relationship' type), 'allowed_media_types' (list for 'media' type), 'indexed' (bool, number/date/boolean/text/select only: enables API filtering and ordering).", verbose_name='Configuration'),
+        ),
+        migrations.CreateModel(
+            name='ContentFieldIndex',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('value_number', models.FloatField(blank=True, null=True, verbose_name='Number Value')),
+                ('value_date', models.DateTimeField(blank=True, null=True, verbose_name='Date Value')),
+                ('value_boolean', models.BooleanField(blank=True, null=True, verbose_name='Boolean Value')),
+                ('value_text', models.CharField(blank=True, help_text='Truncated to the first 255 characters.', max_length=255, null=True, verbose_name='Text Value')),
+                ('content_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='field_index_entries', to='content.contentinstance', verbose_name='Content Instance')),
+                ('field_definition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='content.fielddefinition', verbose_name='Field Definition')),
+                ('language', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.language', verbose_name='Language')),
+            ],
+            options={
+                'verbose_name': 'Content Field Index',
+                'verbose_name_plural': 'Content Field Index',
+                'indexes': [models.Index(fields=['field_definition', 'language', 'value_number'], name='content_con_field_d_f062bf_idx'), models.Index(fields=['field_definition', 'language', 'value_date'], name='content_con_field_d_52e34d_idx'), models.Index(fields=['field_definition', 'language', 'value_boolean'], name='content_con_field_d_fa9050_idx'), models.Index(fields=['field_definition', 'language', 'value_text'], name='content_con_field_d_c21301_idx')],
+                'unique_together': {('content_instance', 'field_definition', 'language')},
+            },
+        ),
+    ]
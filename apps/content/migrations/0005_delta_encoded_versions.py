@@ -0,0 +1,165 @@
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations, models
+
+# Frozen copy of the apps.content.versioning codec as of this migration, so
+# later changes to the live code do not change what this migration writes.
+KEYFRAME_INTERVAL = 20
+
+
+def _encode(data):
+    return zlib.compress(json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8'), 6)
+
+
+def _decode(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def _escape(token):
+    return token.replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def _make_patch(old, new):
+    ops = []
+    for group in old.keys() - new.keys():
+        ops.append({'op': 'remove', 'path': f"/{_escape(group)}"})
+    for group, values in new.items():
+        old_values = old.get(group)
+        if old_values is None:
+            ops.append({'op': 'add', 'path': f"/{_escape(group)}", 'value': values})
+            continue
+        if not isinstance(values, dict) or not isinstance(old_values, dict):
+            if values != old_values:
+                ops.append({'op': 'replace', 'path': f"/{_escape(group)}", 'value': values})
+            continue
+        for key in old_values.keys() - values.keys():
+            ops.append({'op': 'remove', 'path': f"/{_escape(group)}/{_escape(key)}"})
+        for key, value in values.items():
+            path = f"/{_escape(group)}/{_escape(key)}"
+            if key not in old_values:
+                ops.append({'op': 'add', 'path': path, 'value': value})
+            elif old_values[key] != value:
+                ops.append({'op': 'replace', 'path': path, 'value': value})
+    return ops
+
+
+def _apply_patch(snapshot, ops):
+    result = dict(snapshot)
+    copied = set()
+    for op in ops:
+        tokens = [_unescape(token) for token in op['path'].split('/')[1:]]
+        if len(tokens) == 1:
+            group = tokens[0]
+            if op['op'] == 'remove':
+                result.pop(group, None)
+            else:
+                result[group] = op['value']
+                copied.add(group)
+            continue
+        group, key = tokens
+        if group not in copied:
+            result[group] = dict(result.get(group) or {})
+            copied.add(group)
+        if op['op'] == 'remove':
+            result[group].pop(key, None)
+        else:
+            result[group][key] = op['value']
+    return result
+
+
+def encode_versions(apps, schema_editor):
+    """Numbers each instance's versions and stores their snapshots as keyframes and patches."""
+    ContentVersion = apps.get_model('content', 'ContentVersion')
+    instance_ids = ContentVersion.objects.order_by().values_list('content_instance_id', flat=True).distinct()
+    for instance_id in instance_ids.iterator():
+        previous = None
+        keyframe_sequence = 1
+        versions = ContentVersion.objects.filter(content_instance_id=instance_id).order_by('created_at', 'id')
+        for sequence, version in enumerate(versions.only('pk', 'data_snapshot').iterator(), 1):
+            snapshot = version.data_snapshot or {}
+            data = _encode(snapshot)
+            if previous is not None and sequence - keyframe_sequence < KEYFRAME_INTERVAL:
+                patch = _encode(_make_patch(previous, snapshot))
+                if len(patch) < len(data):
+                    data = patch
+                else:
+                    keyframe_sequence = sequence
+            else:
+                keyframe_sequence = sequence
+            ContentVersion.objects.filter(pk=version.pk).update(
+                sequence=sequence, keyframe_sequence=keyframe_sequence, data=data
+            )
+            previous = snapshot
+
+
+def decode_versions(apps, schema_editor):
+    """Restores the full data_snapshot of every version."""
+    ContentVersion = apps.get_model('content', 'ContentVersion')
+    snapshot = None
+    versions = ContentVersion.objects.order_by('content_instance_id', 'sequence')
+    for version in versions.only('pk', 'sequence', 'keyframe_sequence', 'data').iterator():
+        if version.sequence == version.keyframe_sequence:
+            snapshot = _decode(version.data)
+        else:
+            snapshot = _apply_patch(snapshot, _decode(version.data))
+        ContentVersion.objects.filter(pk=version.pk).update(data_snapshot=snapshot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_alter_fielddefinition_config_contentfieldindex'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contentversion',
+            name='data_snapshot',
+            field=models.JSONField(help_text='Snapshot of content field instance data for this version.', null=True, verbose_name='Data Snapshot'),
+        ),
+        migrations.AddField(
+            model_name='contentversion',
+            name='sequence',
+            field=models.PositiveIntegerField(editable=False, help_text="Position of the version in the instance's history, starting at 1.", null=True, verbose_name='Sequence'),
+        ),
+        migrations.AddField(
+            model_name='contentversion',
+            name='keyframe_sequence',
+            field=models.PositiveIntegerField(editable=False, help_text='Sequence of the full snapshot this version is reconstructed from (its own for keyframes).', null=True, verbose_name='Keyframe Sequence'),
+        ),
+        migrations.AddField(
+            model_name='contentversion',
+            name='data',
+            field=models.BinaryField(editable=False, help_text='Compressed JSON: the full snapshot for keyframes, otherwise a JSON Patch against the previous version.', null=True, verbose_name='Data'),
+        ),
+        migrations.RunPython(encode_versions, decode_versions),
+        migrations.RemoveField(
+            model_name='contentversion',
+            name='data_snapshot',
+        ),
+        migrations.AlterField(
+            model_name='contentversion',
+            name='sequence',
+            field=models.PositiveIntegerField(editable=False, help_text="Position of the version in the instance's history, starting at 1.", verbose_name='Sequence'),
+        ),
+        migrations.AlterField(
+            model_name='contentversion',
+            name='keyframe_sequence',
+            field=models.PositiveIntegerField(editable=False, help_text='Sequence of the full snapshot this version is reconstructed from (its own for keyframes).', verbose_name='Keyframe Sequence'),
+        ),
+        migrations.AlterField(
+            model_name='contentversion',
+            name='data',
+            field=models.BinaryField(editable=False, help_text='Compressed JSON: the full snapshot for keyframes, otherwise a JSON Patch against the previous version.', verbose_name='Data'),
+        ),
+        migrations.AddConstraint(
+            model_name='contentversion',
+            constraint=models.UniqueConstraint(fields=('content_instance', 'sequence'), name='content_version_sequence_uniq'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:29
+
+from django.db import migrations, models
+
+
+def build_term_paths(apps, schema_editor):
+    """Computes path and depth of existing terms, level by level from the roots."""
+    Term = apps.get_model('content', 'Term')
+    parents = dict(Term.objects.values_list('pk', 'parent_id'))
+    children = {}
+    for term_id, parent_id in parents.items():
+        children.setdefault(parent_id, []).append(term_id)
+    # Terms whose parents form a cycle are not reachable from a root: detach them
+    detached = [term_id for term_id, parent_id in parents.items() if parent_id is not None and not _reaches_root(term_id, parents)]
+    Term.objects.filter(pk__in=detached).update(parent=None)
+
+    level = [(term_id, '') for term_id in children.get(None, []) + detached]
+    visited = {term_id for term_id, __ in level}
+    depth = 0
+    while level:
+        next_level = []
+        for term_id, parent_path in level:
+            path = f"{parent_path}{term_id.hex}/"
+            Term.objects.filter(pk=term_id).update(path=path, depth=depth)
+            for child_id in children.get(term_id, []):
+                if child_id not in visited:
+                    visited.add(child_id)
+                    next_level.append((child_id, path))
+        level = next_level
+        depth += 1
+
+
+def _reaches_root(term_id, parents):
+    seen = set()
+    while term_id is not None:
+        if term_id in seen:
+            return False
+        seen.add(term_id)
+        term_id = parents.get(term_id)
+    return True
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0005_delta_encoded_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='term',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of ancestors (0 for root terms).', verbose_name='Depth'),
+        ),
+        migrations.AddField(
+            model_name='term',
+            name='path',
+            field=models.TextField(default='', editable=False, help_text="IDs (hex) of the root term down to this term, each followed by '/'.", verbose_name='Path'),
+        ),
+        migrations.RunPython(build_term_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='term',
+            index=models.Index(fields=['path'], name='content_term_path_idx', opclasses=['text_pattern_ops']),
+        ),
+    ]
@@ -1,14 +1,25 @@
 import uuid
 import uuid
-from django.db import models
+import datetime
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone # Import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 
 # Import Language model from core app
 from apps.core.models import Language
+from .schema import get_schema
+from .validation import check_references, get_references, validation_rules_errors
+from .versioning import (
+    CONTENT_VERSION_KEYFRAME_INTERVAL, apply_patch, make_patch,
+    decode as decode_version_data, encode as encode_version_data,
+)
 
 # Choices for FieldDefinition.field_type
 FIELD_TYPE_CHOICES = [
@@ -26,6 +37,16 @@ FIELD_TYPE_CHOICES = [
     ('json', _('JSON')),
 ]
 
+# Typed ContentFieldIndex column used for each indexable field type
+INDEX_COLUMN_BY_FIELD_TYPE = {
+    'number': 'value_number',
+    'date': 'value_date',
+    'boolean': 'value_boolean',
+    'text': 'value_text',
+    'select': 'value_text',
+}
+INDEX_TEXT_MAX_LENGTH = 255
+
 # Choices for ContentInstance.status
 STATUS_DRAFT = 'draft'
 STATUS_IN_REVIEW = 'in_review'
@@ -132,7 +153,8 @@ class FieldDefinition(models.Model):
             "'default_value', 'help_text' (str), 'validation_rules' (e.g., min_length, max_length, regex), "
             "'localizable' (bool), 'select_options' (list for 'select' type), "
             "'allowed_content_types' (list of api_ids for 'relationship' type), "
-            "'allowed_media_types' (list for 'media' type)."
+            "'allowed_media_types' (list for 'media' type), "
+            "'indexed' (bool, number/date/boolean/text/select only: enables API filtering and ordering)."
         )
     )
     created_at = models.DateTimeField(auto_now_add=True)
@@ -160,6 +182,11 @@ class FieldDefinition(models.Model):
                  counter += 1
         super().save(*args, **kwargs)
 
+    def clean(self):
+        errors = validation_rules_errors((self.config or {}).get('validation_rules') or {})
+        if errors:
+            raise ValidationError({'config': errors})
+
     @property
     def is_localizable(self):
         return self.config.get('localizable', False)
@@ -168,6 +195,11 @@ class FieldDefinition(models.Model):
     def is_required(self):
         return self.config.get('required', False)
 
+    @property
+    def is_indexed(self):
+        """Whether typed ContentFieldIndex rows are maintained for this field."""
+        return bool(self.config.get('indexed', False)) and self.field_type in INDEX_COLUMN_BY_FIELD_TYPE
+
     # Add more property accessors for config flags as needed
 
 
@@ -258,6 +290,19 @@ class Term(models.Model):
         verbose_name=_("Parent Term"),
         help_text=_("Used for hierarchical taxonomies.")
     )
+    # Materialized path, kept in sync by save(): subtrees and ancestors in one query
+    path = models.TextField(
+        _("Path"),
+        editable=False,
+        default='',
+        help_text=_("IDs (hex) of the root term down to this term, each followed by '/'.")
+    )
+    depth = models.PositiveIntegerField(
+        _("Depth"),
+        editable=False,
+        default=0,
+        help_text=_("Number of ancestors (0 for root terms).")
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -266,6 +311,10 @@ class Term(models.Model):
         verbose_name_plural = _("Terms")
         ordering = ['taxonomy', 'translated_names'] # Order by default name? Needs refinement.
         # Ensure slug is unique within a language and taxonomy? Complex validation needed.
+        indexes = [
+            # Prefix (LIKE 'path%') lookups of subtrees
+            models.Index(fields=['path'], name='content_term_path_idx', opclasses=['text_pattern_ops']),
+        ]
 
     def __str__(self):
         # Return name in default language or first available
@@ -278,6 +327,8 @@ class Term(models.Model):
             raise ValidationError(_("Cannot assign parent to a term in a non-hierarchical taxonomy."))
         if self.parent and self.parent.taxonomy != self.taxonomy:
             raise ValidationError(_("Parent term must belong to the same taxonomy."))
+        if self.parent and self.pk and self.parent.is_below(self):
+            raise ValidationError(_("A term cannot be moved below itself or one of its descendants."))
         # Add validation for unique slugs per language within taxonomy if needed
 
     def save(self, *args, **kwargs):
@@ -285,7 +336,50 @@ class Term(models.Model):
         for lang_code, name in self.translated_names.items():
             if lang_code not in self.translated_slugs or not self.translated_slugs[lang_code]:
                 self.translated_slugs[lang_code] = slugify(name)
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' not in update_fields:
+            super().save(*args, **kwargs) # The position is unchanged
+            return
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'path', 'depth'}
+
+        previous = None if self._state.adding else Term.objects.filter(pk=self.pk).values_list('path', 'depth').first()
+        if self.parent_id:
+            parent_path, parent_depth = Term.objects.filter(pk=self.parent_id).values_list('path', 'depth').get()
+            if previous and parent_path.startswith(previous[0]):
+                raise ValueError("A term cannot be moved below itself or one of its descendants.")
+            self.path, self.depth = f"{parent_path}{self.pk.hex}/", parent_depth + 1
+        else:
+            self.path, self.depth = f"{self.pk.hex}/", 0
+        self._moved = previous is not None and previous[0] != self.path # See signals.term_moved_handler
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self._moved:
+                Term.move_subtree(previous[0], self.path, self.depth - previous[1])
+
+    @staticmethod
+    def move_subtree(old_path, new_path, depth_change):
+        """Rewrites the paths starting with `old_path` (a term's subtree) to start with `new_path`, in one UPDATE."""
+        return Term.objects.filter(path__startswith=old_path).update(
+            path=Concat(Value(new_path), Substr('path', len(old_path) + 1), output_field=models.TextField()),
+            depth=F('depth') + depth_change,
+        )
+
+    def is_below(self, term):
+        """Whether this term is `term` or one of its descendants."""
+        return self.path.startswith(term.path)
+
+    @property
+    def ancestor_ids(self):
+        """IDs of the ancestors, root first."""
+        return [uuid.UUID(segment) for segment in self.path.split('/')[:-2]]
+
+    def get_ancestors(self):
+        return Term.objects.filter(pk__in=self.ancestor_ids).order_by('depth')
+
+    def get_descendants(self):
+        """All terms below this one (in path order: each term is followed by its own subtree)."""
+        return Term.objects.filter(path__startswith=self.path, depth__gt=self.depth).order_by('path')
 
     def get_name(self, language_code=None):
         """Helper to get name in a specific language or fallback."""
@@ -346,6 +440,11 @@ class ContentInstance(models.Model):
         verbose_name = _("Content Instance")
         verbose_name_plural = _("Content Instances")
         ordering = ['-updated_at']
+        indexes = [
+            # Keyset pagination (see apps.core.pagination)
+            models.Index(fields=['-updated_at', '-id']),
+            models.Index(fields=['content_type', '-updated_at', '-id']),
+        ]
 
     def __str__(self):
         # Try to find a representative field (e.g., 'title', 'name') for display
@@ -426,9 +525,15 @@ class ContentFieldInstance(models.Model):
             raise ValidationError(_("Language is required for this localizable field."))
         if not self.field_definition.is_localizable and self.language is not None:
             raise ValidationError(_("Language must be null for non-localizable fields."))
-        # Add validation for the 'value' based on field_definition.field_type
-        # This requires more complex logic (e.g., check if value is int for 'number' type)
-        # This validation is better handled in forms/serializers or model save method.
+        # Validate the value with the compiled checks of its field (see apps.content.validation)
+        field = get_schema(self.field_definition.content_type_id).by_id.get(self.field_definition_id)
+        if field is None:
+            return
+        errors = field.validate(self.value)
+        if not errors:
+            errors = check_references([get_references(field, self.value)])[0].get(field.api_id, [])
+        if errors:
+            raise ValidationError({'value': errors})
 
     # Add methods to get/set typed values from JSON if needed
 
@@ -436,6 +541,9 @@ class ContentFieldInstance(models.Model):
 class ContentVersion(models.Model):
     """
     Stores a historical snapshot of a ContentInstance's data.
+    Snapshots are stored as periodic keyframes plus patches against the
+    previous version (see apps.content.versioning); `data_snapshot` is the
+    reconstructed full snapshot.
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     content_instance = models.ForeignKey(
@@ -444,11 +552,21 @@ class ContentVersion(models.Model):
         related_name='versions',
         verbose_name=_("Content Instance")
     )
-    # Store a snapshot of the relevant field data at the time of versioning
-    # Structure: {"lang_code": {"field_api_id": value, ...}, "non_localizable": {"field_api_id": value, ...}}
-    data_snapshot = models.JSONField(
-        _("Data Snapshot"),
-        help_text=_("Snapshot of content field instance data for this version.")
+    sequence = models.PositiveIntegerField(
+        _("Sequence"),
+        editable=False,
+        help_text=_("Position of the version in the instance's history, starting at 1.")
+    )
+    keyframe_sequence = models.PositiveIntegerField(
+        _("Keyframe Sequence"),
+        editable=False,
+        help_text=_("Sequence of the full snapshot this version is reconstructed from (its own for keyframes).")
+    )
+    # Structure of the snapshot: {"lang_code": {"field_api_id": value, ...}, "non_localizable": {"field_api_id": value, ...}}
+    data = models.BinaryField(
+        _("Data"),
+        editable=False,
+        help_text=_("Compressed JSON: the full snapshot for keyframes, otherwise a JSON Patch against the previous version.")
     )
     status_snapshot = models.CharField( # Store status at time of versioning
         _("Status Snapshot"),
@@ -473,23 +591,124 @@ class ContentVersion(models.Model):
         default=timezone.now # Use timezone.now for default
     )
 
+    _data_snapshot = None # Reconstructed snapshot, see load_snapshots
+
     class Meta:
         verbose_name = _("Content Version")
         verbose_name_plural = _("Content Versions")
         ordering = ['content_instance', '-created_at']
         indexes = [
-            models.Index(fields=['content_instance', '-created_at']),
+            # Also serves keyset pagination of an instance's history
+            models.Index(fields=['content_instance', '-created_at', '-id']),
+            models.Index(fields=['-created_at', '-id']),
+        ]
+        constraints = [
+            # Also serves the keyframe + patches range lookups of load_snapshots
+            models.UniqueConstraint(fields=['content_instance', 'sequence'], name='content_version_sequence_uniq'),
         ]
 
     def __str__(self):
         return f"Version of {self.content_instance} at {self.created_at}"
 
+    @property
+    def is_keyframe(self):
+        return self.sequence == self.keyframe_sequence
+
+    @property
+    def data_snapshot(self):
+        """The full snapshot of this version."""
+        if self._data_snapshot is None:
+            ContentVersion.load_snapshots([self])
+        return self._data_snapshot
+
     @staticmethod
+    @transaction.atomic
     def create_version(content_instance, user=None, message=""):
-        """Creates a new version snapshot for the given ContentInstance."""
-        snapshot = {'non_localizable': {}}
+        """
+        Creates a new version snapshot for the given ContentInstance. The
+        instance row is locked until the transaction ends, so concurrent saves
+        of the same instance number their versions one after the other.
+        """
+        ContentInstance.objects.select_for_update().only('pk').get(pk=content_instance.pk)
         field_instances = content_instance.field_instances.select_related('field_definition', 'language').all()
+        previous = content_instance.versions.order_by('-sequence').first()
+        version = ContentVersion.build_version(
+            content_instance, ContentVersion.build_snapshot(field_instances), previous,
+            status_snapshot=content_instance.status,
+            created_by=user,
+            version_message=message
+        )
+        version.save(force_insert=True)
+        return version
 
+    @staticmethod
+    def build_version(content_instance, snapshot, previous=None, **kwargs):
+        """
+        Returns an unsaved ContentVersion of `snapshot` following `previous` (the
+        instance's latest version, None for the first). It is stored as a patch
+        against `previous`, or as a keyframe when the keyframe interval is reached
+        or the patch would not be smaller.
+        """
+        if previous is None:
+            sequence, keyframe_sequence, data = 1, 1, encode_version_data(snapshot)
+        else:
+            sequence = previous.sequence + 1
+            keyframe_sequence, data = sequence, encode_version_data(snapshot)
+            if sequence - previous.keyframe_sequence < CONTENT_VERSION_KEYFRAME_INTERVAL:
+                patch = encode_version_data(make_patch(previous.data_snapshot, snapshot))
+                if len(patch) < len(data):
+                    keyframe_sequence, data = previous.keyframe_sequence, patch
+        version = ContentVersion(
+            content_instance=content_instance,
+            sequence=sequence,
+            keyframe_sequence=keyframe_sequence,
+            data=data,
+            **kwargs
+        )
+        version._data_snapshot = snapshot
+        return version
+
+    @staticmethod
+    def load_snapshots(versions):
+        """
+        Reconstructs `data_snapshot` for `versions` (e.g. a page, of any
+        instances) with one query fetching the keyframes and patches they need.
+        """
+        pending = [version for version in versions if version._data_snapshot is None]
+        if not pending:
+            return
+        ranges = {} # {content_instance_id: (first keyframe sequence, last sequence)}
+        for version in pending:
+            first, last = ranges.get(version.content_instance_id, (version.keyframe_sequence, version.sequence))
+            ranges[version.content_instance_id] = (
+                min(first, version.keyframe_sequence), max(last, version.sequence)
+            )
+        condition = models.Q()
+        for content_instance_id, (first, last) in ranges.items():
+            condition |= models.Q(content_instance_id=content_instance_id, sequence__range=(first, last))
+        wanted = {(version.content_instance_id, version.sequence) for version in pending}
+        snapshots = {}
+        snapshot = None
+        rows = (
+            ContentVersion.objects.filter(condition)
+            .order_by('content_instance_id', 'sequence')
+            .values_list('content_instance_id', 'sequence', 'keyframe_sequence', 'data')
+        )
+        for content_instance_id, sequence, keyframe_sequence, data in rows.iterator():
+            # Each instance's range starts with a keyframe
+            if sequence == keyframe_sequence:
+                snapshot = decode_version_data(data)
+            else:
+                snapshot = apply_patch(snapshot, decode_version_data(data))
+            if (content_instance_id, sequence) in wanted:
+                snapshots[(content_instance_id, sequence)] = snapshot
+        for version in pending:
+            version._data_snapshot = snapshots[(version.content_instance_id, version.sequence)]
+
+    @staticmethod
+    def build_snapshot(field_instances):
+        """Builds the data_snapshot structure from field instances (with field_definition and language loaded)."""
+        snapshot = {'non_localizable': {}}
         for fi in field_instances:
             fd_api_id = fi.field_definition.api_id
             if fi.language:
@@ -500,15 +719,322 @@ class ContentVersion(models.Model):
             else:
                 # Should only happen if field is not localizable
                 snapshot['non_localizable'][fd_api_id] = fi.value
+        return snapshot
 
-        version = ContentVersion.objects.create(
-            content_instance=content_instance,
-            data_snapshot=snapshot,
-            status_snapshot=content_instance.status,
-            created_by=user,
-            version_message=message
+
+class PublishedDocument(models.Model):
+    """
+    Denormalized, fully resolved representation of a published ContentInstance
+    for one language. Rebuilt whenever the instance is published or updated so
+    delivery reads are a single indexed row fetch instead of an EAV join.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    content_instance = models.ForeignKey(
+        ContentInstance,
+        on_delete=models.CASCADE,
+        related_name='published_documents',
+        verbose_name=_("Content Instance")
+    )
+    language = models.ForeignKey(
+        Language,
+        on_delete=models.CASCADE,
+        related_name='+', # No reverse relation needed from Language
+        verbose_name=_("Language")
+    )
+    # Same structure as ContentInstanceSerializer.content_data for this language
+    content_data = models.JSONField(
+        _("Content Data"),
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        help_text=_("Resolved field data (language fallback already applied).")
+    )
+    terms = models.JSONField(
+        _("Terms"),
+        default=list,
+        encoder=DjangoJSONEncoder,
+        help_text=_("Serialized taxonomy terms attached to the instance.")
+    )
+    layout = models.JSONField(
+        _("Layout"),
+        default=list,
+        encoder=DjangoJSONEncoder,
+        help_text=_("Serialized page components for layout-builder content types.")
+    )
+    built_at = models.DateTimeField(_("Built At"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Published Document")
+        verbose_name_plural = _("Published Documents")
+        # One document per instance per language; also serves as the lookup index
+        unique_together = ('content_instance', 'language')
+
+    def __str__(self):
+        return f"{self.content_instance_id} ({self.language_id})"
+
+    @staticmethod
+    def rebuild_for_instance(content_instance):
+        """
+        (Re)builds the documents for every active language of a ContentInstance.
+        Documents are removed when the instance is no longer published.
+        """
+        # Imported here to avoid a circular import (api imports models)
+        from .api import TermSerializer, PageComponentSerializer
+
+        if content_instance.status != STATUS_PUBLISHED:
+            PublishedDocument.objects.filter(content_instance=content_instance).delete()
+            return []
+
+        definitions = get_schema(content_instance.content_type_id).fields
+        field_instances = list(content_instance.field_instances.select_related('field_definition').all())
+        terms = TermSerializer(content_instance.terms.select_related('taxonomy').all(), many=True).data
+        layout = PageComponentSerializer(
+            content_instance.components.select_related('component_definition').order_by('order'), many=True
+        ).data
+        languages = Language.get_active()
+
+        documents = [
+            PublishedDocument(
+                content_instance=content_instance,
+                language=language,
+                content_data=resolve_content_data(
+                    definitions, field_instances, get_language_fallback_order(language.code)
+                ),
+                terms=terms,
+                layout=layout,
+            )
+            for language in languages
+        ]
+        # Replace existing rows in one pass (documents are derived data)
+        PublishedDocument.objects.filter(content_instance=content_instance).delete()
+        PublishedDocument.objects.bulk_create(documents)
+        return documents
+
+
+class ContentFieldIndex(models.Model):
+    """
+    Typed copy of a ContentFieldInstance value for fields with `config.indexed`.
+    ContentFieldInstance.value is untyped JSON, so filtering/ordering on it needs
+    a cast of every row; these columns are B-tree indexed per field instead.
+    Derived data: rebuilt from the field instances, never edited directly.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    content_instance = models.ForeignKey(
+        ContentInstance,
+        on_delete=models.CASCADE,
+        related_name='field_index_entries',
+        verbose_name=_("Content Instance")
+    )
+    field_definition = models.ForeignKey(
+        FieldDefinition,
+        on_delete=models.CASCADE,
+        related_name='+', # No reverse relation needed from FieldDefinition
+        verbose_name=_("Field Definition")
+    )
+    language = models.ForeignKey(
+        Language,
+        on_delete=models.CASCADE,
+        null=True, # Null for non-localizable fields
+        blank=True,
+        related_name='+', # No reverse relation needed from Language
+        verbose_name=_("Language")
+    )
+    # Only the column matching the field type is set
+    value_number = models.FloatField(_("Number Value"), null=True, blank=True)
+    value_date = models.DateTimeField(_("Date Value"), null=True, blank=True)
+    value_boolean = models.BooleanField(_("Boolean Value"), null=True, blank=True)
+    value_text = models.CharField(
+        _("Text Value"), max_length=INDEX_TEXT_MAX_LENGTH, null=True, blank=True,
+        help_text=_("Truncated to the first 255 characters.")
+    )
+
+    class Meta:
+        verbose_name = _("Content Field Index")
+        verbose_name_plural = _("Content Field Index")
+        unique_together = ('content_instance', 'field_definition', 'language')
+        indexes = [
+            models.Index(fields=['field_definition', 'language', 'value_number']),
+            models.Index(fields=['field_definition', 'language', 'value_date']),
+            models.Index(fields=['field_definition', 'language', 'value_boolean']),
+            models.Index(fields=['field_definition', 'language', 'value_text']),
+        ]
+
+    def __str__(self):
+        return f"{self.content_instance_id} - {self.field_definition_id} ({self.language_id})"
+
+    @staticmethod
+    def from_field_instance(field_instance, definition):
+        """Builds the (unsaved) index row for a field instance, or None if its value has no typed form."""
+        column = INDEX_COLUMN_BY_FIELD_TYPE[definition.field_type]
+        typed_value = coerce_index_value(definition.field_type, field_instance.value)
+        if typed_value is None:
+            return None
+        return ContentFieldIndex(
+            content_instance_id=field_instance.content_instance_id,
+            field_definition=definition,
+            language_id=field_instance.language_id,
+            **{column: typed_value}
         )
-        return version
+
+    @staticmethod
+    def rebuild_for_instance(content_instance):
+        """(Re)builds the index rows for all indexed fields of a ContentInstance."""
+        definitions = {field.id: field.definition for field in get_schema(content_instance.content_type_id).indexed}
+        ContentFieldIndex.objects.filter(content_instance=content_instance).delete()
+        if not definitions:
+            return []
+        field_instances = ContentFieldInstance.objects.filter(
+            content_instance=content_instance, field_definition_id__in=definitions.keys()
+        )
+        rows = [
+            ContentFieldIndex.from_field_instance(fi, definitions[fi.field_definition_id])
+            for fi in field_instances
+        ]
+        return ContentFieldIndex.objects.bulk_create([row for row in rows if row is not None])
+
+    @staticmethod
+    def rebuild_for_field(definition, batch_size=1000):
+        """(Re)builds the index rows of one field across all content (backfill)."""
+        ContentFieldIndex.objects.filter(field_definition=definition).delete()
+        if not definition.is_indexed:
+            return 0
+        count = 0
+        batch = []
+        field_instances = ContentFieldInstance.objects.filter(field_definition=definition)
+        for fi in field_instances.iterator(chunk_size=batch_size):
+            row = ContentFieldIndex.from_field_instance(fi, definition)
+            if row is not None:
+                batch.append(row)
+            if len(batch) >= batch_size:
+                ContentFieldIndex.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            ContentFieldIndex.objects.bulk_create(batch)
+            count += len(batch)
+        return count
+
+
+def coerce_index_value(field_type, value):
+    """
+    Converts a stored (JSON) or query string value to the Python type of its
+    ContentFieldIndex column. Returns None if it cannot be converted.
+    """
+    if value is None or value == '':
+        return None
+    if field_type == 'number':
+        if isinstance(value, bool):
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if field_type == 'date':
+        if not isinstance(value, str):
+            return None
+        try:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                parsed_date = parse_date(value)
+                if parsed_date is None:
+                    return None
+                parsed = datetime.datetime.combine(parsed_date, datetime.time.min)
+        except ValueError:
+            return None
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+    if field_type == 'boolean':
+        if isinstance(value, bool):
+            return value
+        normalized = str(value).strip().lower()
+        if normalized in ('true', '1', 'yes'):
+            return True
+        if normalized in ('false', '0', 'no'):
+            return False
+        return None
+    if field_type in ('text', 'select'):
+        if isinstance(value, (dict, list)):
+            return None
+        return str(value)[:INDEX_TEXT_MAX_LENGTH]
+    return None
+
+
+def get_language_fallback_order(requested_lang_code=None):
+    """
+    Returns the ordered list of language codes tried when resolving a localizable field:
+    requested locale, its base language, site default, base of site default.
+    """
+    if not requested_lang_code:
+        requested_lang_code = settings.LANGUAGE_CODE # Site default
+
+    base_lang_code = requested_lang_code.split('-')[0]
+    site_default_lang_code = settings.LANGUAGE_CODE
+    fallback_order = [requested_lang_code]
+    if base_lang_code != requested_lang_code:
+        fallback_order.append(base_lang_code)
+    if site_default_lang_code not in fallback_order:
+         fallback_order.append(site_default_lang_code)
+    # Add base of site default if different
+    site_default_base = site_default_lang_code.split('-')[0]
+    if site_default_base not in fallback_order:
+        fallback_order.append(site_default_base)
+    return fallback_order
+
+
+def resolve_content_data(definitions, field_instances, fallback_order):
+    """
+    Structures field instance values for output, applying language fallback.
+    Localizable fields resolve to {"value": ..., "language": ...} (or None),
+    non-localizable fields resolve to their stored value.
+    """
+    # Group instances by field definition API ID and language code
+    instances_map = {} # { "field_api_id": { "lang_code": value, ... }, ... }
+    non_localizable_map = {} # { "field_api_id": value }
+
+    for fi in field_instances:
+        api_id = fi.field_definition.api_id
+        if fi.language_id: # Localizable (language_id is the language code)
+            if api_id not in instances_map:
+                instances_map[api_id] = {}
+            instances_map[api_id][fi.language_id] = fi.value
+        else: # Non-localizable
+            non_localizable_map[api_id] = fi.value
+
+    structured_fields = {}
+    # Iterate through definitions to ensure all fields are considered
+    for definition in definitions:
+        api_id = definition.api_id
+        if definition.is_localizable:
+            found_value = None
+            found_lang_code = None
+            # Try fallbacks in order
+            lang_values = instances_map.get(api_id, {})
+            for lang_code in fallback_order:
+                if lang_code in lang_values:
+                    found_value = lang_values[lang_code]
+                    found_lang_code = lang_code
+                    break
+            # Final fallback: first available language for this field
+            if found_value is None and lang_values:
+                 first_lang = next(iter(lang_values.keys()))
+                 found_value = lang_values[first_lang]
+                 found_lang_code = first_lang
+
+            # Structure output to include value and language it came from
+            if found_value is not None:
+                 structured_fields[api_id] = {
+                     "value": found_value,
+                     "language": found_lang_code
+                 }
+            else:
+                 structured_fields[api_id] = None # Or {"value": None, "language": None}
+
+        else:
+            # Non-localizable field
+            structured_fields[api_id] = non_localizable_map.get(api_id) # Value is directly stored
+
+    return structured_fields
+
 
 # Utility function to get the actual value storage field based on type
 # (Not needed if using single JSON 'value' field)
@@ -0,0 +1,110 @@
+"""
+Reverting a ContentInstance to one of its versions
+(POST /content-instances/<id>/versions/<version_id>/revert/).
+
+The version's snapshot is applied in one transaction with a single pass over
+the instance's field instances (one bulk UPDATE, INSERT and DELETE), then the
+instance is saved once, so a revert creates one new version and emits one
+webhook event however many fields it restores. The status is kept. The
+restored values are validated like content_data on writes (see
+apps.content.validation), against the current schema and referenced objects.
+"""
+from django.db import transaction
+
+from apps.core.models import Language
+from .models import ContentFieldInstance, ContentFieldIndex, ContentVersion, PublishedDocument
+from .schema import get_schema
+from .validation import check_references, validate_content_data
+from .versioning import NON_LOCALIZABLE
+
+
+class RevertError(ValueError):
+    """The version's values are not valid now; `errors` lists messages keyed by field api_id."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def get_snapshot_data(schema, snapshot, languages):
+    """
+    The values of `snapshot` that fit the current schema, as content_data
+    ({field api_id: value}, or {language code: value} for localizable fields):
+    fields deleted since, inactive languages and values whose field changed
+    localizability are skipped.
+    """
+    content_data = {}
+    for group, group_values in snapshot.items():
+        localized = group != NON_LOCALIZABLE
+        if localized and group not in languages:
+            continue
+        for api_id, value in (group_values or {}).items():
+            field = schema.get(api_id)
+            if field is None or field.is_localizable != localized:
+                continue
+            if localized:
+                content_data.setdefault(api_id, {})[group] = value
+            else:
+                content_data[api_id] = value
+    return content_data
+
+
+@transaction.atomic
+def revert_to_version(content_instance, version, user=None):
+    """
+    Restores the field values of `version` on `content_instance`. Values of
+    fields or languages the snapshot does not cover are deleted, except for
+    inactive languages (left untouched). Returns the new ContentVersion.
+    Raises RevertError, changing nothing, if the restored values would not be
+    valid (e.g. a field became required or a referenced object was deleted).
+    """
+    schema = get_schema(content_instance.content_type_id)
+    languages = {language.code: language for language in Language.get_active()}
+    field_values, references, errors = validate_content_data(
+        schema, get_snapshot_data(schema, version.data_snapshot, languages), languages
+    )
+    if not errors:
+        errors = check_references([references])[0]
+    if errors:
+        raise RevertError(errors)
+    wanted = {
+        (field.id, language.code if language is not None else None): (field, value)
+        for field, language, value in field_values
+    }
+
+    to_update = []
+    to_delete = []
+    for fi in content_instance.field_instances.all():
+        key = (fi.field_definition_id, fi.language_id)
+        if key in wanted:
+            field, value = wanted.pop(key)
+            if fi.value != value:
+                fi.value = value
+                to_update.append(fi)
+        elif fi.language_id is None or fi.language_id in languages:
+            to_delete.append(fi.pk)
+    to_create = [
+        ContentFieldInstance(
+            content_instance=content_instance,
+            field_definition=field.definition,
+            language=languages[lang_code] if lang_code else None,
+            value=value,
+        )
+        for (__, lang_code), (field, value) in wanted.items()
+    ]
+
+    if to_update:
+        ContentFieldInstance.objects.bulk_update(to_update, ['value'])
+    if to_create:
+        ContentFieldInstance.objects.bulk_create(to_create)
+    if to_delete:
+        ContentFieldInstance.objects.filter(pk__in=to_delete).delete()
+    ContentFieldIndex.rebuild_for_instance(content_instance)
+
+    # A single save: updated_at, response cache invalidation and one webhook event
+    content_instance.save()
+    new_version = ContentVersion.create_version(
+        content_instance, user=user, message=f"Reverted to version {version.sequence}"
+    )
+    PublishedDocument.rebuild_for_instance(content_instance)
+    return new_version
@@ -0,0 +1,121 @@
+"""
+Compiled content type schemas.
+
+Read and write paths need the field definitions of a content type, looked up
+by api_id, with their `config` flags evaluated and value checks compiled. get_schema() returns them
+compiled into an immutable CompiledSchema, cached per worker process and in the
+shared cache (see apps.core.cache.VersionedLocalCache). Each content type has a
+version stamp in the shared cache, bumped when the content type or one of its
+field definitions changes (see apps.content.signals), so all workers rebuild
+the schema on their next lookup. A transaction that changed a schema compiles it
+uncached until it ends, so a rollback leaves no trace in either cache.
+"""
+from types import MappingProxyType
+
+from apps.core.cache import VersionedLocalCache
+from .validation import compile_reference_check, compile_validator
+
+schema_cache = VersionedLocalCache('content_schema', max_entries=500)
+
+
+def schema_tag(content_type_id):
+    return f"content_schema:{content_type_id}"
+
+
+class Immutable:
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+class CompiledField(Immutable):
+    """
+    One field of a CompiledSchema. Exposes the attributes of the FieldDefinition
+    used by read/write paths (e.g. by resolve_content_data); the model instance
+    itself is `definition` (for foreign keys). `validate` and `check_reference`
+    are its compiled value checks (see apps.content.validation).
+    """
+    __slots__ = (
+        'definition', 'id', 'api_id', 'name', 'field_type', 'order', 'config',
+        'is_localizable', 'is_required', 'is_indexed', 'validate', 'check_reference',
+    )
+
+    def __init__(self, definition):
+        values = {
+            'definition': definition,
+            'id': definition.pk,
+            'api_id': definition.api_id,
+            'name': definition.name,
+            'field_type': definition.field_type,
+            'order': definition.order,
+            'config': MappingProxyType(dict(definition.config or {})),
+            'is_localizable': bool(definition.is_localizable),
+            'is_required': bool(definition.is_required),
+            'is_indexed': definition.is_indexed,
+            'validate': compile_validator(definition.field_type, definition.config or {}),
+            'check_reference': compile_reference_check(definition.field_type, definition.config or {}),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __reduce__(self):
+        return CompiledField, (self.definition,)
+
+    def __repr__(self):
+        return f"<CompiledField {self.api_id} ({self.field_type})>"
+
+
+class CompiledSchema(Immutable):
+    """The fields of a content type, in definition order, with lookups by api_id and id."""
+    __slots__ = ('content_type_id', 'fields', 'by_api_id', 'by_id', 'localizable', 'required', 'indexed')
+
+    def __init__(self, content_type_id, definitions):
+        fields = tuple(CompiledField(definition) for definition in definitions)
+        values = {
+            'content_type_id': content_type_id,
+            'fields': fields,
+            'by_api_id': MappingProxyType({field.api_id: field for field in fields}),
+            'by_id': MappingProxyType({field.id: field for field in fields}),
+            'localizable': frozenset(field.api_id for field in fields if field.is_localizable),
+            'required': tuple(field for field in fields if field.is_required),
+            'indexed': tuple(field for field in fields if field.is_indexed),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __reduce__(self):
+        return CompiledSchema, (self.content_type_id, [field.definition for field in self.fields])
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def get(self, api_id):
+        return self.by_api_id.get(api_id)
+
+
+def get_schema(content_type, memo=None):
+    """
+    Returns the CompiledSchema of a ContentType (instance or primary key).
+    `memo` is an optional dict living as long as a request (e.g. serializer
+    context), sparing repeated version checks for the same content type.
+    """
+    from .models import FieldDefinition
+
+    content_type_id = getattr(content_type, 'pk', content_type)
+    if memo is not None and content_type_id in memo:
+        return memo[content_type_id]
+
+    def build():
+        # FieldDefinition.Meta.ordering: order, then name
+        return CompiledSchema(content_type_id, FieldDefinition.objects.filter(content_type_id=content_type_id))
+    schema = schema_cache.get_or_set(str(content_type_id), [schema_tag(content_type_id)], build)
+    if memo is not None:
+        memo[content_type_id] = schema
+    return schema
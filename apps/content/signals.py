@@ -0,0 +1,171 @@
+import logging
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver, Signal
+
+from .models import ContentType, ContentInstance, FieldDefinition, Term, STATUS_PUBLISHED
+from .tasks import (
+    queue_published_document_rebuild, rebuild_published_documents, rebuild_published_documents_on_commit,
+    rebuild_field_index
+)
+from .cache import (
+    ALL_CONTENT_INSTANCES_TAG, TERM_TREE_TAG, content_instance_tag, content_type_tag,
+    term_tag, media_tag, component_definition_tag
+)
+from .schema import schema_tag
+from apps.core.cache import invalidate_tags_on_commit, invalidate_tags_now_and_on_commit
+# Import component models (components app depends on content, not the other way round)
+from apps.components.models import PageComponent, ComponentDefinition
+from apps.media.models import MediaAsset
+
+logger = logging.getLogger(__name__)
+
+# Sent (after commit) for each batch written by the bulk ingestion endpoint, which
+# bypasses per-instance post_save. kwargs: instance_ids, content_type_api_ids, published_ids
+content_batch_ingested = Signal()
+
+# --- PublishedDocument maintenance ---
+# Instance saves rebuild their own documents (see ContentInstanceSerializer);
+# the handlers below cover shared data embedded in those documents.
+
+@receiver(post_save, sender=PageComponent)
+@receiver(post_delete, sender=PageComponent)
+def page_component_changed_handler(sender, instance, **kwargs):
+    """Rebuild the page's documents when one of its layout components changes."""
+    # Skip cascades triggered by deleting the page itself
+    origin = kwargs.get('origin')
+    if isinstance(origin, ContentInstance) or getattr(origin, 'model', None) is ContentInstance:
+        return
+    rebuild_published_documents_on_commit(instance.page_id)
+
+
+@receiver(post_save, sender=Term)
+def term_post_save_handler(sender, instance, created, **kwargs):
+    """Term names/slugs are embedded in documents of the instances using the term."""
+    if created:
+        return
+    transaction.on_commit(
+        lambda: queue_published_document_rebuild(ContentInstance.objects.filter(terms=instance))
+    )
+
+
+@receiver(pre_delete, sender=Term)
+def term_pre_delete_handler(sender, instance, **kwargs):
+    """
+    Documents embed the deleted term, and its children (detached from it) with
+    their parent_id. The instances are collected now: the term's m2m rows are
+    gone by post_delete.
+    """
+    instance_ids = [
+        str(pk) for pk in ContentInstance.objects.filter(
+            status=STATUS_PUBLISHED, terms__in=Term.objects.filter(Q(pk=instance.pk) | Q(parent=instance))
+        ).values_list('id', flat=True).distinct()
+    ]
+    if instance_ids:
+        transaction.on_commit(lambda: rebuild_published_documents.delay(instance_ids))
+
+
+# --- Term hierarchy (see Term.path) ---
+
+@receiver(post_delete, sender=Term)
+def term_post_delete_handler(sender, instance, **kwargs):
+    """The children of a deleted term were detached (parent SET_NULL): make their subtrees roots."""
+    children = Term.objects.filter(path__startswith=instance.path, depth=instance.depth + 1)
+    for child_id, child_path in children.values_list('pk', 'path'):
+        Term.move_subtree(child_path, f"{child_id.hex}/", -(instance.depth + 1))
+    invalidate_tags_on_commit(TERM_TREE_TAG)
+
+
+@receiver(post_save, sender=Term)
+def term_moved_handler(sender, instance, **kwargs):
+    """Results filtered by an ancestor of the old or new position change."""
+    if getattr(instance, '_moved', False):
+        invalidate_tags_on_commit(TERM_TREE_TAG)
+
+
+@receiver(post_save, sender=FieldDefinition)
+@receiver(post_delete, sender=FieldDefinition)
+def field_definition_changed_handler(sender, instance, **kwargs):
+    """A schema change affects the resolved data of every instance of the content type."""
+    content_type_id = instance.content_type_id
+    logger.info(f"Field definition {instance.api_id} changed, rebuilding documents for content type {content_type_id}.")
+    transaction.on_commit(
+        lambda: queue_published_document_rebuild(ContentInstance.objects.filter(content_type_id=content_type_id))
+    )
+
+
+# --- ContentFieldIndex maintenance ---
+# Instance saves rebuild their own index rows (see ContentInstanceSerializer);
+# enabling/retyping an indexed field needs a backfill across all its values.
+
+@receiver(pre_save, sender=FieldDefinition)
+def field_definition_pre_save_handler(sender, instance, **kwargs):
+    """Remember the previous index settings to detect changes on save."""
+    previous = FieldDefinition.objects.filter(pk=instance.pk).first()
+    instance._previous_index_state = (previous.is_indexed, previous.field_type) if previous else (False, None)
+
+
+@receiver(post_save, sender=FieldDefinition)
+def field_definition_index_handler(sender, instance, **kwargs):
+    previous_state = getattr(instance, '_previous_index_state', (False, None))
+    if not instance.is_indexed and not previous_state[0]:
+        return # Never indexed, nothing to (re)build or drop
+    if previous_state == (instance.is_indexed, instance.field_type):
+        return
+    field_definition_id = str(instance.pk)
+    logger.info(f"Index settings of field {instance.api_id} changed, rebuilding its field index.")
+    transaction.on_commit(lambda: rebuild_field_index.delay(field_definition_id))
+
+
+# --- Response cache invalidation (see apps.content.cache) ---
+
+@receiver(post_save, sender=ContentInstance)
+@receiver(post_delete, sender=ContentInstance)
+def content_instance_cache_handler(sender, instance, **kwargs):
+    invalidate_tags_on_commit(
+        content_instance_tag(instance.pk),
+        content_type_tag(instance.content_type.api_id),
+        ALL_CONTENT_INSTANCES_TAG,
+    )
+
+
+@receiver(post_save, sender=ContentType)
+@receiver(post_delete, sender=ContentType)
+def content_type_cache_handler(sender, instance, **kwargs):
+    invalidate_tags_on_commit(content_type_tag(instance.api_id))
+    invalidate_tags_now_and_on_commit(schema_tag(instance.pk))
+
+
+@receiver(post_save, sender=FieldDefinition)
+@receiver(post_delete, sender=FieldDefinition)
+def field_definition_cache_handler(sender, instance, **kwargs):
+    invalidate_tags_on_commit(content_type_tag(instance.content_type.api_id))
+    invalidate_tags_now_and_on_commit(schema_tag(instance.content_type_id))
+
+
+@receiver(post_save, sender=Term)
+@receiver(post_delete, sender=Term)
+def term_cache_handler(sender, instance, **kwargs):
+    invalidate_tags_on_commit(term_tag(instance.pk))
+
+
+@receiver(post_save, sender=MediaAsset)
+@receiver(post_delete, sender=MediaAsset)
+def media_asset_cache_handler(sender, instance, **kwargs):
+    invalidate_tags_on_commit(media_tag(instance.pk))
+
+
+@receiver(pre_save, sender=ComponentDefinition)
+def component_definition_pre_save_handler(sender, instance, **kwargs):
+    """Remember the previous api_id so responses tagged with it are invalidated on rename."""
+    instance._previous_api_id = ComponentDefinition.objects.filter(
+        pk=instance.pk
+    ).values_list('api_id', flat=True).first()
+
+
+@receiver(post_save, sender=ComponentDefinition)
+@receiver(post_delete, sender=ComponentDefinition)
+def component_definition_cache_handler(sender, instance, **kwargs):
+    api_ids = {instance.api_id, getattr(instance, '_previous_api_id', None)} - {None}
+    invalidate_tags_on_commit(*[component_definition_tag(api_id) for api_id in api_ids])
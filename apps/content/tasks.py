@@ -0,0 +1,80 @@
+import logging
+import threading
+from celery import shared_task
+from django.db import transaction
+
+from .models import ContentInstance, FieldDefinition, PublishedDocument, ContentFieldIndex, STATUS_PUBLISHED
+from .cache import content_instance_tag, content_type_tag
+from apps.core.cache import invalidate_tags
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def rebuild_published_documents(instance_ids):
+    """
+    Celery task to rebuild the PublishedDocument rows of the given ContentInstances.
+    Used when a shared dependency (term, field definition, component) changes.
+    """
+    instances = ContentInstance.objects.filter(id__in=instance_ids).select_related('content_type')
+    count = 0
+    for instance in instances.iterator(chunk_size=200):
+        PublishedDocument.rebuild_for_instance(instance)
+        # Cached responses embed the documents
+        invalidate_tags(content_instance_tag(instance.pk))
+        count += 1
+    logger.info(f"Rebuilt published documents for {count} content instance(s).")
+    return f"Rebuilt {count} instance(s)."
+
+
+def queue_published_document_rebuild(queryset):
+    """Queues a rebuild for the published instances in the given ContentInstance queryset."""
+    instance_ids = [
+        str(pk) for pk in queryset.filter(status=STATUS_PUBLISHED).values_list('id', flat=True)
+    ]
+    if instance_ids:
+        rebuild_published_documents.delay(instance_ids)
+
+
+_pending_rebuilds = threading.local()
+
+
+def rebuild_published_documents_on_commit(instance_id):
+    """
+    Rebuilds an instance's documents once the current transaction commits.
+    Calls for the same instance within a transaction (e.g. one per saved
+    layout component, plus the admin's save_related) result in one rebuild.
+    """
+    pending = getattr(_pending_rebuilds, 'ids', None)
+    if pending is None:
+        pending = _pending_rebuilds.ids = set()
+    pending.add(instance_id)
+    # Registered per call: callbacks of a rolled back transaction are dropped,
+    # so the first callback to run rebuilds whatever is pending and the rest are no-ops
+    transaction.on_commit(_rebuild_pending_documents)
+
+
+def _rebuild_pending_documents():
+    instance_ids = getattr(_pending_rebuilds, 'ids', None)
+    if not instance_ids:
+        return
+    _pending_rebuilds.ids = set()
+    for instance in ContentInstance.objects.filter(id__in=instance_ids).select_related('content_type'):
+        PublishedDocument.rebuild_for_instance(instance)
+        invalidate_tags(content_instance_tag(instance.pk))
+
+
+@shared_task
+def rebuild_field_index(field_definition_id):
+    """
+    Celery task to backfill (or drop) the ContentFieldIndex rows of a field
+    after its `indexed` flag or type changed.
+    """
+    try:
+        definition = FieldDefinition.objects.select_related('content_type').get(pk=field_definition_id)
+    except FieldDefinition.DoesNotExist:
+        return "Field definition no longer exists." # Rows were removed by the cascade
+    count = ContentFieldIndex.rebuild_for_field(definition)
+    # Cached responses filtered/ordered by this field are now stale
+    invalidate_tags(content_type_tag(definition.content_type.api_id))
+    logger.info(f"Rebuilt {count} field index row(s) for field {definition.api_id}.")
+    return f"Indexed {count} value(s)."
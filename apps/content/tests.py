@@ -1,3 +1,960 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import tempfile
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.http import StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.core.models import Language
+from apps.users.models import CMSUser
+from apps.components.models import ComponentDefinition, PageComponent
+from apps.media.models import MediaAsset
+from .models import (
+    ContentType, FieldDefinition, Taxonomy, Term, ContentInstance,
+    ContentFieldInstance, ContentFieldIndex, ContentVersion, PublishedDocument, STATUS_DRAFT, STATUS_PUBLISHED
+)
+from .cache import response_cache_key
+from .filters import IndexedFieldFilter, IndexedFieldOrderingFilter
+from .views import ContentInstanceViewSet
+from .diff import word_diff
+from .schema import get_schema, schema_cache
+from .tasks import rebuild_published_documents
+from .validation import compile_validator
+from .versioning import apply_patch, make_patch
+
+
+# The response cache would hide the queries made by the serializer
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class ContentInstanceListQueryCountTests(TestCase):
+    """List responses must be serialized in a fixed number of queries per page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CMSUser.objects.create_superuser(
+            email='editor@example.com', password='password', first_name='Ed', last_name='Itor'
+        )
+        cls.en = Language.objects.create(code='en', name='English', is_default=True)
+        cls.fr = Language.objects.create(code='fr', name='French')
+        cls.content_type = ContentType.objects.create(name='Page')
+        cls.title = FieldDefinition.objects.create(
+            content_type=cls.content_type, name='Title', field_type='text', config={'localizable': True}
+        )
+        cls.body = FieldDefinition.objects.create(
+            content_type=cls.content_type, name='Body', field_type='textarea'
+        )
+        taxonomy = Taxonomy.objects.create(name='Tags')
+        cls.terms = [
+            Term.objects.create(taxonomy=taxonomy, translated_names={'en': name}, translated_slugs={'en': name})
+            for name in ('news', 'sports')
+        ]
+        cls.component_definition = ComponentDefinition.objects.create(name='Hero Banner', api_id='hero_banner')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_instances(self, count):
+        for i in range(count):
+            # Alternate statuses to cover both the published document and the live path
+            status = STATUS_PUBLISHED if i % 2 else STATUS_DRAFT
+            instance = ContentInstance.objects.create(
+                content_type=self.content_type, author=self.user, status=status
+            )
+            ContentFieldInstance.objects.create(
+                content_instance=instance, field_definition=self.title, language=self.en, value=f'Title {i}'
+            )
+            ContentFieldInstance.objects.create(
+                content_instance=instance, field_definition=self.title, language=self.fr, value=f'Titre {i}'
+            )
+            ContentFieldInstance.objects.create(
+                content_instance=instance, field_definition=self.body, value='Body'
+            )
+            instance.terms.set(self.terms)
+            PageComponent.objects.create(
+                page=instance, component_definition=self.component_definition, order=0, data={'heading': 'Hi'}
+            )
+            PublishedDocument.rebuild_for_instance(instance)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/content-instances/', {'lang': 'fr'})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.create_instances(2)
+        small_page_queries, response = self.count_list_queries()
+        self.assertEqual(len(response.data['results']), 2)
+
+        self.create_instances(8)
+        large_page_queries, response = self.count_list_queries()
+        self.assertEqual(len(response.data['results']), 10)
+
+        self.assertEqual(small_page_queries, large_page_queries)
+
+    def test_published_page_does_not_read_field_instances(self):
+        self.create_instances(6)
+        ContentInstance.objects.update(status=STATUS_PUBLISHED)
+        for instance in ContentInstance.objects.all():
+            PublishedDocument.rebuild_for_instance(instance)
+
+        # Savepoint and release (ATOMIC_REQUESTS), count, page, author roles, documents, media fields
+        with self.assertNumQueries(7), CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/content-instances/', {'lang': 'fr'})
+
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertTrue(all(item['content_data']['title']['value'].startswith('Titre') for item in response.data['results']))
+        for table in ('content_contentfieldinstance', 'content_contentinstance_terms', 'components_pagecomponent'):
+            self.assertFalse([query['sql'] for query in queries if table in query['sql']])
+
+    def test_content_data_is_resolved_for_both_paths(self):
+        self.create_instances(2)
+        _, response = self.count_list_queries()
+        for item in response.data['results']:
+            self.assertTrue(item['content_data']['title']['value'].startswith('Titre'))
+            self.assertEqual(len(item['terms_detail']), 2)
+            self.assertEqual(item['layout_components'][0]['component_api_id'], 'hero_banner')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PublishedDocumentMaintenanceTests(TestCase):
+    """Shared data embedded in published documents must be rebuilt when it changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CMSUser.objects.create_superuser(email='editor@example.com', password='password')
+        Language.objects.create(code='en', name='English', is_default=True)
+        cls.content_type = ContentType.objects.create(name='Page')
+        cls.taxonomy = Taxonomy.objects.create(name='Tags')
+        cls.component_definition = ComponentDefinition.objects.create(name='Hero Banner', api_id='hero_banner')
+
+    def setUp(self):
+        self.instance = ContentInstance.objects.create(
+            content_type=self.content_type, author=self.user, status=STATUS_PUBLISHED
+        )
+
+    def test_deleting_a_term_rebuilds_documents(self):
+        parent = Term.objects.create(taxonomy=self.taxonomy, translated_names={'en': 'news'})
+        child = Term.objects.create(taxonomy=self.taxonomy, parent=parent, translated_names={'en': 'local'})
+        self.instance.terms.set([parent, child])
+        PublishedDocument.rebuild_for_instance(self.instance)
+
+        with mock.patch.object(rebuild_published_documents, 'delay', side_effect=rebuild_published_documents):
+            with self.captureOnCommitCallbacks(execute=True):
+                parent.delete()
+
+        [document] = PublishedDocument.objects.filter(content_instance=self.instance)
+        self.assertEqual(document.terms, [dict(document.terms[0], id=str(child.pk), parent_id=None)])
+
+    def test_component_changes_rebuild_once_after_commit(self):
+        with mock.patch.object(PublishedDocument, 'rebuild_for_instance') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                for order in range(3):
+                    PageComponent.objects.create(
+                        page=self.instance, component_definition=self.component_definition, order=order
+                    )
+                self.assertFalse(rebuild.called)
+        self.assertEqual(rebuild.call_count, 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CMSUser.objects.create_superuser(email='editor@example.com', password='password')
+        Language.objects.create(code='en', name='English', is_default=True)
+        cls.content_type = ContentType.objects.create(name='Page')
+        for __ in range(5):
+            ContentInstance.objects.create(content_type=cls.content_type, author=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, **params):
+        return self.client.get('/api/v1/content-instances/', {'pagination': 'cursor', 'page_size': 2, **params})
+
+    def cursor(self, values, reverse=False):
+        token = json.dumps({'v': values, 'r': int(reverse)})
+        return base64.urlsafe_b64encode(token.encode('ascii')).decode('ascii')
+
+    def test_pages_cover_every_row_once(self):
+        ids = []
+        response = self.get()
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        expected = ContentInstance.objects.order_by('-updated_at', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, [str(pk) for pk in expected])
+
+    def test_cursor_with_invalid_values_is_not_found(self):
+        for values in (['2024-01-01T00:00:00+00:00', 'not-a-uuid'], ['yesterday', str(uuid.uuid4())], [None, None]):
+            with self.subTest(values=values):
+                self.assertEqual(self.get(cursor=self.cursor(values)).status_code, 404)
+
+    def test_other_ordering_is_rejected(self):
+        self.assertEqual(self.get(ordering='created_at').status_code, 400)
+        self.assertEqual(self.get(ordering='-updated_at,-id').status_code, 200)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class IndexedFieldFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = CMSUser.objects.create_superuser(email='editor@example.com', password='password')
+        Language.objects.create(code='en', name='English', is_default=True)
+        cls.content_type = ContentType.objects.create(name='Product', api_id='product')
+        price = FieldDefinition.objects.create(
+            content_type=cls.content_type, name='Price', field_type='number', config={'indexed': True}
+        )
+        cls.instances = []
+        for value in (5, 50, 500):
+            instance = ContentInstance.objects.create(content_type=cls.content_type, author=user)
+            ContentFieldInstance.objects.create(content_instance=instance, field_definition=price, value=value)
+            ContentFieldIndex.rebuild_for_instance(instance)
+            cls.instances.append(instance)
+
+    def test_same_request_filters_several_querysets(self):
+        request = Request(APIRequestFactory().get(
+            '/', {'content_type': 'product', 'filter[price__lt]': '100', 'ordering': '-field.price'}
+        ))
+        view = ContentInstanceViewSet()
+        for __ in range(2):
+            queryset = ContentInstance.objects.all()
+            queryset = IndexedFieldFilter().filter_queryset(request, queryset, view)
+            queryset = IndexedFieldOrderingFilter().filter_queryset(request, queryset, view)
+            self.assertEqual(list(queryset), [self.instances[1], self.instances[0]])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BulkIngestTests(TestCase):
+    url = '/api/v1/content-instances/bulk/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CMSUser.objects.create_superuser(email='editor@example.com', password='password')
+        Language.objects.create(code='en', name='English', is_default=True)
+        cls.content_type = ContentType.objects.create(name='Blog Post', api_id='blog-post')
+        FieldDefinition.objects.create(
+            content_type=cls.content_type, name='Title', api_id='title', field_type='text',
+            config={'localizable': True, 'required': True}
+        )
+        FieldDefinition.objects.create(
+            content_type=cls.content_type, name='Author', api_id='author_ref', field_type='relationship'
+        )
+        cls.term = Term.objects.create(taxonomy=Taxonomy.objects.create(name='Tags'), translated_names={'en': 'news'})
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post_ndjson(self, records):
+        body = '\n'.join(record if isinstance(record, str) else json.dumps(record) for record in records)
+        return self.client.post(self.url, data=body, content_type='application/x-ndjson')
+
+    def test_invalid_records_are_reported_and_valid_ones_created(self):
+        valid = {'content_type': 'blog-post', 'term_ids': [str(self.term.pk)], 'content_data': {'title': {'en': 'Hi'}}}
+        response = self.post_ndjson([
+            valid,
+            {'content_type': 'unknown', 'content_data': {}},
+            {'content_type': 'blog-post', 'status': 'archived-ish', 'content_data': {'title': {'en': 'Hi'}}},
+            {'content_type': 'blog-post', 'content_data': {}},
+            {'content_type': 'blog-post', 'term_ids': [str(uuid.uuid4())], 'content_data': {'title': {'en': 'Hi'}}},
+            {'content_type': 'blog-post', 'content_data': {'title': {'en': 'Hi'}, 'author_ref': str(uuid.uuid4())}},
+            ['not', 'an', 'object'],
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 6))
+        errors = {error['record']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [2, 3, 4, 5, 6, 7])
+        self.assertIn('content_type', errors[2])
+        self.assertIn('status', errors[3])
+        self.assertEqual(errors[4], {'content_data': {'title': ['This field is required.']}})
+        self.assertIn('term_ids', errors[5])
+        self.assertIn('author_ref', errors[6]['content_data'])
+        self.assertIn('non_field_errors', errors[7])
+
+        instance = ContentInstance.objects.get(pk=response.data['ids'][0])
+        self.assertEqual(list(instance.terms.all()), [self.term])
+        self.assertEqual(instance.versions.get().data_snapshot, {'non_localizable': {}, 'en': {'title': 'Hi'}})
+
+    def test_malformed_line_rejects_the_request(self):
+        response = self.post_ndjson([{'content_type': 'blog-post', 'content_data': {'title': {'en': 'Hi'}}}, '{oops'])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ContentInstance.objects.exists())
+
+    def test_single_object_is_not_a_batch(self):
+        response = self.client.post(self.url, {'content_type': 'blog-post'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batches_are_written_with_a_fixed_number_of_queries(self):
+        records = [{'content_type': 'blog-post', 'content_data': {'title': {'en': f'Post {i}'}}} for i in range(3)]
+        self.post_ndjson(records[:1]) # Warms the language and schema caches
+        with CaptureQueriesContext(connection) as small:
+            self.post_ndjson(records)
+        with CaptureQueriesContext(connection) as large:
+            self.post_ndjson(records * 10)
+        self.assertEqual(ContentInstance.objects.count(), 34)
+        self.assertEqual(len(small), len(large))
+
+
+class Rollback(Exception):
+    pass
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SchemaCacheTests(TransactionTestCase):
+    """Changes commit here (no test-wide transaction), as in requests."""
+
+    def setUp(self):
+        cache.clear()
+        schema_cache.clear()
+        self.addCleanup(schema_cache.clear)
+        self.content_type = ContentType.objects.create(name='Article', api_id='article')
+        FieldDefinition.objects.create(content_type=self.content_type, name='Title', api_id='title', field_type='text')
+
+    def api_ids(self):
+        return [field.api_id for field in get_schema(self.content_type.pk).fields]
+
+    def test_schema_is_cached_and_rebuilt_on_change(self):
+        self.assertEqual(self.api_ids(), ['title'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.api_ids(), ['title'])
+
+        FieldDefinition.objects.create(content_type=self.content_type, name='Body', api_id='body', field_type='text')
+
+        self.assertEqual(self.api_ids(), ['body', 'title'])
+
+    def test_rolled_back_changes_are_not_cached(self):
+        self.assertEqual(self.api_ids(), ['title'])
+
+        with self.assertRaises(Rollback), transaction.atomic():
+            FieldDefinition.objects.create(
+                content_type=self.content_type, name='Body', api_id='body', field_type='text'
+            )
+            self.assertEqual(self.api_ids(), ['body', 'title']) # This transaction sees its changes
+            self.assertEqual(self.api_ids(), ['body', 'title'])
+            raise Rollback
+
+        self.assertEqual(self.api_ids(), ['title'])
+        schema_cache.clear() # Another worker: only the shared cache
+        self.assertEqual(self.api_ids(), ['title'])
+
+    def test_rolled_back_savepoint_is_not_cached(self):
+        with transaction.atomic():
+            self.assertEqual(self.api_ids(), ['title'])
+            with self.assertRaises(Rollback), transaction.atomic():
+                FieldDefinition.objects.create(
+                    content_type=self.content_type, name='Body', api_id='body', field_type='text'
+                )
+                self.assertEqual(self.api_ids(), ['body', 'title'])
+                raise Rollback
+            self.assertEqual(self.api_ids(), ['title'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.api_ids(), ['title'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ValidatorTests(TestCase):
+
+    def validate(self, value, field_type='text', **config):
+        return compile_validator(field_type, config)(value)
+
+    def test_rules(self):
+        rules = {'min_length': 3, 'max_length': 5, 'regex': '^[a-z]+$'}
+        self.assertEqual(self.validate('abcd', validation_rules=rules), [])
+        self.assertEqual(self.validate('ab', validation_rules=rules), ["Ensure this value has at least 3 characters."])
+        self.assertEqual(self.validate('abcdef', validation_rules=rules), ["Ensure this value has at most 5 characters."])
+        self.assertEqual(self.validate('ab1', validation_rules=rules), ["Enter a value matching the pattern ^[a-z]+$."])
+        self.assertEqual(self.validate('', required=True), ["This field is required."])
+        self.assertEqual(self.validate(None), [])
+        self.assertEqual(self.validate(3), ["Expected a string."])
+        self.assertEqual(self.validate('c', 'select', select_options=['a', {'value': 'b'}]), ['"c" is not a valid choice.'])
+        self.assertEqual(self.validate('b', 'select', select_options=['a', {'value': 'b'}]), [])
+
+    def test_numeric_strings_are_coerced(self):
+        rules = {'min_length': '3', 'max_length': 5.0}
+        self.assertEqual(self.validate('ab', validation_rules=rules), ["Ensure this value has at least 3 characters."])
+        self.assertEqual(self.validate('abcdef', validation_rules=rules), ["Ensure this value has at most 5 characters."])
+
+    def test_invalid_rules_are_ignored(self):
+        for rules in (
+            {'min_length': 'three'}, {'min_length': -1}, {'max_length': True}, {'max_length': [5]},
+            {'regex': 5}, {'regex': '('}, ['min_length'], 'max_length=5',
+        ):
+            with self.subTest(rules=rules), self.assertLogs('apps.content.validation', 'WARNING'):
+                self.assertEqual(self.validate('ab', validation_rules=rules), [])
+
+    def test_field_definition_clean_checks_rule_types(self):
+        content_type = ContentType.objects.create(name='Article', api_id='article')
+        invalid = (
+            {'min_length': '3'}, {'max_length': -1}, {'max_length': 2.5}, {'min_length': False},
+            {'min_length': 5, 'max_length': 3}, {'regex': 5}, {'regex': '('}, ['min_length'],
+        )
+        for rules in invalid:
+            field = FieldDefinition(content_type=content_type, name='Slug', field_type='text', config={'validation_rules': rules})
+            with self.subTest(rules=rules), self.assertRaises(ValidationError) as raised:
+                field.clean()
+            self.assertIn('config', raised.exception.message_dict)
+        FieldDefinition(
+            content_type=content_type, name='Slug', field_type='text',
+            config={'validation_rules': {'min_length': 3, 'max_length': 80, 'regex': '^[a-z0-9-]+$'}},
+        ).clean()
+
+    def test_invalid_rules_saved_directly_do_not_break_writes(self):
+        user = CMSUser.objects.create_superuser(email='editor@example.com', password='password')
+        content_type = ContentType.objects.create(name='Article', api_id='article')
+        FieldDefinition.objects.create(
+            content_type=content_type, name='Slug', api_id='slug', field_type='text',
+            config={'validation_rules': {'min_length': 'three', 'max_length': '5'}},
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post('/api/v1/content-instances/', {
+            'content_type': content_type.pk, 'content_data': {'slug': 'too-long'},
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['content_data'], {'slug': ["Ensure this value has at most 5 characters."]})
+
+
+class VersionStorageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CMSUser.objects.create_superuser(email='editor@example.com', password='password')
+        cls.english = Language.objects.create(code='en', name='English', is_default=True)
+        content_type = ContentType.objects.create(name='Article', api_id='article')
+        cls.title = FieldDefinition.objects.create(
+            content_type=content_type, name='Title', api_id='title', field_type='text', config={'localizable': True}
+        )
+        cls.body = FieldDefinition.objects.create(content_type=content_type, name='Body', api_id='body', field_type='text')
+        cls.instance = ContentInstance.objects.create(content_type=content_type, author=cls.user)
+
+    def test_patches_round_trip(self):
+        old = {'non_localizable': {'a/b': 1, 'c~d': [1, 2]}, 'en': {'title': 'Hi'}, 'fr': {'title': 'Salut'}}
+        new = {'non_localizable': {'a/b': 2, 'e': None}, 'en': {'title': 'Hi'}, 'de': {'title': 'Hallo'}}
+
+        self.assertEqual(apply_patch(old, make_patch(old, new)), new)
+        self.assertEqual(apply_patch(new, make_patch(new, old)), old)
+        self.assertEqual(make_patch(old, old), [])
+        self.assertEqual(old['non_localizable'], {'a/b': 1, 'c~d': [1, 2]}) # Not modified
+
+    @mock.patch('apps.content.models.CONTENT_VERSION_KEYFRAME_INTERVAL', 4)
+    def test_versions_round_trip_through_keyframes_and_patches(self):
+        title = ContentFieldInstance.objects.create(
+            content_instance=self.instance, field_definition=self.title, language=self.english, value='Title'
+        )
+        body = ' '.join(uuid.uuid4().hex for __ in range(10)) # Larger than a patch, even compressed
+        ContentFieldInstance.objects.create(content_instance=self.instance, field_definition=self.body, value=body)
+        expected = {}
+        for sequence in range(1, 11):
+            if sequence < 6:
+                title.value = f'Title {sequence}'
+                title.save()
+            elif sequence == 6:
+                title.delete()
+            version = ContentVersion.create_version(self.instance, user=self.user)
+            self.assertEqual(version.sequence, sequence)
+            expected[sequence] = ContentVersion.build_snapshot(
+                self.instance.field_instances.select_related('field_definition', 'language')
+            )
+
+        versions = list(self.instance.versions.defer('data').order_by('sequence'))
+        with self.assertNumQueries(1):
+            ContentVersion.load_snapshots(versions)
+        self.assertEqual({version.sequence: version.data_snapshot for version in versions}, expected)
+        # A keyframe every 4 versions, patches in between
+        self.assertEqual([version.keyframe_sequence for version in versions], [1, 1, 1, 1, 5, 5, 5, 5, 9, 9])
+        self.assertEqual(
+            self.instance.versions.get(sequence=7).data_snapshot,
+            {'non_localizable': {'body': body}},
+        )
+
+    def test_versions_are_numbered_after_the_latest(self):
+        for __ in range(3):
+            ContentVersion.create_version(self.instance, user=self.user)
+        self.assertEqual(list(self.instance.versions.order_by('sequence').values_list('sequence', flat=True)), [1, 2, 3])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class VersionDiffTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CMSUser.objects.create_superuser(email='editor@example.com', password='password')
+        content_type = ContentType.objects.create(name='Article', api_id='article')
+        cls.body = FieldDefinition.objects.create(
+            content_type=content_type, name='Body', api_id='body', field_type='rich_text'
+        )
+        cls.instance = ContentInstance.objects.create(content_type=content_type, author=cls.user)
+        field_instance = ContentFieldInstance.objects.create(
+            content_instance=cls.instance, field_definition=cls.body, value='<p>The quick fox</p>'
+        )
+        cls.first = ContentVersion.create_version(cls.instance, user=cls.user)
+        field_instance.value = '<p>The slow fox</p>'
+        field_instance.save()
+        cls.second = ContentVersion.create_version(cls.instance, user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_diff(self):
+        return self.client.get(
+            f'/api/v1/content-instances/{self.instance.pk}/versions/{self.first.pk}/diff/{self.second.pk}/'
+        )
+
+    def assertSpells(self, chunks, old, new):
+        self.assertEqual(''.join(chunk['text'] for chunk in chunks if chunk['op'] != 'insert'), old)
+        self.assertEqual(''.join(chunk['text'] for chunk in chunks if chunk['op'] != 'delete'), new)
+
+    def test_word_diff(self):
+        old, new = '<p>The quick brown fox</p>', '<p>The slow brown dog</p>'
+        chunks = word_diff(old, new)
+        self.assertSpells(chunks, old, new)
+        self.assertEqual(chunks[:3], [
+            {'op': 'equal', 'text': '<p>The '}, {'op': 'delete', 'text': 'quick'}, {'op': 'insert', 'text': 'slow'},
+        ])
+        self.assertEqual(word_diff('same', 'same'), [{'op': 'equal', 'text': 'same'}])
+        self.assertSpells(word_diff('', 'new text'), '', 'new text')
+
+    @mock.patch('apps.content.diff.CONTENT_VERSION_DIFF_MAX_TOKENS', 4)
+    def test_large_changes_are_shown_replaced(self):
+        old, new = '<p>a b c d e</p>', '<p>v w x y z</p>'
+        chunks = word_diff(old, new)
+        self.assertEqual(chunks, [
+            {'op': 'equal', 'text': '<p>'},
+            {'op': 'delete', 'text': 'a b c d e'},
+            {'op': 'insert', 'text': 'v w x y z'},
+            {'op': 'equal', 'text': '</p>'},
+        ])
+        # Small changes in large values are still diffed word by word
+        old, new = '<p>a b c d e</p>', '<p>a b X d e</p>'
+        self.assertIn({'op': 'delete', 'text': 'c'}, word_diff(old, new))
+
+    def test_diff_is_cached_without_request_dependent_parts(self):
+        response = self.get_diff()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['to_version']['created_by_email'], 'editor@example.com')
+        self.assertIn({'op': 'insert', 'text': 'slow'}, response.data['changes'][0]['words'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.email = 'renamed@example.com'
+            self.user.save()
+            self.body.field_type = 'text'
+            self.body.save()
+        response = self.get_diff()
+
+        self.assertEqual(response.data['to_version']['created_by_email'], 'renamed@example.com')
+        self.assertEqual(response.data['changes'], [{
+            'field': 'body', 'language': None, 'change': 'modified',
+            'from': '<p>The quick fox</p>', 'to': '<p>The slow fox</p>',
+        }])
+
+    def test_cached_diff_does_not_reload_snapshots(self):
+        self.get_diff()
+        with mock.patch.object(ContentVersion, 'load_snapshots') as load_snapshots:
+            self.assertEqual(self.get_diff().status_code, 200)
+        load_snapshots.assert_not_called()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RevertTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CMSUser.objects.create_superuser(email='editor@example.com', password='password')
+        Language.objects.create(code='en', name='English', is_default=True)
+        cls.content_type = ContentType.objects.create(name='Article', api_id='article')
+        cls.title = FieldDefinition.objects.create(
+            content_type=cls.content_type, name='Title', api_id='title', field_type='text',
+            config={'localizable': True}
+        )
+        cls.related = FieldDefinition.objects.create(
+            content_type=cls.content_type, name='Related', api_id='related', field_type='relationship'
+        )
+        FieldDefinition.objects.create(content_type=cls.content_type, name='Subtitle', api_id='subtitle', field_type='text')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.other = ContentInstance.objects.create(content_type=self.content_type, author=self.user)
+        response = self.client.post('/api/v1/content-instances/', {
+            'content_type': self.content_type.pk,
+            'content_data': {'title': {'en': 'First'}, 'related': str(self.other.pk)},
+        }, format='json')
+        self.instance_id = response.data['id']
+        self.url = f'/api/v1/content-instances/{self.instance_id}/'
+        self.client.patch(self.url, {
+            'content_data': {'title': {'en': 'Second'}, 'related': None, 'subtitle': 'Added later'},
+        }, format='json')
+        self.first = ContentVersion.objects.get(content_instance_id=self.instance_id, sequence=1)
+
+    def revert(self):
+        return self.client.post(f'{self.url}versions/{self.first.pk}/revert/')
+
+    def test_revert_restores_the_version_and_returns_it(self):
+        self.client.get(self.url) # Cached response and prefetched values must not leak into the result
+
+        with mock.patch('apps.webhooks.tasks.relay_webhook_outbox.delay'), self.captureOnCommitCallbacks(execute=True):
+            response = self.revert()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['content_data']['title']['value'], 'First')
+        self.assertIsNone(response.data['content_data'].get('subtitle'))
+        self.assertEqual(self.client.get(self.url).data['content_data']['title']['value'], 'First')
+        latest = ContentVersion.objects.filter(content_instance_id=self.instance_id).order_by('-sequence').first()
+        self.assertEqual((latest.sequence, latest.version_message), (3, "Reverted to version 1"))
+        self.assertEqual(latest.data_snapshot, self.first.data_snapshot)
+
+    def test_values_invalid_under_the_current_schema_are_rejected(self):
+        self.title.config = {'localizable': True, 'validation_rules': {'min_length': 6}}
+        self.title.save()
+
+        response = self.revert()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['content_data'], {'title': ["en: Ensure this value has at least 6 characters."]})
+        self.assertEqual(ContentVersion.objects.filter(content_instance_id=self.instance_id).count(), 2)
+        self.assertEqual(
+            ContentFieldInstance.objects.get(content_instance_id=self.instance_id, field_definition=self.title).value,
+            'Second',
+        )
+
+    def test_references_no_longer_allowed_are_rejected(self):
+        self.related.config = {'allowed_content_types': ['page']}
+        self.related.save()
+
+        response = self.revert()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('related', response.data['content_data'])
+        self.assertEqual(ContentVersion.objects.filter(content_instance_id=self.instance_id).count(), 2)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TermHierarchyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CMSUser.objects.create_superuser(email='editor@example.com', password='password')
+        cls.taxonomy = Taxonomy.objects.create(name='Topics', api_id='topics', hierarchical=True)
+        content_type = ContentType.objects.create(name='Article', api_id='article')
+        cls.tagged = {}
+        for name in ('science', 'physics', 'optics', 'arts'):
+            cls.tagged[name] = ContentInstance.objects.create(content_type=content_type, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # science > physics > optics, arts
+        self.science = self.create_term('science')
+        self.physics = self.create_term('physics', self.science)
+        self.optics = self.create_term('optics', self.physics)
+        self.arts = self.create_term('arts')
+        for name, instance in self.tagged.items():
+            instance.terms.set([getattr(self, name)])
+
+    def create_term(self, name, parent=None):
+        return Term.objects.create(taxonomy=self.taxonomy, parent=parent, translated_names={'en': name})
+
+    def refresh(self, *terms):
+        for term in terms:
+            term.refresh_from_db()
+
+    def filtered(self, *terms):
+        response = self.client.get('/api/v1/content-instances/', {'term': ','.join(str(term.pk) for term in terms)})
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.data['results']}
+
+    def ids(self, *names):
+        return {str(self.tagged[name].pk) for name in names}
+
+    def test_paths_follow_the_hierarchy(self):
+        self.assertEqual(self.optics.path, f"{self.science.pk.hex}/{self.physics.pk.hex}/{self.optics.pk.hex}/")
+        self.assertEqual([self.science.depth, self.physics.depth, self.optics.depth], [0, 1, 2])
+        self.assertEqual(list(self.science.get_descendants()), [self.physics, self.optics])
+        self.assertEqual(list(self.optics.get_ancestors()), [self.science, self.physics])
+
+    def test_moving_a_term_moves_its_subtree(self):
+        self.physics.parent = self.arts
+        self.physics.save()
+        self.refresh(self.physics, self.optics)
+
+        self.assertEqual(self.optics.path, f"{self.arts.pk.hex}/{self.physics.pk.hex}/{self.optics.pk.hex}/")
+        self.assertEqual([self.physics.depth, self.optics.depth], [1, 2])
+        self.assertEqual(list(self.science.get_descendants()), [])
+        self.assertEqual(list(self.arts.get_descendants()), [self.physics, self.optics])
+
+        self.physics.parent = None
+        self.physics.save(update_fields=['parent'])
+        self.refresh(self.optics)
+        self.assertEqual((self.optics.path, self.optics.depth), (f"{self.physics.pk.hex}/{self.optics.pk.hex}/", 1))
+
+    def test_term_cannot_move_below_itself(self):
+        self.science.parent = self.optics
+        with self.assertRaises(ValidationError):
+            self.science.clean()
+        with self.assertRaises(ValueError):
+            self.science.save()
+        self.refresh(self.optics)
+        self.assertEqual(self.optics.depth, 2)
+
+    def test_deleting_a_term_makes_its_children_roots(self):
+        self.physics.delete()
+        self.refresh(self.optics)
+
+        self.assertEqual((self.optics.path, self.optics.depth, self.optics.parent_id), (f"{self.optics.pk.hex}/", 0, None))
+        self.assertEqual(list(self.science.get_descendants()), [])
+
+    def test_tree_endpoints(self):
+        base = '/api/v1/taxonomies/topics/terms/'
+
+        tree = self.client.get(f'{base}tree/').data
+        self.assertEqual(sorted(node['id'] for node in tree), sorted([str(self.science.pk), str(self.arts.pk)]))
+        science = next(node for node in tree if node['id'] == str(self.science.pk))
+        self.assertEqual(science['children'][0]['id'], str(self.physics.pk))
+        self.assertEqual(science['children'][0]['children'][0]['id'], str(self.optics.pk))
+
+        descendants = self.client.get(f'{base}{self.science.pk}/descendants/').data
+        self.assertEqual([node['id'] for node in descendants], [str(self.physics.pk), str(self.optics.pk)])
+        ancestors = self.client.get(f'{base}{self.optics.pk}/ancestors/').data
+        self.assertEqual([node['id'] for node in ancestors], [str(self.science.pk), str(self.physics.pk)])
+
+    def test_term_filter_matches_subtrees(self):
+        self.assertEqual(self.filtered(self.science), self.ids('science', 'physics', 'optics'))
+        self.assertEqual(self.filtered(self.physics), self.ids('physics', 'optics'))
+        self.assertEqual(self.filtered(self.optics, self.arts), self.ids('optics', 'arts'))
+        response = self.client.get('/api/v1/content-instances/', {'term': 'not-a-uuid'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.filtered(Term(pk=uuid.uuid4())), set())
+
+    def test_term_filter_follows_moves(self):
+        self.assertEqual(self.filtered(self.arts), self.ids('arts')) # Cached
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.physics.parent = self.arts
+            self.physics.save()
+
+        self.assertEqual(self.filtered(self.arts), self.ids('arts', 'physics', 'optics'))
+        self.assertEqual(self.filtered(self.science), self.ids('science'))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ResponseCacheTests(TestCase):
+    """
+    Changes are made with queryset.update() (no signals) and then announced by
+    saving a related object, so a response only shows them once its tags are
+    invalidated.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CMSUser.objects.create_superuser(email='editor@example.com', password='password')
+        Language.objects.create(code='en', name='English', is_default=True)
+        cls.content_type = ContentType.objects.create(name='Article', api_id='article')
+        cls.title = FieldDefinition.objects.create(
+            content_type=cls.content_type, name='Title', api_id='title', field_type='text'
+        )
+        cls.image = FieldDefinition.objects.create(
+            content_type=cls.content_type, name='Image', api_id='image', field_type='media'
+        )
+        cls.asset = MediaAsset.objects.create(file='hero.png', filename='hero.png', mime_type='image/png')
+        cls.term = Term.objects.create(taxonomy=Taxonomy.objects.create(name='Tags'), translated_names={'en': 'news'})
+        cls.instance = ContentInstance.objects.create(content_type=cls.content_type, author=cls.user)
+        cls.instance.terms.set([cls.term])
+        ContentFieldInstance.objects.create(content_instance=cls.instance, field_definition=cls.title, value='Hello')
+        ContentFieldInstance.objects.create(
+            content_instance=cls.instance, field_definition=cls.image, value=str(cls.asset.pk)
+        )
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('apps.webhooks.tasks.relay_webhook_outbox.delay') # Queued on commit, not run
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/v1/content-instances/{self.instance.pk}/'
+
+    def get_title(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.data['results'][0] if 'results' in response.data else response.data
+        return data['content_data']['title']
+
+    def change_title_quietly(self, value):
+        ContentFieldInstance.objects.filter(field_definition=self.title).update(value=value)
+
+    def assertInvalidatedBy(self, change, url=None, **params):
+        self.assertEqual(self.get_title(url, **params), 'Hello')
+        self.change_title_quietly('Changed')
+        self.assertEqual(self.get_title(url, **params), 'Hello') # Served from the cache
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertEqual(self.get_title(url, **params), 'Changed')
+
+    def test_hit_skips_the_database(self):
+        self.get_title()
+        with mock.patch.object(ContentInstanceViewSet, 'get_queryset') as get_queryset:
+            self.assertEqual(self.get_title(), 'Hello')
+        get_queryset.assert_not_called()
+
+    def test_instance_change_invalidates(self):
+        self.assertInvalidatedBy(self.instance.save)
+
+    def test_instance_change_invalidates_lists(self):
+        self.assertInvalidatedBy(self.instance.save, url='/api/v1/content-instances/')
+        self.change_title_quietly('Hello')
+        self.assertInvalidatedBy(self.instance.save, url='/api/v1/content-instances/', content_type='article')
+
+    def test_term_change_invalidates(self):
+        self.assertInvalidatedBy(self.term.save)
+
+    def test_media_change_invalidates(self):
+        self.assertInvalidatedBy(self.asset.save)
+
+    def test_schema_change_invalidates(self):
+        self.assertInvalidatedBy(self.title.save)
+
+    def test_unrelated_changes_keep_the_entry(self):
+        other = Term.objects.create(taxonomy=self.term.taxonomy, translated_names={'en': 'other'})
+        self.assertEqual(self.get_title(), 'Hello')
+        self.change_title_quietly('Changed')
+        with self.captureOnCommitCallbacks(execute=True):
+            other.save()
+        self.assertEqual(self.get_title(), 'Hello')
+
+    def test_entries_are_keyed_by_language_and_query(self):
+        self.assertEqual(self.get_title(), 'Hello')
+        self.change_title_quietly('Changed')
+        self.assertEqual(self.get_title(lang='fr'), 'Changed')
+        self.assertEqual(self.get_title(url='/api/v1/content-instances/', search='x', content_type='article'), 'Changed')
+        self.change_title_quietly('Changed again')
+        # Same parameters in another order: same entry
+        self.assertEqual(self.get_title(url='/api/v1/content-instances/', content_type='article', search='x'), 'Changed')
+
+    def test_key_depends_on_auth_scope(self):
+        factory = APIRequestFactory()
+
+        def key(user, query):
+            request = Request(factory.get(f'/?{query}'))
+            request.user = user
+            return response_cache_key(request, 'list')
+
+        staff = self.user
+        member = CMSUser(email='member@example.com')
+        self.assertEqual(key(staff, 'a=1&b=2'), key(staff, 'b=2&a=1'))
+        self.assertNotEqual(key(staff, 'a=1'), key(member, 'a=1'))
+        self.assertNotEqual(key(staff, 'lang=en'), key(staff, 'lang=fr'))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CMSUser.objects.create_superuser(email='editor@example.com', password='password')
+        cls.en = Language.objects.create(code='en', name='English', is_default=True)
+        cls.fr = Language.objects.create(code='fr', name='French')
+        content_type = ContentType.objects.create(name='Article', api_id='article')
+        title = FieldDefinition.objects.create(
+            content_type=content_type, name='Title', api_id='title', field_type='text', config={'localizable': True}
+        )
+        body = FieldDefinition.objects.create(content_type=content_type, name='Body', api_id='body', field_type='text')
+        cls.term = Term.objects.create(taxonomy=Taxonomy.objects.create(name='Tags'), translated_names={'en': 'news'})
+        cls.published = ContentInstance.objects.create(content_type=content_type, author=cls.user, status=STATUS_PUBLISHED)
+        cls.draft = ContentInstance.objects.create(content_type=content_type, author=cls.user, status=STATUS_DRAFT)
+        cls.published.terms.set([cls.term])
+        for instance, values in ((cls.published, {'en': 'Hello', 'fr': 'Bonjour'}), (cls.draft, {'en': 'Draft'})):
+            for language, value in ((cls.en, values['en']), (cls.fr, values.get('fr'))):
+                if value is not None:
+                    ContentFieldInstance.objects.create(
+                        content_instance=instance, field_definition=title, language=language, value=value
+                    )
+            ContentFieldInstance.objects.create(content_instance=instance, field_definition=body, value='Body')
+        # Another content type's instances are not exported
+        ContentInstance.objects.create(content_type=ContentType.objects.create(name='Page', api_id='page'), author=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        response = self.client.get('/api/v1/content-instances/export/', params)
+        if response.status_code != 200:
+            return response, None
+        return response, [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_endpoint_streams_one_line_per_instance(self):
+        response, records = self.export(content_type='article')
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="article.ndjson"')
+        self.assertEqual([record['id'] for record in records], sorted([str(self.published.pk), str(self.draft.pk)]))
+        record = next(record for record in records if record['id'] == str(self.published.pk))
+        self.assertEqual(record['content_type'], 'article')
+        self.assertEqual(record['status'], STATUS_PUBLISHED)
+        self.assertEqual(record['term_ids'], [str(self.term.pk)])
+        self.assertEqual(list(record['content_data']), ['en', 'fr']) # Default language first
+        self.assertEqual(record['content_data']['en']['title']['value'], 'Hello')
+        self.assertEqual(record['content_data']['fr']['title']['value'], 'Bonjour')
+        self.assertEqual(record['content_data']['fr']['body'], 'Body')
+
+    def test_content_data_falls_back_per_language(self):
+        __, records = self.export(content_type='article', status=STATUS_DRAFT)
+        self.assertEqual(records[0]['content_data']['fr']['title'], {'value': 'Draft', 'language': 'en'})
+
+    def test_filters(self):
+        __, records = self.export(content_type='article', status=STATUS_PUBLISHED)
+        self.assertEqual([record['id'] for record in records], [str(self.published.pk)])
+        __, records = self.export(content_type='article', lang='fr')
+        self.assertEqual({code for record in records for code in record['content_data']}, {'fr'})
+
+    def test_unknown_content_type_is_not_found(self):
+        self.assertEqual(self.export(content_type='missing')[0].status_code, 404)
+        self.assertEqual(self.export()[0].status_code, 404)
+
+    def test_command_writes_the_same_lines(self):
+        __, records = self.export(content_type='article')
+        stdout = io.StringIO()
+        call_command('export_content', 'article', '--chunk-size', '1', stdout=stdout)
+        self.assertEqual([json.loads(line) for line in stdout.getvalue().splitlines()], records)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        path = os.path.join(directory, 'export.ndjson')
+        self.addCleanup(os.remove, path)
+        stderr = io.StringIO()
+        call_command('export_content', 'article', '--status', STATUS_PUBLISHED, '--lang', 'en', '-o', path, stderr=stderr)
+        with open(path, encoding='utf-8') as output:
+            lines = [json.loads(line) for line in output]
+        self.assertEqual([(line['id'], list(line['content_data'])) for line in lines], [(str(self.published.pk), ['en'])])
+        self.assertIn("Exported 1 content instance(s)", stderr.getvalue())
+
+    def test_command_rejects_unknown_content_type(self):
+        with self.assertRaises(CommandError):
+            call_command('export_content', 'missing', stdout=io.StringIO())
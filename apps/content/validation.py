@@ -0,0 +1,299 @@
+"""
+Validation of content_data values against their field definitions.
+
+The checks of a field (its type, `required`, `validation_rules` min_length /
+max_length / regex, `select_options`) are compiled once into a closure when
+its CompiledSchema is built (see apps.content.schema), so regexes and option
+sets are not rebuilt per value. FieldDefinition.clean rejects malformed rules
+(see validation_rules_errors); rules saved some other way are coerced or
+ignored. Relationship and media values are only checked for their form there:
+validate_content_data() collects them as references, and check_references()
+resolves the references of any number of records (e.g. an ingestion batch)
+with one IN query per referenced model, checking `allowed_content_types` /
+`allowed_media_types` on the rows found.
+"""
+import logging
+import re
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.core.validators import EmailValidator, URLValidator
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.translation import gettext as _, gettext_lazy
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_FIELD_TYPES = ('relationship', 'media')
+
+_validate_email = EmailValidator()
+_validate_url = URLValidator()
+
+
+def _is_date(value):
+    if not isinstance(value, str):
+        return False
+    try:
+        return parse_datetime(value) is not None or parse_date(value) is not None
+    except ValueError:
+        return False
+
+
+def _is_reference(value):
+    """A UUID string, or a list of them."""
+    values = value if isinstance(value, list) else [value]
+    try:
+        return all(isinstance(item, str) and uuid.UUID(item) for item in values)
+    except ValueError:
+        return False
+
+
+def _django_validator(validator):
+    def check(value):
+        if not isinstance(value, str):
+            return False
+        try:
+            validator(value)
+        except ValidationError:
+            return False
+        return True
+    return check
+
+
+# {field type: (check(value) -> bool, error message)}. Types not listed accept any JSON value.
+TYPE_CHECKS = {
+    'text': (lambda value: isinstance(value, str), gettext_lazy("Expected a string.")),
+    'rich_text': (lambda value: isinstance(value, str), gettext_lazy("Expected a string.")),
+    'number': (lambda value: isinstance(value, (int, float)) and not isinstance(value, bool), gettext_lazy("Expected a number.")),
+    'date': (_is_date, gettext_lazy("Expected an ISO 8601 date or datetime.")),
+    'boolean': (lambda value: isinstance(value, bool), gettext_lazy("Expected true or false.")),
+    'email': (_django_validator(_validate_email), gettext_lazy("Enter a valid email address.")),
+    'url': (_django_validator(_validate_url), gettext_lazy("Enter a valid URL.")),
+    'media': (_is_reference, gettext_lazy("Expected a media asset ID (UUID).")),
+    'relationship': (_is_reference, gettext_lazy("Expected a content instance ID (UUID).")),
+    'select': (lambda value: isinstance(value, str), gettext_lazy("Expected a string.")),
+    'structured_list': (lambda value: isinstance(value, list), gettext_lazy("Expected a list.")),
+}
+
+
+def validation_rules_errors(rules):
+    """Error messages for a `validation_rules` config value of the wrong shape or types."""
+    if not isinstance(rules, dict):
+        return [_("Validation rules must be an object.")]
+    errors = []
+    for name in ('min_length', 'max_length'):
+        value = rules.get(name)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+            errors.append(_("%(rule)s must be a non-negative integer.") % {'rule': name})
+    if not errors and rules.get('min_length') is not None and rules.get('max_length') is not None:
+        if rules['min_length'] > rules['max_length']:
+            errors.append(_("min_length cannot be greater than max_length."))
+    regex = rules.get('regex')
+    if regex is not None and regex != '':
+        if not isinstance(regex, str):
+            errors.append(_("regex must be a string."))
+        else:
+            try:
+                re.compile(regex)
+            except re.error as e:
+                errors.append(_("Invalid validation regex: %(error)s") % {'error': e})
+    return errors
+
+
+def _length_rule(rules, name):
+    """A min_length / max_length rule as an int ('3' and 3.0 are accepted), or None if unset or invalid."""
+    value = rules.get(name)
+    if value is None:
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+        return value
+    # Rejected by FieldDefinition.clean; not enforced if saved some other way
+    logger.warning(f"Ignoring invalid validation rule {name}={value!r}.")
+    return None
+
+
+def compile_validator(field_type, config):
+    """
+    Returns validate(value) -> list of error messages, for a single value (one
+    language of a localizable field) of a field with `field_type` and `config`.
+    """
+    required = bool(config.get('required', False))
+    rules = config.get('validation_rules') or {}
+    if not isinstance(rules, dict):
+        logger.warning(f"Ignoring invalid validation rules {rules!r}.")
+        rules = {}
+    checks = [] # (check(value) -> bool, message, params)
+
+    type_check = TYPE_CHECKS.get(field_type)
+    min_length = _length_rule(rules, 'min_length')
+    if min_length is not None:
+        checks.append((
+            lambda value: not isinstance(value, str) or len(value) >= min_length,
+            gettext_lazy("Ensure this value has at least %(min_length)d characters."), {'min_length': min_length},
+        ))
+    max_length = _length_rule(rules, 'max_length')
+    if max_length is not None:
+        checks.append((
+            lambda value: not isinstance(value, str) or len(value) <= max_length,
+            gettext_lazy("Ensure this value has at most %(max_length)d characters."), {'max_length': max_length},
+        ))
+    if rules.get('regex'):
+        try:
+            pattern = re.compile(rules['regex'])
+        except (re.error, TypeError):
+            # Rejected by FieldDefinition.clean; not enforced if saved some other way
+            logger.warning(f"Ignoring invalid validation regex {rules['regex']!r}.")
+        else:
+            checks.append((
+                lambda value: not isinstance(value, str) or pattern.search(value) is not None,
+                gettext_lazy("Enter a value matching the pattern %(regex)s."), {'regex': rules['regex']},
+            ))
+    if field_type == 'select' and config.get('select_options'):
+        options = frozenset(
+            str(option.get('value')) if isinstance(option, dict) else str(option)
+            for option in config['select_options']
+        )
+        checks.append((
+            lambda value: value in options, gettext_lazy("\"%(value)s\" is not a valid choice."), None,
+        ))
+
+    def validate(value):
+        if value is None or value == '':
+            return [_("This field is required.")] if required else []
+        if type_check is not None and not type_check[0](value):
+            return [str(type_check[1])]
+        errors = []
+        for check, message, params in checks:
+            if not check(value):
+                errors.append(message % (params if params is not None else {'value': value}))
+        return errors
+    return validate
+
+
+def compile_reference_check(field_type, config):
+    """
+    Returns check(target) -> error message or None for a relationship / media
+    field, `target` being the referenced content type api_id / the asset MIME type.
+    Returns None for other field types.
+    """
+    if field_type == 'relationship':
+        allowed = frozenset(config.get('allowed_content_types') or ())
+
+        def check(content_type_api_id):
+            if allowed and content_type_api_id not in allowed:
+                return _("Content of type \"%(type)s\" cannot be referenced here.") % {'type': content_type_api_id}
+            return None
+        return check
+    if field_type == 'media':
+        # Entries are MIME types ('image/png') or their major type ('image')
+        allowed = frozenset(config.get('allowed_media_types') or ())
+
+        def check(mime_type):
+            if allowed and mime_type not in allowed and mime_type.split('/')[0] not in allowed:
+                return _("Media of type \"%(type)s\" cannot be referenced here.") % {'type': mime_type or '?'}
+            return None
+        return check
+    return None
+
+
+def validate_content_data(schema, content_data, languages, partial=False):
+    """
+    Validates `content_data` ({field api_id: value}, or {language code: value}
+    for localizable fields) against a CompiledSchema. As on the write paths,
+    unknown fields and inactive languages (not in `languages`, {code: Language})
+    are ignored. With `partial` (updates), missing required fields are allowed.
+
+    Returns (field_values, references, errors): field_values are
+    (CompiledField, Language or None, value) triples, references the
+    (CompiledField, UUID) pairs to pass to check_references(), and errors
+    lists of messages keyed by field api_id.
+    """
+    field_values = []
+    references = []
+    errors = {}
+    if not isinstance(content_data, dict):
+        return field_values, references, {'non_field_errors': [_("Expected an object keyed by field API ID.")]}
+
+    for field in schema.fields:
+        if field.api_id not in content_data:
+            if field.is_required and not partial:
+                errors[field.api_id] = [_("This field is required.")]
+            continue
+        value_data = content_data[field.api_id]
+        if field.is_localizable:
+            if not isinstance(value_data, dict):
+                errors[field.api_id] = [_("Localizable fields expect an object keyed by language code.")]
+                continue
+            values = [
+                (languages[lang_code], value) for lang_code, value in value_data.items() if lang_code in languages
+            ]
+            if field.is_required and not partial and all(value in (None, '') for __, value in values):
+                errors[field.api_id] = [_("This field is required.")]
+                continue
+        else:
+            values = [(None, value_data)]
+
+        field_errors = []
+        for language, value in values:
+            value_errors = field.validate(value)
+            if value_errors:
+                prefix = f"{language.code}: " if language is not None else ''
+                field_errors.extend(prefix + message for message in value_errors)
+                continue
+            field_values.append((field, language, value))
+            references.extend(get_references(field, value))
+        if field_errors:
+            errors[field.api_id] = field_errors
+    return field_values, references, errors
+
+
+def get_references(field, value):
+    """The (CompiledField, UUID) references in a validated value of `field`."""
+    if field.check_reference is None or value in (None, ''):
+        return []
+    return [(field, uuid.UUID(item)) for item in (value if isinstance(value, list) else [value])]
+
+
+def check_references(references_per_record):
+    """
+    Resolves the references of many records with one query per referenced model.
+    `references_per_record` is a list with the references of each record (as
+    returned by validate_content_data); returns a list of errors dicts, keyed
+    by field api_id, in the same order (empty for records without errors).
+    """
+    from apps.media.models import MediaAsset
+    from .models import ContentInstance
+
+    ids_by_type = {field_type: set() for field_type in REFERENCE_FIELD_TYPES}
+    for references in references_per_record:
+        for field, target_id in references:
+            ids_by_type[field.field_type].add(target_id)
+    targets = {} # {(field type, UUID): content type api_id / MIME type}
+    if ids_by_type['relationship']:
+        targets.update(
+            (('relationship', pk), api_id)
+            for pk, api_id in ContentInstance.objects.filter(pk__in=ids_by_type['relationship'])
+            .values_list('pk', 'content_type__api_id')
+        )
+    if ids_by_type['media']:
+        targets.update(
+            (('media', pk), mime_type)
+            for pk, mime_type in MediaAsset.objects.filter(pk__in=ids_by_type['media']).values_list('pk', 'mime_type')
+        )
+
+    results = []
+    for references in references_per_record:
+        errors = {}
+        for field, target_id in references:
+            key = (field.field_type, target_id)
+            if key not in targets:
+                message = _("Referenced object does not exist: %(id)s") % {'id': target_id}
+            else:
+                message = field.check_reference(targets[key])
+            if message:
+                errors.setdefault(field.api_id, []).append(message)
+        results.append(errors)
+    return results
@@ -0,0 +1,95 @@
+"""
+Storage encoding of ContentVersion data.
+
+A snapshot ({"lang_code": {"field_api_id": value}, "non_localizable": {...}},
+see ContentVersion.build_snapshot) is stored in full only every
+CONTENT_VERSION_KEYFRAME_INTERVAL versions (a keyframe). Versions in between
+store a JSON Patch (RFC 6902, add/replace/remove operations on field values)
+against the previous version, so an edit of one field costs the size of that
+field rather than of the whole instance. Both are stored as zlib-compressed
+JSON. Reconstructing a version applies at most KEYFRAME_INTERVAL - 1 patches to
+its keyframe; the rows needed are fetched with one query (see
+ContentVersion.load_snapshots).
+"""
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Versions per full snapshot; the others are stored as patches
+CONTENT_VERSION_KEYFRAME_INTERVAL = getattr(settings, 'CONTENT_VERSION_KEYFRAME_INTERVAL', 20)
+COMPRESSION_LEVEL = 6
+NON_LOCALIZABLE = 'non_localizable' # Snapshot group of non-localizable fields
+
+
+def encode(data):
+    return zlib.compress(
+        json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8'), COMPRESSION_LEVEL
+    )
+
+
+def decode(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def _escape(token):
+    """RFC 6901 escaping of a JSON Pointer reference token."""
+    return token.replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def make_patch(old, new):
+    """Returns the JSON Patch operations turning snapshot `old` into `new`."""
+    ops = []
+    for group in old.keys() - new.keys():
+        ops.append({'op': 'remove', 'path': f"/{_escape(group)}"})
+    for group, values in new.items():
+        old_values = old.get(group)
+        if old_values is None:
+            ops.append({'op': 'add', 'path': f"/{_escape(group)}", 'value': values})
+            continue
+        if not isinstance(values, dict) or not isinstance(old_values, dict):
+            if values != old_values:
+                ops.append({'op': 'replace', 'path': f"/{_escape(group)}", 'value': values})
+            continue
+        for key in old_values.keys() - values.keys():
+            ops.append({'op': 'remove', 'path': f"/{_escape(group)}/{_escape(key)}"})
+        for key, value in values.items():
+            path = f"/{_escape(group)}/{_escape(key)}"
+            if key not in old_values:
+                ops.append({'op': 'add', 'path': path, 'value': value})
+            elif old_values[key] != value:
+                ops.append({'op': 'replace', 'path': path, 'value': value})
+    return ops
+
+
+def apply_patch(snapshot, ops):
+    """
+    Returns a new snapshot with the JSON Patch `ops` (as made by make_patch)
+    applied. `snapshot` is not modified; unchanged groups are shared with it.
+    """
+    result = dict(snapshot)
+    copied = set() # Groups already copied from `snapshot`
+    for op in ops:
+        tokens = [_unescape(token) for token in op['path'].split('/')[1:]]
+        if len(tokens) == 1:
+            group = tokens[0]
+            if op['op'] == 'remove':
+                result.pop(group, None)
+            else:
+                result[group] = op['value']
+                copied.add(group)
+            continue
+        group, key = tokens
+        if group not in copied:
+            result[group] = dict(result.get(group) or {})
+            copied.add(group)
+        if op['op'] == 'remove':
+            result[group].pop(key, None)
+        else:
+            result[group][key] = op['value']
+    return result
@@ -1,17 +1,33 @@
-from rest_framework import viewsets, permissions, status, mixins
+from rest_framework import viewsets, permissions, status, mixins, parsers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.http import Http404, StreamingHttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import SearchFilter
 from django.db.models import Prefetch
+from django.conf import settings
 
 from .models import (
     ContentType, FieldDefinition, Taxonomy, Term,
     ContentInstance, ContentFieldInstance, ContentVersion
 )
 from .api import (
-    ContentTypeSerializer, TaxonomySerializer, TermSerializer,
-    ContentInstanceSerializer, ContentVersionSerializer
+    ContentTypeSerializer, TaxonomySerializer, TermSerializer, TermNodeSerializer,
+    ContentInstanceSerializer, ContentVersionSerializer, get_content_instance_prefetches
 )
+from .cache import (
+    RESPONSE_CACHE_TIMEOUT, ALL_CONTENT_INSTANCES_TAG, TERM_TREE_TAG, response_cache_key,
+    collect_response_tags, content_instance_tag, content_type_tag
+)
+from apps.core.cache import get_tag_versions, get_tagged, set_tagged
+from apps.core.pagination import OptionalKeysetPagination
+from apps.core.parsers import NDJSONParser
+from .bulk import BulkContentIngestor
+from .diff import get_version_diff
+from .revert import RevertError, revert_to_version
+from .export import get_export_languages, iter_export_lines
+from .filters import IndexedFieldFilter, IndexedFieldOrderingFilter, TermFilter
 
 # --- Basic Permissions ---
 # Define more granular permissions later if needed
@@ -68,8 +84,8 @@ class TermViewSet(viewsets.ModelViewSet):
         """Filter terms based on the taxonomy API ID from the URL."""
         taxonomy_api_id = self.kwargs.get('taxonomy_api_id')
         taxonomy = get_object_or_404(Taxonomy, api_id=taxonomy_api_id)
-        # TODO: Add ordering based on hierarchy if needed (e.g., using django-mptt)
-        return Term.objects.filter(taxonomy=taxonomy).select_related('parent').order_by('translated_names') # Basic ordering
+        # Path order: each term is followed by its subtree (see Term.path)
+        return Term.objects.filter(taxonomy=taxonomy).select_related('taxonomy').order_by('path')
 
     def perform_create(self, serializer):
         """Associate the term with the taxonomy from the URL."""
@@ -84,6 +100,32 @@ class TermViewSet(viewsets.ModelViewSet):
             context['taxonomy'] = get_object_or_404(Taxonomy, api_id=self.kwargs['taxonomy_api_id'])
         return context
 
+    @action(detail=True, methods=['get'])
+    def descendants(self, request, *args, **kwargs):
+        """All terms below this one, in path order, with one query."""
+        term = self.get_object()
+        descendants = self.get_queryset().filter(path__startswith=term.path, depth__gt=term.depth)
+        return Response(TermNodeSerializer(descendants, many=True, context=self.get_serializer_context()).data)
+
+    @action(detail=True, methods=['get'])
+    def ancestors(self, request, *args, **kwargs):
+        """The ancestors of this term, root first, with one query."""
+        term = self.get_object()
+        ancestors = self.get_queryset().filter(pk__in=term.ancestor_ids).order_by('depth')
+        return Response(TermNodeSerializer(ancestors, many=True, context=self.get_serializer_context()).data)
+
+    @action(detail=False, methods=['get'])
+    def tree(self, request, *args, **kwargs):
+        """The whole taxonomy as nested terms ('children'), built from one query."""
+        nodes = TermNodeSerializer(self.get_queryset(), many=True, context=self.get_serializer_context()).data
+        by_id = {node['id']: node for node in nodes}
+        roots = []
+        for node in nodes: # Path order: parents come before their children
+            node['children'] = []
+            parent = by_id.get(str(node['parent_id'])) if node['parent_id'] else None
+            (parent['children'] if parent is not None else roots).append(node)
+        return Response(roots)
+
 
 class ContentInstanceViewSet(viewsets.ModelViewSet):
     """
@@ -92,18 +134,23 @@ class ContentInstanceViewSet(viewsets.ModelViewSet):
     """
     serializer_class = ContentInstanceSerializer
     permission_classes = [IsEditorUser] # Editors/Admins manage content
+    pagination_class = OptionalKeysetPagination # ?pagination=cursor for keyset pages
+    # filter[<field>__<op>]= and ordering=field.<field> on indexed content fields,
+    # term=<id> for a term and everything below it
+    filter_backends = [DjangoFilterBackend, SearchFilter, IndexedFieldFilter, IndexedFieldOrderingFilter, TermFilter]
 
     def get_queryset(self):
         """
         Return Content Instances, potentially filtered by ContentType.
         Prefetch related data for efficiency.
         """
+        lang_code = self.request.query_params.get('lang') or settings.LANGUAGE_CODE
         queryset = ContentInstance.objects.select_related(
             'content_type', 'author'
         ).prefetch_related(
-            # Prefetch field instances efficiently
-            Prefetch('field_instances', queryset=ContentFieldInstance.objects.select_related('field_definition', 'language')),
-            Prefetch('terms', queryset=Term.objects.select_related('taxonomy')) # Prefetch terms
+            # Published documents; the live data of other instances is loaded by
+            # the list serializer for those only (see prefetch_content_instances)
+            *get_content_instance_prefetches(lang_code)
         ).all().order_by('-updated_at')
 
         # Optional filtering by content type api_id if provided in query params
@@ -113,6 +160,55 @@ class ContentInstanceViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def get_keyset_ordering(self):
+        if self.action == 'list_versions':
+            return ('-created_at', '-id')
+        return ('-updated_at', '-id')
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, super().retrieve, *args, **kwargs)
+
+    def _cached_response(self, request, handler, *args, **kwargs):
+        """
+        Serve list/retrieve responses from the tag-invalidated response cache
+        (see apps.content.cache). Only successful responses are cached.
+        """
+        pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        cache_key = response_cache_key(request, self.action, pk)
+        cached_data = get_tagged(cache_key)
+        if cached_data is not None:
+            return Response(cached_data)
+
+        # Capture the primary tag versions before building the response so a
+        # concurrent invalidation is never masked by this write
+        if pk:
+            primary_tags = [content_instance_tag(pk)]
+        elif request.query_params.get('content_type'):
+            primary_tags = [content_type_tag(request.query_params['content_type'])]
+        else:
+            primary_tags = [ALL_CONTENT_INSTANCES_TAG]
+        if not pk and request.query_params.get('term'):
+            primary_tags.append(TERM_TREE_TAG) # Results depend on the term hierarchy
+        try:
+            versions = get_tag_versions(primary_tags)
+        except Exception:
+            return handler(request, *args, **kwargs) # Cache unavailable
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            if pk:
+                items = [response.data]
+            elif isinstance(response.data, dict): # Paginated list
+                items = response.data.get('results', [])
+            else:
+                items = response.data
+            tags = collect_response_tags(items) | set(primary_tags)
+            set_tagged(cache_key, response.data, tags, timeout=RESPONSE_CACHE_TIMEOUT, versions=versions)
+        return response
+
     def perform_create(self, serializer):
         """Set author during creation."""
         # ContentType is set via request data, validated by serializer
@@ -122,12 +218,43 @@ class ContentInstanceViewSet(viewsets.ModelViewSet):
         # Author is not changed on update by default
         serializer.save()
 
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[NDJSONParser, parsers.JSONParser])
+    def bulk_ingest(self, request):
+        """
+        Create many instances from NDJSON (one create payload per line) or a JSON
+        array, using batched inserts. Invalid records are reported and skipped.
+        """
+        records = request.data
+        if isinstance(records, dict): # A single JSON object is not a batch
+            return Response(
+                {'detail': 'Expected NDJSON or a JSON array of content instances.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        result = BulkContentIngestor(user=request.user).ingest(records)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Stream all instances of a content type as NDJSON, with content_data
+        resolved per language. Params: content_type (required), status, lang (comma-separated).
+        """
+        content_type = get_object_or_404(ContentType, api_id=request.query_params.get('content_type'))
+        lang_param = request.query_params.get('lang')
+        lang_codes = get_export_languages(lang_param.split(',') if lang_param else None)
+        response = StreamingHttpResponse(
+            iter_export_lines(content_type, lang_codes, status=request.query_params.get('status')),
+            content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{content_type.api_id}.ndjson"'
+        return response
+
     # Add action for viewing versions
     @action(detail=True, methods=['get'], url_path='versions', permission_classes=[IsEditorUser])
     def list_versions(self, request, pk=None):
         """Retrieve the version history for a Content Instance."""
         instance = self.get_object()
-        versions = instance.versions.select_related('created_by').order_by('-created_at')
+        versions = instance.versions.select_related('created_by').defer('data').order_by('-created_at')
         # Paginate results if needed
         page = self.paginate_queryset(versions)
         if page is not None:
@@ -142,22 +269,34 @@ class ContentInstanceViewSet(viewsets.ModelViewSet):
     def retrieve_version(self, request, pk=None, version_pk=None):
         """Retrieve a specific version snapshot."""
         instance = self.get_object() # Ensure instance exists and user has permission
-        version = get_object_or_404(instance.versions.select_related('created_by'), pk=version_pk)
+        version = get_object_or_404(instance.versions.select_related('created_by').defer('data'), pk=version_pk)
         serializer = ContentVersionSerializer(version, context=self.get_serializer_context())
         return Response(serializer.data)
 
-    # Action to revert to a specific version? (More complex)
-    # @action(detail=True, methods=['post'], url_path='versions/(?P<version_pk>[^/.]+)/revert')
-    # def revert_to_version(self, request, pk=None, version_pk=None):
-    #     instance = self.get_object()
-    #     version = get_object_or_404(instance.versions, pk=version_pk)
-    #     # Logic to apply version.data_snapshot back to instance fields
-    #     # Needs careful implementation similar to serializer update logic
-    #     # ...
-    #     # Create a new version indicating the revert
-    #     ContentVersion.create_version(instance, user=request.user, message=f"Reverted to version {version_pk}")
-    #     serializer = self.get_serializer(instance)
-    #     return Response(serializer.data)
+    @action(
+        detail=True, methods=['get'], url_path=r'versions/(?P<version_pk>[^/.]+)/diff/(?P<other_version_pk>[^/.]+)',
+        permission_classes=[IsEditorUser]
+    )
+    def diff_versions(self, request, pk=None, version_pk=None, other_version_pk=None):
+        """Per-field, per-language changes from one version to another (see apps.content.diff)."""
+        instance = self.get_object()
+        diff = get_version_diff(instance, version_pk, other_version_pk)
+        if diff is None:
+            raise Http404
+        return Response(diff)
+
+    @action(detail=True, methods=['post'], url_path='versions/(?P<version_pk>[^/.]+)/revert', permission_classes=[IsEditorUser])
+    def revert_to_version(self, request, pk=None, version_pk=None):
+        """Restore the field values of a version (see apps.content.revert); creates one new version."""
+        instance = self.get_object()
+        version = get_object_or_404(instance.versions, pk=version_pk)
+        try:
+            revert_to_version(instance, version, user=request.user)
+        except RevertError as e:
+            return Response({'content_data': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        # get_object() prefetched the field values from before the revert
+        instance = self.get_queryset().get(pk=instance.pk)
+        return Response(self.get_serializer(instance).data)
 
 
 class ContentVersionViewSet(mixins.ListModelMixin,
@@ -168,9 +307,11 @@ class ContentVersionViewSet(mixins.ListModelMixin,
     Filtering by content instance is recommended via query parameters
     or by using the nested actions on ContentInstanceViewSet.
     """
-    queryset = ContentVersion.objects.select_related('content_instance', 'created_by').all().order_by('-created_at')
+    queryset = ContentVersion.objects.select_related('content_instance', 'created_by').defer('data').order_by('-created_at')
     serializer_class = ContentVersionSerializer
     permission_classes = [IsAdminUser] # Only Admins view all versions globally? Or Editors?
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('-created_at', '-id')
 
     # Add filtering by content_instance_id, user, date range etc.
     # filter_backends = [...]
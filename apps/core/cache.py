@@ -0,0 +1,193 @@
+"""
+Tag-based caching helpers built on Django's cache framework (Redis in production).
+
+Every tag (e.g. 'content_instance:<id>') has a version stamp stored in the cache.
+Cached entries record the versions of the tags they depend on and are treated
+as stale as soon as any of those versions changes, so invalidating a tag is a
+single cache write no matter how many entries depend on it.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+TAG_VERSION_PREFIX = 'tagver:'
+
+
+def make_cache_key(prefix, *parts):
+    """Builds a fixed-length cache key from arbitrary string parts."""
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f"{prefix}:{digest}"
+
+
+def _new_version():
+    # Time-based so a version evicted from the cache never reappears with an old value
+    return time.time_ns()
+
+
+def get_tag_versions(tags):
+    """Returns {tag: version} for the given tags, initializing missing versions."""
+    keys = {f"{TAG_VERSION_PREFIX}{tag}": tag for tag in tags}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, tag in keys.items():
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _new_version(), timeout=None)
+            version = cache.get(key)
+        versions[tag] = version
+    return versions
+
+
+def invalidate_tags(*tags):
+    """Marks every cached entry depending on any of the given tags as stale."""
+    for tag in tags:
+        key = f"{TAG_VERSION_PREFIX}{tag}"
+        try:
+            try:
+                cache.incr(key)
+            except ValueError: # Version not set (never used or evicted)
+                cache.set(key, _new_version(), timeout=None)
+        except Exception as e:
+            logger.warning(f"Could not invalidate cache tag '{tag}': {e}")
+
+
+def invalidate_tags_on_commit(*tags):
+    """Invalidates tags once the current transaction commits (immediately if none is open)."""
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+def invalidate_tags_now_and_on_commit(*tags):
+    """
+    For values cached per process (VersionedLocalCache): invalidating now keeps
+    this process from reading stale values inside the transaction, invalidating
+    on commit keeps other workers from holding values they rebuilt before it.
+    Until the transaction ends, VersionedLocalCache builds values depending on
+    these tags without caching them (see uncommitted_tags), so values read from
+    uncommitted rows are never left behind by a rollback.
+    """
+    invalidate_tags(*tags)
+    callback = partial(invalidate_tags, *tags)
+    transaction.on_commit(callback)
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        if not hasattr(connection, 'uncommitted_tag_invalidations'):
+            connection.uncommitted_tag_invalidations = []
+        connection.uncommitted_tag_invalidations.append((callback, tags))
+
+
+def uncommitted_tags():
+    """
+    The tags invalidated by invalidate_tags_now_and_on_commit in the current
+    transaction that has not committed or rolled back yet. An invalidation is
+    pending as long as its on_commit callback is: Django drops the callbacks
+    of a transaction (or savepoint) when it commits or rolls back.
+    """
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'uncommitted_tag_invalidations', None)
+    if not pending:
+        return set()
+    if connection.in_atomic_block:
+        registered = {id(entry[1]) for entry in connection.run_on_commit}
+        pending[:] = [(callback, tags) for callback, tags in pending if id(callback) in registered]
+    else:
+        pending.clear()
+    return {tag for __, tags in pending for tag in tags}
+
+
+def get_tagged(key):
+    """Returns the cached value for key, or None if missing or any of its tags changed."""
+    try:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        if get_tag_versions(entry['tags']) != entry['tags']:
+            return None
+        return entry['value']
+    except Exception as e:
+        logger.warning(f"Cache read failed for '{key}': {e}")
+        return None
+
+
+def set_tagged(key, value, tags, timeout=None, versions=None):
+    """
+    Caches value under key, recording the current versions of its dependency tags.
+    Pass versions captured *before* building the value (see get_tag_versions) to
+    avoid caching data that was invalidated while it was being built.
+    """
+    try:
+        tag_versions = get_tag_versions(set(tags) - set(versions or {}))
+        tag_versions.update(versions or {})
+        cache.set(key, {'tags': tag_versions, 'value': value}, timeout=timeout)
+    except Exception as e:
+        logger.warning(f"Cache write failed for '{key}': {e}")
+
+
+class VersionedLocalCache:
+    """
+    Two-level cache for small, hot values (e.g. compiled permission sets): each
+    value is kept in process memory and in the shared cache, both stamped with
+    the versions of its dependency tags. A lookup costs one cache round trip
+    (reading the tag versions); the value is only fetched from the shared cache,
+    or rebuilt, when the local copy is missing or stale. Invalidate entries with
+    invalidate_tags_now_and_on_commit. Without a working shared cache (e.g.
+    DummyCache) nothing is cached, since invalidations could not be seen.
+    """
+
+    def __init__(self, prefix, timeout=None, max_entries=1000):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # {key: (tag versions, value)}, least recently used first
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key, tags, build):
+        """Returns the value cached under key for the current tag versions, calling build() if needed."""
+        if uncommitted_tags().intersection(tags):
+            # Changed in this transaction: built from uncommitted rows, not cached
+            return build()
+        try:
+            versions = get_tag_versions(tags)
+        except Exception as e:
+            logger.warning(f"Cache read failed for '{self.prefix}:{key}': {e}")
+            return build() # Cache unavailable: correct, just not cached
+        if None in versions.values():
+            return build()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        cache_key = make_cache_key(self.prefix, key)
+        try:
+            shared = cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Cache read failed for '{cache_key}': {e}")
+            shared = None
+        if shared is not None and shared['tags'] == versions:
+            value = shared['value']
+        else:
+            value = build()
+            set_tagged(cache_key, value, tags, timeout=self.timeout, versions=versions)
+        self._store(key, versions, value)
+        return value
+
+    def clear(self):
+        """Drops this process' local copies (the shared cache is left alone)."""
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key, versions, value):
+        with self._lock:
+            self._entries[key] = (versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
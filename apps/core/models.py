@@ -1,6 +1,16 @@
+import copy
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from .cache import VersionedLocalCache
+
+# Active/default languages and the system settings are read on most requests:
+# they are cached per process, versioned by these tags (see apps.core.signals)
+LANGUAGES_TAG = 'core:languages'
+SYSTEM_SETTINGS_TAG = 'core:system_settings'
+core_cache = VersionedLocalCache('core')
+
 class Language(models.Model):
     """
     Represents a language supported by the CMS.
@@ -39,8 +49,13 @@ class Language(models.Model):
     def save(self, *args, **kwargs):
         # Ensure only one language can be default
         if self.is_default:
-            Language.objects.filter(is_default=True).update(is_default=False)
+            Language.objects.filter(is_default=True).exclude(pk=self.pk).update(is_default=False)
+            super().save(*args, **kwargs)
+            return
+        default = Language.get_default()
         super().save(*args, **kwargs)
+        if default is not None and default.pk != self.pk:
+            return # Another language is still the default
         # Ensure at least one language is default if none are after save
         if not Language.objects.filter(is_default=True).exists():
             first_active = Language.objects.filter(is_active=True).first()
@@ -48,6 +63,20 @@ class Language(models.Model):
                 first_active.is_default = True
                 first_active.save(update_fields=['is_default'])
 
+    @staticmethod
+    def get_active():
+        """Active languages, ordered by name (cached, no query in steady state; copies, so callers may modify them)."""
+        return copy.deepcopy(core_cache.get_or_set(
+            'active_languages', [LANGUAGES_TAG], lambda: list(Language.objects.filter(is_active=True))
+        ))
+
+    @staticmethod
+    def get_default():
+        """The default language, or None (cached; a copy)."""
+        return copy.deepcopy(core_cache.get_or_set(
+            'default_language', [LANGUAGES_TAG], lambda: Language.objects.filter(is_default=True).first()
+        ))
+
 
 class SystemSetting(models.Model):
     """
@@ -109,6 +138,12 @@ class SystemSetting(models.Model):
 
     @classmethod
     def load(cls):
-        # Convenience method to get the singleton instance
-        obj, created = cls.objects.get_or_create(pk=1)
+        # Convenience method to get the singleton instance (cached; a deep copy, so callers
+        # may modify it, its external_integrations and its default_language)
+        obj = core_cache.get_or_set('system_settings', [SYSTEM_SETTINGS_TAG, LANGUAGES_TAG], cls._load)
+        return copy.deepcopy(obj)
+
+    @classmethod
+    def _load(cls):
+        obj, created = cls.objects.select_related('default_language').get_or_create(pk=1)
         return obj
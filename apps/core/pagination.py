@@ -0,0 +1,246 @@
+"""
+Pagination classes shared across apps.
+
+Page-number pagination (the REST_FRAMEWORK default) needs an OFFSET scan and a
+COUNT(*) per page, both of which grow linearly with table size. Views using
+OptionalKeysetPagination keep page-number behaviour by default, but clients can
+opt into keyset ("seek") pagination with `?pagination=cursor`: pages are then
+fetched with a WHERE clause on a composite sort key (e.g. `(-updated_at, -id)`),
+so every page costs the same regardless of depth, and no total count is computed.
+"""
+import base64
+import binascii
+import datetime
+import json
+import uuid
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over a composite, unique sort key.
+
+    The sort key is taken from the view's `get_keyset_ordering()` or
+    `keyset_ordering` attribute. It must end in a unique field (usually '-id')
+    and should only contain non-nullable fields. Cursors are opaque tokens
+    holding the key values of the boundary row and the paging direction.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    ordering = ('-id',)
+    invalid_cursor_message = _('Invalid cursor')
+    unsupported_ordering_message = _('Cursor pagination always sorts by "%(ordering)s".')
+
+    def get_ordering(self, view):
+        if hasattr(view, 'get_keyset_ordering'):
+            return tuple(view.get_keyset_ordering())
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.ordering = self.get_ordering(view)
+        self.check_requested_ordering(request)
+        values, reverse = self.decode_cursor(request)
+        if values is not None:
+            values = self.parse_cursor_values(queryset.model, values)
+
+        ordering = invert_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(build_keyset_filter(ordering, values))
+
+        # Fetch one extra row to know whether there is another page in this direction
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def get_position(self, instance):
+        """Sort key values of a row, in ordering order."""
+        return [
+            reduce(getattr, field.lstrip('-').split('__'), instance)
+            for field in self.ordering
+        ]
+
+    def encode_cursor(self, values, reverse):
+        values = [encode_cursor_value(value) for value in values]
+        token = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(token.encode('ascii')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        """Returns (values, reverse) from the request, or (None, False) for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            token = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii'))
+            values, reverse = token['v'], bool(token['r'])
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def check_requested_ordering(self, request):
+        """Rows can only be sought on the keyset ordering: an explicit other `ordering` is a 400."""
+        requested = request.query_params.get(api_settings.ORDERING_PARAM)
+        if requested and tuple(term.strip() for term in requested.split(',')) != self.ordering:
+            raise ValidationError({
+                api_settings.ORDERING_PARAM: [self.unsupported_ordering_message % {'ordering': ','.join(self.ordering)}]
+            })
+
+    def parse_cursor_values(self, model, values):
+        """
+        Converts the cursor values to the Python types of their model fields. A
+        well-formed cursor with values that do not fit (e.g. an edited token) is
+        a 404 rather than a database error.
+        """
+        parsed = []
+        for field_name, value in zip(self.ordering, values):
+            try:
+                field = get_model_field(model, field_name.lstrip('-'))
+                value = field.to_python(value)
+            except (FieldDoesNotExist, DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            parsed.append(value)
+        return parsed
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination unless the client asks for keyset pagination with
+    `?pagination=cursor` (or follows a `cursor` link), see KeysetPagination.
+    """
+    keyset_class = KeysetPagination
+    keyset_query_param = 'pagination'
+    keyset_query_value = 'cursor'
+
+    def keyset_requested(self, request):
+        return (
+            request.query_params.get(self.keyset_query_param) == self.keyset_query_value
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_requested(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+def encode_cursor_value(value):
+    """
+    JSON-safe form of a sort key value. Unlike DjangoJSONEncoder, datetimes keep
+    full microsecond precision, otherwise rows could be skipped or repeated.
+    """
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def get_model_field(model, path):
+    """The model field at the end of a `__`-separated lookup path."""
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def invert_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+def build_keyset_filter(ordering, values):
+    """
+    Q selecting rows strictly after `values` in `ordering`, i.e. the expansion of
+    the row comparison (a, b, c) > (x, y, z):
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    A redundant bound on the leading field (a >= x) is added so the database can
+    use it as an index range condition.
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        op = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{op}': values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values[:i]):
+            step &= Q(**{prev_field.lstrip('-'): prev_value})
+        condition |= step
+    leading = ordering[0]
+    leading_op = 'lte' if leading.startswith('-') else 'gte'
+    return Q(**{f'{leading.lstrip("-")}__{leading_op}': values[0]}) & condition
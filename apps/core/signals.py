@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_tags_now_and_on_commit
+from .models import Language, SystemSetting, LANGUAGES_TAG, SYSTEM_SETTINGS_TAG
+
+
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+def language_changed_handler(sender, instance, **kwargs):
+    invalidate_tags_now_and_on_commit(LANGUAGES_TAG) # Also covers the settings' default_language
+
+
+@receiver(post_save, sender=SystemSetting)
+@receiver(post_delete, sender=SystemSetting)
+def system_setting_changed_handler(sender, instance, **kwargs):
+    invalidate_tags_now_and_on_commit(SYSTEM_SETTINGS_TAG)
@@ -1,3 +1,61 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
 
-# Create your tests here.
+from .models import Language, SystemSetting, core_cache
+
+
+class Rollback(Exception):
+    pass
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CoreCacheTests(TransactionTestCase):
+    """Changes commit here (no test-wide transaction), as in requests."""
+
+    def setUp(self):
+        cache.clear()
+        core_cache.clear()
+        self.addCleanup(core_cache.clear)
+        Language.objects.create(code='en', name='English', is_default=True)
+        SystemSetting().save()
+
+    def active_codes(self):
+        return [language.code for language in Language.get_active()]
+
+    def test_values_are_cached(self):
+        Language.get_active()
+        SystemSetting.load()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.active_codes(), ['en'])
+            self.assertEqual(SystemSetting.load().default_language, None)
+
+    def test_rolled_back_changes_are_not_cached(self):
+        self.assertEqual(self.active_codes(), ['en'])
+        self.assertEqual(SystemSetting.load().site_name, "Lithographer CMS")
+
+        with self.assertRaises(Rollback), transaction.atomic():
+            Language.objects.create(code='fr', name='French')
+            settings = SystemSetting.load()
+            settings.site_name = "Renamed"
+            settings.save()
+            self.assertEqual(self.active_codes(), ['en', 'fr']) # This transaction sees its changes
+            self.assertEqual(SystemSetting.load().site_name, "Renamed")
+            raise Rollback
+
+        self.assertEqual(self.active_codes(), ['en'])
+        self.assertEqual(SystemSetting.load().site_name, "Lithographer CMS")
+        core_cache.clear() # Another worker: only the shared cache
+        self.assertEqual(self.active_codes(), ['en'])
+        self.assertEqual(SystemSetting.load().site_name, "Lithographer CMS")
+
+    def test_callers_get_copies(self):
+        settings = SystemSetting.load()
+        settings.external_integrations['analytics'] = 'UA-1'
+        Language.get_active()[0].name = 'Changed'
+        Language.get_default().name = 'Changed'
+
+        self.assertEqual(SystemSetting.load().external_integrations, {})
+        self.assertEqual(Language.get_active()[0].name, 'English')
+        self.assertEqual(Language.get_default().name, 'English')
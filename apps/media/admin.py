@@ -37,7 +37,7 @@ class MediaAssetAdmin(admin.ModelAdmin):
     list_filter = ('mime_type', 'folder', 'upload_timestamp', 'tags')
     # Update search fields for JSON translation fields
     search_fields = ('translated_title', 'filename', 'translated_alt_text', 'translated_caption', 'custom_metadata', 'tags__name', 'uploader__email')
-    readonly_fields = ('filename', 'mime_type', 'size', 'width', 'height', 'upload_timestamp', 'uploader', 'optimized_versions', 'file_url_display')
+    readonly_fields = ('filename', 'mime_type', 'size', 'checksum', 'width', 'height', 'upload_timestamp', 'uploader', 'optimized_versions', 'file_url_display')
     filter_horizontal = ('tags',)
     list_select_related = ('folder', 'uploader') # Optimize queries
 
@@ -48,7 +48,7 @@ class MediaAssetAdmin(admin.ModelAdmin):
         (_('Translated Metadata'), {'fields': ('translated_title', 'translated_alt_text', 'translated_caption')}),
         (_('Other Metadata'), {'fields': ('tags', 'custom_metadata')}),
         (_('Organization'), {'fields': ('folder',)}),
-        (_('File Info (Read-Only)'), {'fields': ('filename', 'mime_type', 'size_display', 'dimensions_display', 'upload_timestamp', 'uploader_email')}),
+        (_('File Info (Read-Only)'), {'fields': ('filename', 'mime_type', 'size_display', 'checksum', 'dimensions_display', 'upload_timestamp', 'uploader_email')}),
         (_('Optimized Versions (Read-Only)'), {'fields': ('optimized_versions',)}),
     )
 
@@ -64,8 +64,10 @@ class MediaAssetAdmin(admin.ModelAdmin):
         # Simple KB/MB formatting
         if obj.size < 1024 * 1024:
             return f"{obj.size / 1024:.1f} KB"
-        else:
+        elif obj.size < 1024 ** 3:
             return f"{obj.size / (1024 * 1024):.1f} MB"
+        else:
+            return f"{obj.size / 1024 ** 3:.2f} GB"
     size_display.short_description = _("Size")
     size_display.admin_order_field = 'size'
 
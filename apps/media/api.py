@@ -1,7 +1,10 @@
+import os
 from rest_framework import serializers
+from django.conf import settings
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
-from .models import Folder, MediaTag, MediaAsset, ImageOptimizationProfile
+from .models import Folder, MediaTag, MediaAsset, ImageOptimizationProfile, MediaUploadSession
 from apps.users.api import CMSUserSerializer # For uploader info
 
 class FolderSerializer(serializers.ModelSerializer):
@@ -46,14 +49,14 @@ class MediaAssetSerializer(serializers.ModelSerializer):
         fields = [
             'id',
             'translated_title', 'translated_alt_text', 'translated_caption', # Replaced fields
-            'file', 'file_url', 'filename', 'mime_type', 'size',
+            'file', 'file_url', 'filename', 'mime_type', 'size', 'checksum',
             'width', 'height', 'dimensions',
             'folder_id', 'tags', 'tag_ids',
             'custom_metadata', 'uploader', 'uploader_detail', 'upload_timestamp',
             'optimized_versions'
         ]
         read_only_fields = [
-            'id', 'file_url', 'filename', 'mime_type', 'size', 'width', 'height',
+            'id', 'file_url', 'filename', 'mime_type', 'size', 'checksum', 'width', 'height',
             'dimensions', 'uploader_detail', 'upload_timestamp', 'optimized_versions'
         ]
         extra_kwargs = {
@@ -73,15 +76,20 @@ class MediaAssetSerializer(serializers.ModelSerializer):
         validated_data['uploader'] = self.context['request'].user
         # Extract tags data if provided via tag_ids
         tags_data = validated_data.pop('tags', None)
+        # Provisional metadata from the upload; the processing task verifies it
+        uploaded_file = validated_data['file']
+        validated_data['mime_type'] = getattr(uploaded_file, 'content_type', None) or ''
+        validated_data['size'] = uploaded_file.size
 
         instance = super().create(validated_data)
 
         if tags_data is not None:
             instance.tags.set(tags_data)
 
-        # TODO: Trigger async task for metadata extraction and optimization
-        # from .tasks import process_media_asset
-        # process_media_asset.delay(instance.id)
+        # Metadata extraction and optimized versions are generated asynchronously
+        from .tasks import process_media_asset
+        asset_id = str(instance.id)
+        transaction.on_commit(lambda: process_media_asset.delay(asset_id))
 
         return instance
 
@@ -108,4 +116,47 @@ class ImageOptimizationProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = ImageOptimizationProfile
         fields = ['id', 'name', 'width', 'height', 'format', 'quality', 'is_active', 'created_at']
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+
+
+UPLOAD_CHUNK_SIZE = getattr(settings, 'MEDIA_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+UPLOAD_MAX_CHUNK_SIZE = getattr(settings, 'MEDIA_UPLOAD_MAX_CHUNK_SIZE', 64 * 1024 * 1024)
+UPLOAD_MIN_CHUNK_SIZE = 64 * 1024
+
+
+class MediaUploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for resumable chunked upload sessions."""
+    folder_id = serializers.PrimaryKeyRelatedField(
+        queryset=Folder.objects.all(), source='folder', allow_null=True, required=False
+    )
+    chunk_size = serializers.IntegerField(
+        min_value=UPLOAD_MIN_CHUNK_SIZE, max_value=UPLOAD_MAX_CHUNK_SIZE, required=False
+    )
+    received_chunks = serializers.SerializerMethodField(read_only=True)
+    received_size = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = MediaUploadSession
+        fields = [
+            'id', 'filename', 'mime_type', 'total_size', 'chunk_size', 'folder_id',
+            'status', 'error', 'asset', 'received_chunks', 'received_size', 'created_at', 'expires_at'
+        ]
+        read_only_fields = ['id', 'status', 'error', 'asset', 'created_at', 'expires_at']
+
+    def get_received_chunks(self, obj):
+        # Indexes already stored, so clients can resume after an interruption
+        return [chunk.index for chunk in obj.chunks.all()]
+
+    def get_received_size(self, obj):
+        return sum(chunk.size for chunk in obj.chunks.all())
+
+    def validate_filename(self, value):
+        value = os.path.basename(value.replace('\\', '/'))
+        if not value:
+            raise serializers.ValidationError(_("A filename is required."))
+        return value
+
+    def create(self, validated_data):
+        validated_data.setdefault('chunk_size', UPLOAD_CHUNK_SIZE)
+        return super().create(validated_data)
+
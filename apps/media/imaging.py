@@ -0,0 +1,111 @@
+"""
+Image helpers for the media optimization pipeline (see tasks.process_media_asset).
+
+The original upload is decoded once; every ImageOptimizationProfile rendition
+is then derived from that in-memory image instead of re-reading and
+re-decoding the file per profile.
+"""
+import io
+import os
+from collections import namedtuple
+
+from django.utils.text import slugify
+from PIL import ExifTags, Image, ImageOps
+
+# Output format -> (file extension, MIME type)
+FORMAT_DETAILS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'PNG': ('png', 'image/png'),
+    'WEBP': ('webp', 'image/webp'),
+    'AVIF': ('avif', 'image/avif'),
+    'GIF': ('gif', 'image/gif'),
+}
+# Ad-hoc transform with the same attributes render_rendition reads from a profile
+RenditionParams = namedtuple('RenditionParams', ['width', 'height', 'format', 'quality'])
+
+# Formats without alpha channel support
+OPAQUE_FORMATS = {'JPEG'}
+# EXIF orientations that swap width and height
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def is_format_supported(image_format):
+    """Whether the installed Pillow can encode `image_format` (AVIF needs Pillow >= 11.2 or a plugin)."""
+    Image.init()
+    return image_format in Image.SAVE
+
+
+def get_decode_size(profiles):
+    """
+    Largest bounding box any profile needs, or None if some profile keeps the
+    original size. Used to let JPEG decoding downscale early (Image.draft).
+    """
+    sizes = []
+    for profile in profiles:
+        if not profile.width and not profile.height:
+            return None
+        sizes.append((profile.width or profile.height, profile.height or profile.width))
+    if not sizes:
+        return None
+    return max(w for w, _ in sizes), max(h for _, h in sizes)
+
+
+def decode_image(file, max_size=None):
+    """
+    Decodes an image file once. Returns (image, original_format, original_size).
+    EXIF orientation is applied so renditions are stored upright.
+    """
+    image = Image.open(file)
+    original_format = image.format
+    original_size = image.size
+    if image.getexif().get(ExifTags.Base.Orientation) in ROTATED_ORIENTATIONS:
+        original_size = original_size[::-1] # Report the upright dimensions
+    if max_size and original_format == 'JPEG':
+        # Decode at a reduced scale (still covering max_size in either orientation)
+        # instead of full resolution
+        longest_side = max(max_size)
+        image.draft(image.mode, (longest_side, longest_side))
+    image.load()
+    image = ImageOps.exif_transpose(image)
+    return image, original_format, original_size
+
+
+def render_rendition(image, profile, original_format):
+    """
+    Renders one profile (ImageOptimizationProfile or RenditionParams) from the
+    decoded image. Returns (bytes, format, width, height).
+    Images are only scaled down, never up.
+    """
+    output_format = profile.format or original_format or 'PNG'
+    rendition = image.copy()
+    if profile.width or profile.height:
+        rendition.thumbnail(
+            (profile.width or rendition.width, profile.height or rendition.height),
+            Image.Resampling.LANCZOS
+        )
+
+    if output_format in OPAQUE_FORMATS and rendition.mode not in ('RGB', 'L'):
+        rendition = rendition.convert('RGB')
+    elif output_format not in OPAQUE_FORMATS and rendition.mode == 'P':
+        rendition = rendition.convert('RGBA')
+
+    save_kwargs = {}
+    if output_format in ('JPEG', 'WEBP', 'AVIF'):
+        if profile.quality:
+            save_kwargs['quality'] = profile.quality
+    if output_format in ('JPEG', 'PNG'):
+        save_kwargs['optimize'] = True
+    if output_format == 'JPEG':
+        save_kwargs['progressive'] = True
+
+    buffer = io.BytesIO()
+    rendition.save(buffer, format=output_format, **save_kwargs)
+    return buffer.getvalue(), output_format, rendition.width, rendition.height
+
+
+def get_rendition_path(asset, profile, output_format):
+    """Storage path of a profile rendition, next to the original file."""
+    extension = FORMAT_DETAILS.get(output_format, (output_format.lower(), None))[0]
+    directory = os.path.dirname(asset.file.name)
+    base_name = os.path.splitext(os.path.basename(asset.file.name))[0]
+    return os.path.join(directory, 'renditions', f"{base_name}_{slugify(profile.name)}.{extension}")
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media', '0002_remove_mediaasset_alt_text_remove_mediaasset_caption_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mediaasset',
+            index=models.Index(fields=['-upload_timestamp', '-id'], name='media_media_upload__8c4cc1_idx'),
+        ),
+    ]
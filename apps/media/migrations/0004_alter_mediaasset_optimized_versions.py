@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media', '0003_mediaasset_media_media_upload__8c4cc1_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mediaasset',
+            name='optimized_versions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Generated renditions keyed by optimization profile name (path, url, format, mime_type, width, height, size).', verbose_name='Optimized Versions'),
+        ),
+    ]
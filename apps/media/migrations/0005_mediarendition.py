@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:56
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media', '0004_alter_mediaasset_optimized_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaRendition',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('cache_key', models.CharField(editable=False, max_length=64, unique=True, verbose_name='Cache Key')),
+                ('path', models.CharField(editable=False, max_length=500, verbose_name='Storage Path')),
+                ('format', models.CharField(editable=False, max_length=10, verbose_name='Format')),
+                ('width', models.PositiveIntegerField(editable=False, verbose_name='Width (px)')),
+                ('height', models.PositiveIntegerField(editable=False, verbose_name='Height (px)')),
+                ('size', models.PositiveIntegerField(editable=False, verbose_name='File Size (bytes)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Last Accessed')),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='media.mediaasset', verbose_name='Media Asset')),
+            ],
+            options={
+                'verbose_name': 'Media Rendition',
+                'verbose_name_plural': 'Media Renditions',
+                'ordering': ['-last_accessed_at'],
+            },
+        ),
+    ]
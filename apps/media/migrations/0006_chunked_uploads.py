@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:59
+
+import apps.media.models
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media', '0005_mediarendition'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='checksum',
+            field=models.CharField(blank=True, editable=False, help_text='Computed while assembling chunked uploads.', max_length=64, verbose_name='Checksum (SHA-256)'),
+        ),
+        migrations.AlterField(
+            model_name='mediaasset',
+            name='size',
+            field=models.PositiveBigIntegerField(editable=False, null=True, verbose_name='File Size (bytes)'),
+        ),
+        migrations.CreateModel(
+            name='MediaUploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Filename')),
+                ('mime_type', models.CharField(blank=True, max_length=100, verbose_name='MIME Type')),
+                ('total_size', models.PositiveBigIntegerField(blank=True, help_text='Declared size, verified on completion if given.', null=True, verbose_name='Total Size (bytes)')),
+                ('chunk_size', models.PositiveIntegerField(verbose_name='Chunk Size (bytes)')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed')], default='pending', max_length=20, verbose_name='Status')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True, default=apps.media.models.get_upload_session_expiry, verbose_name='Expires At')),
+                ('asset', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_session', to='media.mediaasset', verbose_name='Media Asset')),
+                ('folder', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='media.folder', verbose_name='Folder')),
+                ('uploader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media_upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='Uploader')),
+            ],
+            options={
+                'verbose_name': 'Media Upload Session',
+                'verbose_name_plural': 'Media Upload Sessions',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MediaUploadChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(verbose_name='Index')),
+                ('path', models.CharField(max_length=500, verbose_name='Storage Path')),
+                ('size', models.PositiveIntegerField(verbose_name='Size (bytes)')),
+                ('checksum', models.CharField(max_length=64, verbose_name='Checksum (SHA-256)')),
+                ('received_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='media.mediauploadsession', verbose_name='Upload Session')),
+            ],
+            options={
+                'verbose_name': 'Media Upload Chunk',
+                'verbose_name_plural': 'Media Upload Chunks',
+                'ordering': ['session', 'index'],
+                'unique_together': {('session', 'index')},
+            },
+        ),
+    ]
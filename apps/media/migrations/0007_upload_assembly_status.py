@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media', '0006_chunked_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediauploadsession',
+            name='error',
+            field=models.TextField(blank=True, help_text='Why the last assembly failed.', verbose_name='Error'),
+        ),
+        migrations.AddField(
+            model_name='mediauploadsession',
+            name='expected_checksum',
+            field=models.CharField(blank=True, help_text='Given on completion, verified once the chunks are assembled.', max_length=64, verbose_name='Expected Checksum (SHA-256)'),
+        ),
+        migrations.AlterField(
+            model_name='mediaasset',
+            name='checksum',
+            field=models.CharField(blank=True, editable=False, help_text='Computed when the file is processed or a chunked upload is assembled.', max_length=64, verbose_name='Checksum (SHA-256)'),
+        ),
+        migrations.AlterField(
+            model_name='mediauploadsession',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('assembling', 'Assembling'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Status'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 import uuid
 import os
+from datetime import timedelta
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from django.core.files.storage import default_storage
@@ -89,7 +91,11 @@ class MediaAsset(models.Model):
     # Store common metadata directly
     filename = models.CharField(_("Original Filename"), max_length=255, editable=False)
     mime_type = models.CharField(_("MIME Type"), max_length=100, editable=False, blank=True)
-    size = models.PositiveIntegerField(_("File Size (bytes)"), editable=False, null=True)
+    size = models.PositiveBigIntegerField(_("File Size (bytes)"), editable=False, null=True)
+    checksum = models.CharField(
+        _("Checksum (SHA-256)"), max_length=64, editable=False, blank=True,
+        help_text=_("Computed when the file is processed or a chunked upload is assembled.")
+    )
     # Image specific fields (populated by signal/task)
     width = models.PositiveIntegerField(_("Width (px)"), null=True, blank=True, editable=False)
     height = models.PositiveIntegerField(_("Height (px)"), null=True, blank=True, editable=False)
@@ -136,13 +142,16 @@ class MediaAsset(models.Model):
         default=dict,
         blank=True,
         editable=False,
-        help_text=_("Stores URLs/paths to different optimized versions (e.g., {'thumbnail': '...', 'webp': '...'}).")
+        help_text=_("Generated renditions keyed by optimization profile name (path, url, format, mime_type, width, height, size).")
     )
 
     class Meta:
         verbose_name = _("Media Asset")
         verbose_name_plural = _("Media Assets")
         ordering = ['-upload_timestamp']
+        indexes = [
+            models.Index(fields=['-upload_timestamp', '-id']), # Keyset pagination
+        ]
 
     def __str__(self):
         # Use helper to get title in current language or fallback
@@ -226,6 +235,136 @@ class ImageOptimizationProfile(models.Model):
     def __str__(self):
         return self.name
 
+
+class MediaRendition(models.Model):
+    """
+    An on-demand image derivative (see MediaAssetViewSet.render), stored under a
+    content-addressed key: the hash of the source file and the transform
+    parameters. Evicted least-recently-used once the total size exceeds
+    MEDIA_RENDITION_CACHE_MAX_BYTES.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    asset = models.ForeignKey(
+        MediaAsset,
+        on_delete=models.CASCADE,
+        related_name='renditions',
+        verbose_name=_("Media Asset")
+    )
+    cache_key = models.CharField(_("Cache Key"), max_length=64, unique=True, editable=False)
+    path = models.CharField(_("Storage Path"), max_length=500, editable=False)
+    format = models.CharField(_("Format"), max_length=10, editable=False)
+    width = models.PositiveIntegerField(_("Width (px)"), editable=False)
+    height = models.PositiveIntegerField(_("Height (px)"), editable=False)
+    size = models.PositiveIntegerField(_("File Size (bytes)"), editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(_("Last Accessed"), default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = _("Media Rendition")
+        verbose_name_plural = _("Media Renditions")
+        ordering = ['-last_accessed_at']
+
+    def __str__(self):
+        return f"{self.asset_id} ({self.width}x{self.height} {self.format})"
+
+
+UPLOAD_STATUS_PENDING = 'pending'
+UPLOAD_STATUS_ASSEMBLING = 'assembling'
+UPLOAD_STATUS_COMPLETED = 'completed'
+UPLOAD_STATUS_FAILED = 'failed'
+UPLOAD_STATUS_CHOICES = [
+    (UPLOAD_STATUS_PENDING, _('Pending')),
+    (UPLOAD_STATUS_ASSEMBLING, _('Assembling')),
+    (UPLOAD_STATUS_COMPLETED, _('Completed')),
+    (UPLOAD_STATUS_FAILED, _('Failed')),
+]
+
+def get_upload_session_expiry():
+    return timezone.now() + timedelta(seconds=getattr(settings, 'MEDIA_UPLOAD_SESSION_TTL', 60 * 60 * 24))
+
+
+class MediaUploadSession(models.Model):
+    """
+    A resumable chunked upload (see MediaUploadViewSet). Chunks are written to
+    storage as separate part files; on completion a background task assembles
+    them and only then creates the MediaAsset.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploader = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='media_upload_sessions',
+        verbose_name=_("Uploader")
+    )
+    filename = models.CharField(_("Filename"), max_length=255)
+    mime_type = models.CharField(_("MIME Type"), max_length=100, blank=True)
+    total_size = models.PositiveBigIntegerField(
+        _("Total Size (bytes)"), null=True, blank=True,
+        help_text=_("Declared size, verified on completion if given.")
+    )
+    chunk_size = models.PositiveIntegerField(_("Chunk Size (bytes)"))
+    folder = models.ForeignKey(
+        Folder,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name=_("Folder")
+    )
+    status = models.CharField(_("Status"), max_length=20, choices=UPLOAD_STATUS_CHOICES, default=UPLOAD_STATUS_PENDING)
+    expected_checksum = models.CharField(
+        _("Expected Checksum (SHA-256)"), max_length=64, blank=True,
+        help_text=_("Given on completion, verified once the chunks are assembled.")
+    )
+    error = models.TextField(_("Error"), blank=True, help_text=_("Why the last assembly failed."))
+    asset = models.OneToOneField(
+        MediaAsset,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload_session',
+        verbose_name=_("Media Asset")
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(_("Expires At"), default=get_upload_session_expiry, db_index=True)
+
+    class Meta:
+        verbose_name = _("Media Upload Session")
+        verbose_name_plural = _("Media Upload Sessions")
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()})"
+
+    def get_part_path(self, index):
+        """Storage path of one uploaded chunk."""
+        return f"uploads/{self.id}/{index:06d}.part"
+
+
+class MediaUploadChunk(models.Model):
+    """One received chunk of a MediaUploadSession."""
+    session = models.ForeignKey(
+        MediaUploadSession,
+        on_delete=models.CASCADE,
+        related_name='chunks',
+        verbose_name=_("Upload Session")
+    )
+    index = models.PositiveIntegerField(_("Index"))
+    path = models.CharField(_("Storage Path"), max_length=500)
+    size = models.PositiveIntegerField(_("Size (bytes)"))
+    checksum = models.CharField(_("Checksum (SHA-256)"), max_length=64)
+    received_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Media Upload Chunk")
+        verbose_name_plural = _("Media Upload Chunks")
+        unique_together = ('session', 'index')
+        ordering = ['session', 'index']
+
+    def __str__(self):
+        return f"{self.session_id} #{self.index}"
+
+
 # Optional: MediaVersion model
 # class MediaVersion(models.Model):
 #     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -0,0 +1,192 @@
+"""
+On-demand image renditions (`GET /media/assets/<id>/render?w=&h=&fmt=&q=`).
+
+Each rendition is stored once under a content-addressed key, the SHA-256 of
+the source file's checksum and the normalized transform parameters (requests
+producing the same image, e.g. any width above the original's, share a key).
+The key doubles as a strong ETag, and responses can be cached for a long time.
+Old renditions are evicted least-recently-used when the cache exceeds its size cap.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from PIL import Image
+
+from .imaging import FORMAT_DETAILS, RenditionParams, decode_image, is_format_supported, render_rendition
+from .models import MediaAsset, MediaRendition
+
+logger = logging.getLogger(__name__)
+
+MAX_DIMENSION = getattr(settings, 'MEDIA_RENDITION_MAX_DIMENSION', 4096)
+CACHE_MAX_BYTES = getattr(settings, 'MEDIA_RENDITION_CACHE_MAX_BYTES', 5 * 1024 ** 3)
+# last_accessed_at is refreshed at most this often per rendition (avoids a write per hit)
+ACCESS_UPDATE_INTERVAL = getattr(settings, 'MEDIA_RENDITION_ACCESS_UPDATE_INTERVAL', 3600)
+EVICTION_BATCH_SIZE = 500
+# Query parameter values -> output format
+FORMAT_ALIASES = {
+    'jpg': 'JPEG', 'jpeg': 'JPEG', 'png': 'PNG', 'webp': 'WEBP', 'avif': 'AVIF',
+}
+FORMAT_BY_MIME_TYPE = {mime_type: image_format for image_format, (__, mime_type) in FORMAT_DETAILS.items()}
+# Formats render_rendition passes the quality to
+QUALITY_FORMATS = {'JPEG', 'WEBP', 'AVIF'}
+
+
+class InvalidRenditionParams(ValueError):
+    pass
+
+
+class InvalidRenditionSource(ValueError):
+    """The original file cannot be decoded as an image."""
+
+
+def parse_rendition_params(query_params):
+    """Validates `w`, `h`, `fmt` and `q` into a normalized RenditionParams."""
+    def dimension(name):
+        raw = query_params.get(name)
+        if raw in (None, ''):
+            return None
+        try:
+            value = int(raw)
+        except ValueError:
+            raise InvalidRenditionParams(f"'{name}' must be an integer.")
+        if not 1 <= value <= MAX_DIMENSION:
+            raise InvalidRenditionParams(f"'{name}' must be between 1 and {MAX_DIMENSION}.")
+        return value
+
+    width, height = dimension('w'), dimension('h')
+    output_format = None
+    if query_params.get('fmt'):
+        output_format = FORMAT_ALIASES.get(query_params['fmt'].lower())
+        if output_format is None or not is_format_supported(output_format):
+            raise InvalidRenditionParams(f"Unsupported format '{query_params['fmt']}'.")
+    quality = None
+    if query_params.get('q'):
+        try:
+            quality = int(query_params['q'])
+        except ValueError:
+            raise InvalidRenditionParams("'q' must be an integer.")
+        if not 1 <= quality <= 100:
+            raise InvalidRenditionParams("'q' must be between 1 and 100.")
+    return RenditionParams(width=width, height=height, format=output_format, quality=quality)
+
+
+def normalize_rendition_params(asset, params):
+    """
+    Rewrites `params` to the smallest equivalent form for the asset, so that
+    requests producing the same image share a rendition: the requested box is
+    clamped to the original size (images are never scaled up), the dimension
+    that does not constrain the result is dropped, the format defaults to the
+    original's and the quality is dropped for formats that ignore it. Needs the
+    asset's dimensions and MIME type; unchanged until those are known.
+    """
+    if asset.width and asset.height and (params.width or params.height):
+        width_scale = params.width / asset.width if params.width else 1
+        height_scale = params.height / asset.height if params.height else 1
+        if min(width_scale, height_scale) >= 1:
+            params = params._replace(width=None, height=None)
+        elif width_scale <= height_scale:
+            params = params._replace(height=None)
+        else:
+            params = params._replace(width=None)
+    output_format = params.format or FORMAT_BY_MIME_TYPE.get(asset.mime_type)
+    if output_format:
+        params = params._replace(format=output_format)
+        if output_format not in QUALITY_FORMATS:
+            params = params._replace(quality=None)
+    return params
+
+
+def get_rendition_key(asset, params):
+    """
+    Content-addressed key: hash of the source file's SHA-256 checksum (its
+    storage identity until the checksum is computed) and the parameters.
+    """
+    source = asset.checksum or f"{asset.pk}:{asset.file.name}:{asset.size}"
+    parameters = f"{params.width}:{params.height}:{params.format}:{params.quality}"
+    return hashlib.sha256(f"{source}|{parameters}".encode('utf-8')).hexdigest()
+
+
+def get_stored_rendition(cache_key):
+    """Returns the stored MediaRendition for `cache_key`, or None if it must be (re)generated."""
+    rendition = MediaRendition.objects.filter(cache_key=cache_key).first()
+    if rendition is not None and default_storage.exists(rendition.path):
+        _touch(rendition)
+        return rendition
+    if rendition is not None: # File vanished from storage, regenerate
+        rendition.delete()
+    return None
+
+
+def create_rendition(asset, params, cache_key):
+    """
+    Generates and stores the rendition for `cache_key`. Raises
+    InvalidRenditionSource if the original cannot be decoded.
+    """
+    try:
+        with asset.file.open('rb') as f:
+            size_hint = (params.width, params.height) if params.width and params.height else None
+            image, original_format, original_size = decode_image(f, max_size=size_hint)
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as e:
+        # UnidentifiedImageError and truncated files are OSErrors
+        logger.warning(f"Could not decode asset {asset.pk} for a rendition: {e}")
+        raise InvalidRenditionSource(_("The image file could not be decoded."))
+    try:
+        data, output_format, width, height = render_rendition(image, params, original_format)
+    finally:
+        image.close()
+    if not (asset.width and asset.height):
+        # Not processed yet: later requests can then be normalized (see normalize_rendition_params)
+        MediaAsset.objects.filter(pk=asset.pk).update(width=original_size[0], height=original_size[1])
+
+    extension = FORMAT_DETAILS.get(output_format, (output_format.lower(), None))[0]
+    path = default_storage.save(f"renditions/{cache_key[:2]}/{cache_key}.{extension}", ContentFile(data))
+    try:
+        with transaction.atomic():
+            rendition = MediaRendition.objects.create(
+                asset=asset, cache_key=cache_key, path=path, format=output_format,
+                width=width, height=height, size=len(data),
+            )
+    except IntegrityError:
+        # Generated concurrently by another request; keep theirs
+        default_storage.delete(path)
+        return MediaRendition.objects.get(cache_key=cache_key)
+
+    from .tasks import evict_media_renditions
+    transaction.on_commit(evict_media_renditions.delay)
+    return rendition
+
+
+def _touch(rendition):
+    now = timezone.now()
+    if (now - rendition.last_accessed_at).total_seconds() >= ACCESS_UPDATE_INTERVAL:
+        MediaRendition.objects.filter(pk=rendition.pk).update(last_accessed_at=now)
+
+
+def evict_renditions(max_bytes=CACHE_MAX_BYTES):
+    """Deletes least-recently-used renditions until the total size is within `max_bytes`."""
+    total = MediaRendition.objects.aggregate(total=Sum('size'))['total'] or 0
+    excess = total - max_bytes
+    evicted = 0
+    while excess > 0:
+        batch = list(MediaRendition.objects.order_by('last_accessed_at')[:EVICTION_BATCH_SIZE])
+        if not batch:
+            break
+        victims = []
+        for rendition in batch:
+            if excess <= 0:
+                break
+            victims.append(rendition)
+            excess -= rendition.size
+        # Files are removed by the post_delete handler (see apps.media.signals)
+        MediaRendition.objects.filter(pk__in=[r.pk for r in victims]).delete()
+        evicted += len(victims)
+    if evicted:
+        logger.info(f"Evicted {evicted} media rendition(s) to stay within {max_bytes} bytes.")
+    return evicted
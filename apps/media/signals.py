@@ -0,0 +1,17 @@
+import logging
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import MediaRendition
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_delete, sender=MediaRendition)
+def media_rendition_post_delete_handler(sender, instance, **kwargs):
+    """Remove the rendition file when its row is evicted or its asset deleted."""
+    try:
+        default_storage.delete(instance.path)
+    except Exception as e:
+        logger.warning(f"Could not delete rendition file {instance.path}: {e}")
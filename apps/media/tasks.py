@@ -1,9 +1,16 @@
+import hashlib
 import logging
+import mimetypes
 from celery import shared_task
 from PIL import Image, UnidentifiedImageError
+from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 
 from .models import MediaAsset, ImageOptimizationProfile
+from .imaging import (
+    FORMAT_DETAILS, decode_image, get_decode_size, get_rendition_path,
+    is_format_supported, render_rendition
+)
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +18,7 @@ logger = logging.getLogger(__name__)
 def process_media_asset(asset_id):
     """
     Celery task to extract metadata and generate optimized versions for a MediaAsset.
+    The image is decoded once and every active ImageOptimizationProfile is rendered from it.
     """
     try:
         asset = MediaAsset.objects.get(id=asset_id)
@@ -19,56 +27,111 @@ def process_media_asset(asset_id):
         logger.error(f"MediaAsset with id {asset_id} not found.")
         return
 
+    if not asset.file:
+        logger.warning(f"Asset {asset_id} has no file associated.")
+        return
+
     # --- Metadata Extraction ---
     try:
-        if not asset.file:
-            logger.warning(f"Asset {asset_id} has no file associated.")
-            return
-
-        # Get basic file info
         asset.size = asset.file.size
-        # TODO: Get MIME type more reliably (e.g., using python-magic if installed)
-        # For now, rely on Django's upload handling or filename extension
-        # asset.mime_type = ...
+    except Exception as e:
+        logger.error(f"Error reading file size for asset {asset_id}: {e}")
+    if not asset.mime_type:
+        asset.mime_type = mimetypes.guess_type(asset.file.name)[0] or ''
+    if not asset.checksum: # Chunked uploads compute it while assembling
+        try:
+            sha256 = hashlib.sha256()
+            with asset.file.open('rb') as f:
+                for chunk in f.chunks():
+                    sha256.update(chunk)
+            asset.checksum = sha256.hexdigest()
+        except Exception as e:
+            logger.error(f"Error computing checksum for asset {asset_id}: {e}")
+
+    profiles = list(ImageOptimizationProfile.objects.filter(is_active=True))
+    image = None
+    if asset.is_image or not asset.mime_type:
+        try:
+            with asset.file.open('rb') as f:
+                image, original_format, (asset.width, asset.height) = decode_image(
+                    f, max_size=get_decode_size(profiles)
+                )
+            asset.mime_type = Image.MIME.get(original_format, asset.mime_type)
+        except UnidentifiedImageError:
+            logger.warning(f"Could not identify image format for asset {asset_id}.")
+        except Exception as e: # Includes Image.DecompressionBombError
+            logger.error(f"Error decoding image for asset {asset_id}: {e}")
 
-        # Get image dimensions if it's an image
-        if asset.file.name.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif')):
+    # --- Image Optimization ---
+    # Drop the previous run's files (re-processing), also when the file no longer decodes
+    _delete_renditions(asset.optimized_versions)
+    optimized_versions = {}
+    if image is not None:
+        logger.info(f"Generating {len(profiles)} optimized version(s) for asset {asset_id}...")
+        for profile in profiles:
+            output_format = profile.format or original_format
+            if not is_format_supported(output_format):
+                logger.warning(f"Skipping profile '{profile.name}': {output_format} encoding is not supported by Pillow.")
+                continue
             try:
-                asset.file.open('rb') # Ensure file is open
-                with Image.open(asset.file) as img:
-                    asset.width = img.width
-                    asset.height = img.height
-                    # asset.mime_type = Image.MIME.get(img.format) # Get MIME from Pillow
-                asset.file.close() # Close file
-            except UnidentifiedImageError:
-                logger.warning(f"Could not identify image format for asset {asset_id}.")
+                data, output_format, width, height = render_rendition(image, profile, original_format)
+                path = default_storage.save(
+                    get_rendition_path(asset, profile, output_format), ContentFile(data)
+                )
             except Exception as e:
-                logger.error(f"Error getting dimensions for asset {asset_id}: {e}")
-                if asset.file.closed is False:
-                    asset.file.close() # Ensure file is closed on error
+                logger.error(f"Error generating profile '{profile.name}' for asset {asset_id}: {e}")
+                continue
+            optimized_versions[profile.name] = {
+                'profile_id': str(profile.id),
+                'path': path,
+                'url': default_storage.url(path),
+                'format': output_format,
+                'mime_type': FORMAT_DETAILS.get(output_format, (None, None))[1],
+                'width': width,
+                'height': height,
+                'size': len(data),
+            }
+        image.close()
+    else:
+        logger.info(f"Asset {asset_id} is not an image, skipping optimization.")
 
-        asset.save(update_fields=['size', 'width', 'height', 'mime_type'])
-        logger.info(f"Metadata extracted for asset {asset_id}.")
+    asset.optimized_versions = optimized_versions
+    asset.save(update_fields=['size', 'checksum', 'width', 'height', 'mime_type', 'optimized_versions', 'updated_at'])
+    logger.info(f"Processed asset {asset_id} ({len(optimized_versions)} optimized version(s)).")
+    return f"Generated {len(optimized_versions)} version(s)."
 
-    except Exception as e:
-        logger.error(f"Error extracting metadata for asset {asset_id}: {e}")
-        # Continue to optimization if possible? Or return?
 
-    # --- Image Optimization ---
-    if asset.is_image:
-        logger.info(f"Starting image optimization for asset {asset_id}...")
-        # TODO: Implement actual optimization logic
-        # - Iterate through active ImageOptimizationProfile instances
-        # - For each profile:
-        #   - Open the original image with Pillow
-        #   - Resize/crop/convert format/adjust quality based on profile settings
-        #   - Construct new filename (e.g., <original_name>_<profile_name>.<format>)
-        #   - Save the optimized version to storage (e.g., default_storage.save(...))
-        #   - Get the URL of the saved optimized version
-        #   - Update asset.optimized_versions JSON field with {profile.name: optimized_url}
-        # Example placeholder:
-        # asset.optimized_versions['thumbnail'] = asset.file_url # Replace with actual thumb URL
-        # asset.save(update_fields=['optimized_versions'])
-        logger.info(f"Placeholder: Image optimization complete for asset {asset_id}.")
-    else:
-        logger.info(f"Asset {asset_id} is not an image, skipping optimization.")
\ No newline at end of file
+def _delete_renditions(optimized_versions):
+    """Removes previously generated rendition files from storage."""
+    for version in (optimized_versions or {}).values():
+        path = version.get('path') if isinstance(version, dict) else None
+        if not path:
+            continue
+        try:
+            default_storage.delete(path)
+        except Exception as e:
+            logger.warning(f"Could not delete old rendition {path}: {e}")
+
+
+@shared_task
+def evict_media_renditions():
+    """Celery task to keep the on-demand rendition cache within MEDIA_RENDITION_CACHE_MAX_BYTES."""
+    from .renditions import evict_renditions
+    evicted = evict_renditions()
+    return f"Evicted {evicted} rendition(s)."
+
+
+@shared_task
+def assemble_media_upload(session_id):
+    """Celery task assembling the chunks of a completed upload session into its MediaAsset."""
+    from .uploads import assemble_upload
+    asset = assemble_upload(session_id)
+    return f"Assembled asset {asset.pk}." if asset else "Nothing assembled."
+
+
+@shared_task
+def cleanup_media_upload_sessions():
+    """Celery task to delete expired chunked upload sessions and their stored parts (run periodically)."""
+    from .uploads import delete_expired_sessions
+    deleted = delete_expired_sessions()
+    return f"Deleted {deleted} expired upload session(s)."
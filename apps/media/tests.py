@@ -1,3 +1,284 @@
-from django.test import TestCase
+import hashlib
+import io
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from apps.users.models import CMSUser
+from .imaging import get_decode_size
+from .models import ImageOptimizationProfile, MediaAsset, MediaRendition
+from .tasks import assemble_media_upload, process_media_asset
+from .views import RenditionRenderThrottle
+
+
+def make_png(size=(40, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class MediaStorageTestCase(TestCase):
+    """Stores files in a temporary MEDIA_ROOT and caches in memory."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        for override in (
+            override_settings(MEDIA_ROOT=media_root),
+            override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}),
+        ):
+            override.enable()
+            self.addCleanup(override.disable)
+        cache.clear()
+        # Tasks queued on commit (webhook relay, asset processing) are not run
+        for target in ('apps.webhooks.tasks.relay_webhook_outbox.delay', 'apps.media.tasks.process_media_asset.delay'):
+            patcher = mock.patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = CMSUser.objects.create_user(email='uploader@example.com', password='password')
+
+
+class RenditionTests(MediaStorageTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.asset = MediaAsset.objects.create(
+            file=SimpleUploadedFile('red.png', make_png()), mime_type='image/png', width=40, height=30,
+            uploader=self.user,
+        )
+
+    def render(self, asset=None, **params):
+        return self.client.get(f'/api/v1/media/assets/{(asset or self.asset).pk}/render/', params)
+
+    def test_rendition_is_generated_once(self):
+        response = self.render(w=20)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(Image.open(io.BytesIO(b''.join(response.streaming_content))).size, (20, 15))
+
+        with mock.patch('apps.media.renditions.decode_image') as decode:
+            again = self.render(w=20)
+        self.assertEqual(again.status_code, 200)
+        self.assertFalse(decode.called)
+        self.assertEqual(again['ETag'], response['ETag'])
+        self.assertEqual(MediaRendition.objects.count(), 1)
+
+        not_modified = self.client.get(
+            f'/api/v1/media/assets/{self.asset.pk}/render/', {'w': 20}, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_equivalent_parameters_share_a_rendition(self):
+        etags = {self.render(**params)['ETag'] for params in ({'w': 20}, {'w': 20, 'h': 1000}, {'w': 20, 'q': 50})}
+        self.assertEqual(len(etags), 1)
+        etags = {self.render(**params)['ETag'] for params in ({}, {'w': 4000}, {'w': 40, 'h': 30}, {'fmt': 'png'})}
+        self.assertEqual(len(etags), 1)
+        self.assertEqual(MediaRendition.objects.count(), 2)
+
+    def test_key_follows_the_file_content(self):
+        self.asset.checksum = 'a' * 64
+        self.asset.save()
+        copy = MediaAsset.objects.create(
+            file=SimpleUploadedFile('copy.png', make_png()), mime_type='image/png', width=40, height=30,
+            checksum='a' * 64, uploader=self.user,
+        )
+        self.assertEqual(self.render(w=10)['ETag'], self.render(copy, w=10)['ETag'])
+
+    def test_undecodable_file(self):
+        broken = MediaAsset.objects.create(
+            file=SimpleUploadedFile('broken.png', b'not an image'), mime_type='image/png', uploader=self.user
+        )
+        self.assertEqual(self.render(broken, w=10).status_code, 422)
+        self.assertFalse(MediaRendition.objects.exists())
+
+    def test_invalid_parameters(self):
+        for params in ({'w': 'wide'}, {'w': 0}, {'fmt': 'bmp'}, {'q': 101}):
+            with self.subTest(params=params):
+                self.assertEqual(self.render(**params).status_code, 400)
+
+    def test_generating_renditions_is_rate_limited(self):
+        with mock.patch.object(RenditionRenderThrottle, 'THROTTLE_RATES', {'media_render': '1/minute'}):
+            self.assertEqual(self.render(w=10).status_code, 200)
+            self.assertEqual(self.render(w=11).status_code, 429)
+            self.assertEqual(self.render(w=10).status_code, 200) # Stored renditions are not limited
+
+
+class ProcessMediaAssetTests(MediaStorageTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.asset = MediaAsset.objects.create(
+            file=SimpleUploadedFile('red.png', make_png()), mime_type='image/png', uploader=self.user
+        )
+
+    def process(self, asset=None):
+        asset = asset or self.asset
+        process_media_asset(asset.pk)
+        asset.refresh_from_db()
+        return asset.optimized_versions
+
+    def open_rendition(self, version):
+        with default_storage.open(version['path'], 'rb') as f:
+            return Image.open(io.BytesIO(f.read()))
+
+    def test_rendition_per_active_profile(self):
+        small = ImageOptimizationProfile.objects.create(name='Small WebP', width=20, format='WEBP', quality=80)
+        ImageOptimizationProfile.objects.create(name='Original', format='PNG')
+        ImageOptimizationProfile.objects.create(name='Disabled', width=10, format='PNG', is_active=False)
+
+        versions = self.process()
+        self.assertEqual(set(versions), {'Small WebP', 'Original'})
+        version = versions['Small WebP']
+        self.assertEqual(version['profile_id'], str(small.pk))
+        self.assertEqual(version['format'], 'WEBP')
+        self.assertEqual(version['mime_type'], 'image/webp')
+        self.assertEqual((version['width'], version['height']), (20, 15))
+        self.assertEqual(version['url'], default_storage.url(version['path']))
+        self.assertEqual(version['size'], default_storage.size(version['path']))
+        self.assertEqual(self.open_rendition(version).size, (20, 15))
+        self.assertEqual(versions['Original']['width'], 40)
+
+        self.asset.refresh_from_db()
+        self.assertEqual((self.asset.width, self.asset.height), (40, 30))
+        self.assertEqual(self.asset.checksum, hashlib.sha256(make_png()).hexdigest())
+
+    def test_exif_orientation_is_applied(self):
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6 # Rotated 90° clockwise
+        Image.new('RGB', (40, 30), 'red').save(buffer, format='JPEG', exif=exif)
+        asset = MediaAsset.objects.create(
+            file=SimpleUploadedFile('rotated.jpg', buffer.getvalue()), mime_type='image/jpeg', uploader=self.user
+        )
+        ImageOptimizationProfile.objects.create(name='Original', format='PNG')
+
+        version = self.process(asset)['Original']
+        self.assertEqual((asset.width, asset.height), (30, 40))
+        self.assertEqual((version['width'], version['height']), (30, 40))
+        self.assertEqual(self.open_rendition(version).size, (30, 40))
+
+    def test_images_are_never_upscaled(self):
+        ImageOptimizationProfile.objects.create(name='Large', width=400, height=300, format='PNG')
+
+        version = self.process()['Large']
+        self.assertEqual((version['width'], version['height']), (40, 30))
+        self.assertEqual(self.open_rendition(version).size, (40, 30))
+
+    def test_unsupported_format_is_skipped(self):
+        ImageOptimizationProfile.objects.create(name='AVIF', width=20, format='AVIF')
+        ImageOptimizationProfile.objects.create(name='PNG', width=20, format='PNG')
+
+        with mock.patch('apps.media.tasks.is_format_supported', side_effect=lambda fmt: fmt != 'AVIF'):
+            versions = self.process()
+        self.assertEqual(set(versions), {'PNG'})
+
+    def test_reprocessing_deletes_old_renditions(self):
+        profile = ImageOptimizationProfile.objects.create(name='Thumbnail', width=20, format='PNG')
+        old_path = self.process()['Thumbnail']['path']
+        profile.name = 'Small'
+        profile.save()
+
+        versions = self.process()
+        self.assertEqual(set(versions), {'Small'})
+        self.assertTrue(default_storage.exists(versions['Small']['path']))
+        self.assertFalse(default_storage.exists(old_path))
+
+    def test_file_that_no_longer_decodes_drops_its_renditions(self):
+        ImageOptimizationProfile.objects.create(name='Thumbnail', width=20, format='PNG')
+        old_path = self.process()['Thumbnail']['path']
+        self.asset.file.save('broken.png', ContentFile(b'not an image'))
+
+        self.assertEqual(self.process(), {})
+        self.assertFalse(default_storage.exists(old_path))
+
+    def test_decode_size(self):
+        thumbnail = ImageOptimizationProfile(name='Thumbnail', width=200)
+        banner = ImageOptimizationProfile(name='Banner', width=100, height=400)
+        original = ImageOptimizationProfile(name='Original')
+        self.assertEqual(get_decode_size([thumbnail, banner]), (200, 400))
+        self.assertIsNone(get_decode_size([thumbnail, original]))
+        self.assertIsNone(get_decode_size([]))
+
+
+class ChunkedUploadTests(MediaStorageTestCase):
+    chunk_size = 64 * 1024 # The minimum
+    data = bytes(range(256)) * (chunk_size * 3 // 256) + b'tail'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/v1/media/uploads/', {
+            'filename': 'notes.txt', 'total_size': len(self.data), 'chunk_size': self.chunk_size, 'mime_type': 'text/plain'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.url = f"/api/v1/media/uploads/{response.data['id']}/"
+
+    def put_chunk(self, index, data=None):
+        size = self.chunk_size
+        data = self.data[index * size:(index + 1) * size] if data is None else data
+        return self.client.put(f'{self.url}chunks/{index}/', data=data, content_type='application/octet-stream')
+
+    def complete(self, **body):
+        """Completes the upload, running the assembly task on commit."""
+        with mock.patch('apps.media.tasks.assemble_media_upload.delay', side_effect=assemble_media_upload) as assemble:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(f'{self.url}complete/', body, format='json')
+        return response, assemble
+
+    def test_chunks_are_assembled_in_the_background(self):
+        for index in (3, 1, 0, 2): # Any order
+            self.assertEqual(self.put_chunk(index).status_code, 200)
+        self.assertEqual(self.put_chunk(1, b'X' * self.chunk_size).status_code, 200) # Retries replace the chunk
+        self.assertEqual(self.put_chunk(1).status_code, 200)
+
+        response = self.client.post(
+            f'{self.url}complete/', {'checksum': hashlib.sha256(self.data).hexdigest()}, format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'assembling')
+        self.assertIsNone(response.data['asset'])
+        self.assertFalse(MediaAsset.objects.exists()) # Nothing is copied within the request
+        self.assertEqual(self.put_chunk(0).status_code, 400)
+        self.assertEqual(self.client.delete(self.url).status_code, 409)
+
+        assemble_media_upload(response.data['id'])
+        session = self.client.get(self.url).data
+        self.assertEqual(session['status'], 'completed')
+        asset = MediaAsset.objects.get(pk=session['asset'])
+        with asset.file.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual((asset.size, asset.checksum), (len(self.data), hashlib.sha256(self.data).hexdigest()))
+        self.assertEqual(session['received_chunks'], []) # Parts are removed
+
+    def test_missing_chunks(self):
+        self.put_chunk(0)
+        self.put_chunk(2)
+        response, assemble = self.complete()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1, 3', response.data['detail'])
+        self.assertFalse(assemble.called)
+
+    def test_checksum_mismatch_fails_and_can_be_retried(self):
+        for index in range(4):
+            self.put_chunk(index, b'X' * (self.chunk_size if index < 3 else 4))
+        response, __ = self.complete(checksum=hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(response.status_code, 202)
+        session = self.client.get(self.url).data
+        self.assertEqual((session['status'], session['error']), ('failed', 'File checksum mismatch.'))
+        self.assertFalse(MediaAsset.objects.exists())
+
+        for index in range(4):
+            self.put_chunk(index)
+        self.complete(checksum=hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(self.client.get(self.url).data['status'], 'completed')
+        self.assertEqual(MediaAsset.objects.get().checksum, hashlib.sha256(self.data).hexdigest())
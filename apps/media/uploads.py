@@ -0,0 +1,242 @@
+"""
+Resumable chunked uploads for large media files (see MediaUploadViewSet).
+
+Protocol: create a MediaUploadSession, PUT each chunk as the raw request body
+(`/media/uploads/<id>/chunks/<index>/`, in any order and retryable), then
+complete the session. Request bodies are streamed straight to storage as part
+files without going through Django's upload handlers; size and SHA-256 are
+computed while streaming. Completing only checks the chunk list and marks the
+session 'assembling': the parts are concatenated (streamed again) into the
+final file by the assemble_media_upload task, outside any request or database
+transaction, and only then is the MediaAsset created. Clients poll the session
+until it is 'completed' (with its asset) or 'failed' (with an error; the chunks
+are kept so the upload can be fixed and completed again).
+"""
+import hashlib
+import logging
+import math
+import mimetypes
+import os
+
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from .models import (
+    MediaAsset, MediaUploadChunk, MediaUploadSession,
+    UPLOAD_STATUS_ASSEMBLING, UPLOAD_STATUS_COMPLETED, UPLOAD_STATUS_FAILED
+)
+
+logger = logging.getLogger(__name__)
+
+
+class UploadError(ValueError):
+    pass
+
+
+def check_session_open(session):
+    """Chunks can be stored and completion requested while pending, or after a failed assembly."""
+    if session.status == UPLOAD_STATUS_COMPLETED:
+        raise UploadError(_("This upload has already been completed."))
+    if session.status == UPLOAD_STATUS_ASSEMBLING:
+        raise UploadError(_("This upload is being assembled."))
+
+
+class HashingFile(File):
+    """File wrapper computing the size and SHA-256 of everything read through it."""
+
+    def __init__(self, file, name=None, size=None):
+        super().__init__(file, name)
+        self.sha256 = hashlib.sha256()
+        self.bytes_read = 0
+        if size is not None:
+            self.size = size # Avoids seek()/tell() on non-seekable streams
+
+    def read(self, *args, **kwargs):
+        data = self.file.read(*args, **kwargs)
+        self.sha256.update(data)
+        self.bytes_read += len(data)
+        return data
+
+
+class PartsReader:
+    """Read-only file object over the concatenation of stored part files."""
+
+    def __init__(self, paths, storage=default_storage):
+        self._paths = iter(paths)
+        self._storage = storage
+        self._current = None
+
+    def read(self, size=-1):
+        pieces = []
+        while size != 0:
+            if self._current is None:
+                path = next(self._paths, None)
+                if path is None:
+                    break
+                self._current = self._storage.open(path, 'rb')
+            data = self._current.read(size)
+            if not data:
+                self.close()
+                continue
+            pieces.append(data)
+            if size > 0:
+                size -= len(data)
+        return b''.join(pieces)
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+def save_chunk(session, index, stream, size, expected_checksum=None):
+    """Streams one chunk (`size` bytes from `stream`) to storage and records it."""
+    check_session_open(session)
+    if session.total_size is not None and index >= max(math.ceil(session.total_size / session.chunk_size), 1):
+        raise UploadError(_("Chunk index is out of range for the declared total size."))
+
+    path = session.get_part_path(index)
+    content = HashingFile(stream, name=os.path.basename(path), size=size)
+    # A retried chunk is stored under a new name: the previous part may be being assembled
+    path = default_storage.save(path, content)
+    checksum = content.sha256.hexdigest()
+    if content.bytes_read != size:
+        default_storage.delete(path)
+        raise UploadError(_("Incomplete chunk: received %(received)s of %(size)s bytes.") % {
+            'received': content.bytes_read, 'size': size
+        })
+    if expected_checksum and expected_checksum.lower() != checksum:
+        default_storage.delete(path)
+        raise UploadError(_("Chunk checksum mismatch."))
+
+    with transaction.atomic():
+        # Completion may have been requested while the chunk was streamed
+        locked = MediaUploadSession.objects.select_for_update().get(pk=session.pk)
+        try:
+            check_session_open(locked)
+        except UploadError:
+            default_storage.delete(path)
+            raise
+        previous_path = locked.chunks.filter(index=index).values_list('path', flat=True).first()
+        chunk, __ = MediaUploadChunk.objects.update_or_create(
+            session=locked, index=index,
+            defaults={'path': path, 'size': size, 'checksum': checksum}
+        )
+        if previous_path and previous_path != path:
+            transaction.on_commit(lambda: delete_parts([previous_path]))
+    return chunk
+
+
+def complete_upload(session, expected_checksum=None):
+    """
+    Checks that every chunk of `session` was received and queues their assembly
+    (see assemble_upload). `session` must be locked; returns it, now 'assembling'.
+    """
+    check_session_open(session)
+    chunks = list(session.chunks.order_by('index'))
+    if not chunks:
+        raise UploadError(_("No chunks have been uploaded."))
+    expected_count = (
+        math.ceil(session.total_size / session.chunk_size) if session.total_size else chunks[-1].index + 1
+    )
+    received = {chunk.index for chunk in chunks}
+    missing = [index for index in range(expected_count) if index not in received]
+    if missing:
+        raise UploadError(_("Missing chunks: %(indexes)s") % {'indexes': ', '.join(map(str, missing[:50]))})
+    received_size = sum(chunk.size for chunk in chunks)
+    if session.total_size is not None and received_size != session.total_size:
+        raise UploadError(_("Received %(received)s bytes, expected %(size)s.") % {
+            'received': received_size, 'size': session.total_size
+        })
+
+    session.status = UPLOAD_STATUS_ASSEMBLING
+    session.expected_checksum = (expected_checksum or '').lower()
+    session.error = ''
+    session.save(update_fields=['status', 'expected_checksum', 'error'])
+    from .tasks import assemble_media_upload
+    session_id = str(session.pk)
+    transaction.on_commit(lambda: assemble_media_upload.delay(session_id))
+    return session
+
+
+def assemble_upload(session_id):
+    """
+    Concatenates the chunks of an 'assembling' session into the final file
+    (streaming, computing size and SHA-256), then creates the MediaAsset and
+    queues its processing. No lock or transaction is held while copying; the
+    session's status keeps chunks and completion requests out meanwhile.
+    Returns the asset, or None if the session is gone or failed.
+    """
+    session = MediaUploadSession.objects.filter(pk=session_id, status=UPLOAD_STATUS_ASSEMBLING).first()
+    if session is None:
+        return None
+    chunks = list(session.chunks.order_by('index'))
+    asset = MediaAsset(
+        uploader=session.uploader,
+        folder=session.folder,
+        filename=session.filename,
+        mime_type=session.mime_type or mimetypes.guess_type(session.filename)[0] or '',
+    )
+    reader = PartsReader([chunk.path for chunk in chunks])
+    content = HashingFile(reader, name=session.filename, size=sum(chunk.size for chunk in chunks))
+    try:
+        asset.file.save(session.filename, content, save=False)
+    except Exception as e:
+        logger.error(f"Could not assemble upload {session_id}: {e}")
+        _fail_assembly(session_id, _("The chunks could not be assembled, please complete the upload again."))
+        return None
+    finally:
+        reader.close()
+    checksum = content.sha256.hexdigest()
+    if session.expected_checksum and session.expected_checksum != checksum:
+        asset.file.delete(save=False)
+        _fail_assembly(session_id, _("File checksum mismatch."))
+        return None
+    asset.size = content.bytes_read
+    asset.checksum = checksum
+
+    with transaction.atomic():
+        session = MediaUploadSession.objects.select_for_update().filter(
+            pk=session_id, status=UPLOAD_STATUS_ASSEMBLING
+        ).first()
+        if session is None: # Deleted meanwhile
+            transaction.on_commit(lambda: asset.file.delete(save=False))
+            return None
+        asset.save()
+        session.asset = asset
+        session.status = UPLOAD_STATUS_COMPLETED
+        session.save(update_fields=['asset', 'status'])
+        session.chunks.all().delete()
+        part_paths = [chunk.path for chunk in chunks]
+        transaction.on_commit(lambda: delete_parts(part_paths))
+        from .tasks import process_media_asset
+        asset_id = str(asset.id)
+        transaction.on_commit(lambda: process_media_asset.delay(asset_id))
+    return asset
+
+
+def _fail_assembly(session_id, error):
+    MediaUploadSession.objects.filter(pk=session_id, status=UPLOAD_STATUS_ASSEMBLING).update(
+        status=UPLOAD_STATUS_FAILED, error=error
+    )
+
+
+def delete_parts(paths):
+    """Removes chunk part files from storage."""
+    for path in paths:
+        try:
+            default_storage.delete(path)
+        except Exception as e:
+            logger.warning(f"Could not delete upload part {path}: {e}")
+
+
+def delete_expired_sessions():
+    """Deletes expired upload sessions and the parts of unfinished ones."""
+    expired = MediaUploadSession.objects.filter(expires_at__lt=timezone.now())
+    part_paths = list(MediaUploadChunk.objects.filter(session__in=expired).values_list('path', flat=True))
+    __, deleted = expired.delete()
+    delete_parts(part_paths)
+    return deleted.get(MediaUploadSession._meta.label, 0)
@@ -1,14 +1,31 @@
-from rest_framework import viewsets, permissions, parsers, status
+from rest_framework import viewsets, mixins, permissions, parsers, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import FileResponse, HttpResponseNotModified
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.throttling import UserRateThrottle
 
-from .models import Folder, MediaTag, MediaAsset, ImageOptimizationProfile
+from apps.core.pagination import OptionalKeysetPagination
+
+from .models import Folder, MediaTag, MediaAsset, ImageOptimizationProfile, MediaUploadSession, UPLOAD_STATUS_ASSEMBLING
+from .imaging import FORMAT_DETAILS
+from .renditions import (
+    InvalidRenditionParams, InvalidRenditionSource, parse_rendition_params, normalize_rendition_params,
+    get_rendition_key, get_stored_rendition, create_rendition
+)
+from .uploads import UploadError, save_chunk, complete_upload, delete_parts
 from .api import (
     FolderSerializer, MediaTagSerializer, MediaAssetSerializer,
-    ImageOptimizationProfileSerializer
+    ImageOptimizationProfileSerializer, MediaUploadSessionSerializer
 )
 
+# Seconds clients/CDNs may cache renditions (content-addressed, so effectively immutable)
+RENDITION_MAX_AGE = getattr(settings, 'MEDIA_RENDITION_MAX_AGE', 60 * 60 * 24 * 365)
+
 # Basic Permissions (Refine as needed)
 class IsAdminOrUploaderOrReadOnly(permissions.BasePermission):
     """
@@ -27,6 +44,14 @@ class IsAdminUser(permissions.BasePermission):
         return request.user and request.user.is_staff
 
 
+class RenditionRenderThrottle(UserRateThrottle):
+    """
+    Limits how many new renditions a client (user, or IP address when anonymous)
+    can have generated; serving stored renditions is not limited.
+    """
+    scope = 'media_render'
+
+
 class FolderViewSet(viewsets.ModelViewSet):
     """API endpoint for managing Folders."""
     queryset = Folder.objects.select_related('parent').all().order_by('name')
@@ -53,6 +78,50 @@ class MediaAssetViewSet(viewsets.ModelViewSet):
     filterset_fields = ['folder', 'mime_type', 'tags', 'uploader']
     search_fields = ['title', 'filename', 'alt_text', 'caption', 'tags__name']
     ordering_fields = ['upload_timestamp', 'title', 'filename', 'size']
+    pagination_class = OptionalKeysetPagination # ?pagination=cursor for keyset pages (rejects other ?ordering=)
+    keyset_ordering = ('-upload_timestamp', '-id')
+
+    @action(detail=True, methods=['get'], url_path='render', permission_classes=[permissions.AllowAny])
+    def render(self, request, pk=None):
+        """
+        On-demand image rendition: ?w=<px>&h=<px>&fmt=webp|avif|jpeg|png&q=<1-100>.
+        Public like the original files; generated once, then served from the rendition cache.
+        Generating new renditions is rate limited per client (RenditionRenderThrottle).
+        """
+        asset = self.get_object()
+        if not asset.is_image:
+            return Response({'detail': 'Renditions are only available for images.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            params = normalize_rendition_params(asset, parse_rendition_params(request.query_params))
+        except InvalidRenditionParams as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = get_rendition_key(asset, params)
+        etag = f'"{cache_key}"'
+        cache_control = f"public, max-age={RENDITION_MAX_AGE}, immutable"
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            not_modified = HttpResponseNotModified()
+            not_modified['ETag'] = etag
+            not_modified['Cache-Control'] = cache_control
+            return not_modified
+
+        rendition = get_stored_rendition(cache_key)
+        if rendition is None:
+            throttle = RenditionRenderThrottle()
+            if not throttle.allow_request(request, self):
+                self.throttled(request, throttle.wait())
+            try:
+                rendition = create_rendition(asset, params, cache_key)
+            except InvalidRenditionSource as e:
+                return Response({'detail': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        response = FileResponse(
+            default_storage.open(rendition.path, 'rb'),
+            content_type=FORMAT_DETAILS.get(rendition.format, (None, 'application/octet-stream'))[1]
+        )
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
 
     # Override perform_destroy if specific cleanup is needed (e.g., delete file from storage)
     # def perform_destroy(self, instance):
@@ -67,3 +136,80 @@ class ImageOptimizationProfileViewSet(viewsets.ModelViewSet):
     queryset = ImageOptimizationProfile.objects.all().order_by('name')
     serializer_class = ImageOptimizationProfileSerializer
     permission_classes = [IsAdminUser] # Only admins manage profiles
+
+
+class MediaUploadViewSet(mixins.CreateModelMixin,
+                         mixins.RetrieveModelMixin,
+                         mixins.DestroyModelMixin,
+                         viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads for large files (see apps.media.uploads):
+    POST to start a session, PUT chunks/<index>/ with the raw chunk bytes,
+    POST complete/ to have the MediaAsset assembled in the background. GET shows
+    the received chunks and the status, DELETE aborts the upload.
+    """
+    serializer_class = MediaUploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = MediaUploadSession.objects.select_related('folder').prefetch_related('chunks')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(uploader=self.request.user)
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save(uploader=self.request.user)
+
+    def destroy(self, request, *args, **kwargs):
+        if self.get_object().status == UPLOAD_STATUS_ASSEMBLING:
+            return Response({'detail': 'This upload is being assembled.'}, status=status.HTTP_409_CONFLICT)
+        return super().destroy(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        part_paths = [chunk.path for chunk in instance.chunks.all()]
+        instance.delete()
+        transaction.on_commit(lambda: delete_parts(part_paths))
+
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>\d+)', parser_classes=[])
+    def upload_chunk(self, request, pk=None, index=None):
+        """
+        Stores one chunk. The request body is streamed to storage as-is (no parsing),
+        `Content-Length` is required. An optional `X-Chunk-SHA256` header is verified.
+        """
+        session = self.get_object()
+        try:
+            size = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            size = 0
+        if size <= 0:
+            return Response({'detail': 'A non-empty chunk with a Content-Length header is required.'},
+                            status=status.HTTP_411_LENGTH_REQUIRED)
+        if size > session.chunk_size:
+            return Response({'detail': f'Chunks may not exceed {session.chunk_size} bytes.'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        try:
+            chunk = save_chunk(
+                session, int(index), request.stream, size,
+                expected_checksum=request.headers.get('X-Chunk-SHA256')
+            )
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'index': chunk.index, 'size': chunk.size, 'checksum': chunk.checksum})
+
+    @action(detail=True, methods=['post'], parser_classes=[parsers.JSONParser])
+    def complete(self, request, pk=None):
+        """
+        Checks that all chunks were received and queues their assembly into a new
+        MediaAsset (202; poll the session for its status and asset). Optional body:
+        {"checksum": "<sha256 hex of the whole file>"} to verify the result.
+        """
+        session_id = self.get_object().pk
+        try:
+            with transaction.atomic():
+                session = MediaUploadSession.objects.select_for_update().get(pk=session_id)
+                complete_upload(session, expected_checksum=request.data.get('checksum'))
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        session = self.get_queryset().get(pk=session_id)
+        return Response(self.get_serializer(session).data, status=status.HTTP_202_ACCEPTED)
+
@@ -1,4 +1,4 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
@@ -118,11 +118,11 @@ class APIKeyAdmin(admin.ModelAdmin):
     list_filter = ('is_active', 'user')
     search_fields = ('name', 'user__email')
     ordering = ('-created_at',)
-    readonly_fields = ('key', 'created_at', 'last_used_at') # Key should not be displayed fully or editable
+    readonly_fields = ('key_prefix', 'created_at', 'last_used_at') # Only a hash of the key is stored
     raw_id_fields = ('user',) # Use a simpler widget for ForeignKey to User
 
     fieldsets = (
-        (None, {'fields': ('name', 'user', 'is_active')}),
+        (None, {'fields': ('name', 'user', 'is_active', 'scopes')}),
         (_('Key Info (Read-Only)'), {'fields': ('key_prefix', 'created_at', 'last_used_at')}),
         # Add expiration fieldset if implemented
     )
@@ -132,10 +132,10 @@ class APIKeyAdmin(admin.ModelAdmin):
     user_email.short_description = _('User Email')
     user_email.admin_order_field = 'user__email'
 
-    def key_prefix(self, obj):
-        """Show only a prefix of the key for security."""
-        return f"{obj.key[:8]}..." if obj.key else "N/A"
-    key_prefix.short_description = _('Key Prefix')
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if obj.key: # Just generated: the only time the key can be shown
+            messages.warning(request, _("API key created: %(key)s  Copy it now, it cannot be displayed again.") % {'key': obj.key})
 
     # Prevent adding keys via admin? Usually done via API or user profile.
     # def has_add_permission(self, request):
@@ -148,5 +148,4 @@ class APIKeyAdmin(admin.ModelAdmin):
 
     # Prevent viewing the full key easily
     def get_readonly_fields(self, request, obj=None):
-        # Always make key readonly, add others as needed
-        return self.readonly_fields + ('key',)
+        return self.readonly_fields
@@ -82,16 +82,17 @@ class APIKeySerializer(serializers.ModelSerializer):
         write_only=True,
         required=True
     )
-    key = serializers.CharField(read_only=True) # Key is generated by the model
+    # The plain key is only known (and returned) when the key is created
+    key = serializers.CharField(read_only=True)
 
     class Meta:
         model = APIKey
         fields = [
-            'id', 'name', 'user', 'user_email', 'key',
+            'id', 'name', 'user', 'user_email', 'key', 'key_prefix', 'scopes',
             'created_at', 'last_used_at', 'is_active'
             # 'expires_at' # Add if expiration is implemented
         ]
-        read_only_fields = ['id', 'key', 'created_at', 'last_used_at']
+        read_only_fields = ['id', 'key', 'key_prefix', 'created_at', 'last_used_at']
         extra_kwargs = {
             'user': {'write_only': True},
         }
\ No newline at end of file
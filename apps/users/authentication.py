@@ -0,0 +1,174 @@
+"""
+API key authentication for external systems (`Authorization: ApiKey <key>`).
+
+Keys are looked up by the indexed SHA-256 of the presented key, and the
+resolved user and scopes are cached, so a keyed request normally costs one
+cache read and no query. A key with scopes may only make requests whose model
+permission (see get_required_perm) its scopes grant, whatever the view's own
+permission classes allow; `has_perm` of its user is limited to them too.
+`last_used_at` is written behind: each use is recorded in the shared cache
+(at most once per second per key and process), and the scheduled
+flush_api_key_usage task writes the changed values with one UPDATE, outside
+any request. Cached entries are dropped when the key or its user changes
+(see apps.users.signals).
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, When, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework import authentication, exceptions
+
+from .models import APIKey, hash_api_key
+from .permissions import permission_granted
+
+logger = logging.getLogger(__name__)
+
+# Seconds a resolved key (user and scopes) is cached
+API_KEY_CACHE_TIMEOUT = getattr(settings, 'API_KEY_CACHE_TIMEOUT', 5 * 60)
+# Seconds between writes of recorded last_used_at values (the flush_api_key_usage schedule)
+API_KEY_USAGE_FLUSH_INTERVAL = getattr(settings, 'API_KEY_USAGE_FLUSH_INTERVAL', 60)
+API_KEY_USAGE_RESOLUTION = 1 # Seconds between recorded uses of a key, per process
+API_KEY_USAGE_TIMEOUT = 24 * 60 * 60 # Seconds a recorded use waits in the cache for a flush
+INVALID_KEY = 'invalid' # Cached for unknown keys, so repeated bad keys don't hit the database
+# Model permission action per HTTP method (as in DRF's DjangoModelPermissions)
+SCOPE_ACTIONS = {
+    'GET': 'view', 'HEAD': 'view', 'OPTIONS': 'view',
+    'POST': 'add', 'PUT': 'change', 'PATCH': 'change', 'DELETE': 'delete',
+}
+
+_last_recorded = {} # {api_key_id: monotonic time of the last recorded use}, per process
+
+
+def api_key_cache_key(key_hash):
+    return f"apikey:{key_hash}"
+
+
+def api_key_usage_cache_key(key_id):
+    return f"apikey:used:{key_id}"
+
+
+def get_required_perm(request, view):
+    """
+    The permission a request needs from a key's scopes:
+    '<app_label>.<action>_<model>' for the view's model, the action following
+    the HTTP method ('view', 'add', 'change' or 'delete'). None if the view has no model.
+    """
+    queryset = getattr(view, 'queryset', None)
+    if queryset is None and hasattr(view, 'get_queryset'):
+        try:
+            queryset = view.get_queryset()
+        except Exception:
+            queryset = None
+    action = SCOPE_ACTIONS.get(request.method)
+    if queryset is None or action is None:
+        return None
+    opts = queryset.model._meta
+    return f"{opts.app_label}.{action}_{opts.model_name}"
+
+
+class APIKeyAuth:
+    """`request.auth` for keyed requests: the key id and the scopes it is limited to."""
+
+    def __init__(self, key_id, scopes):
+        self.key_id = key_id
+        self.scopes = frozenset(scopes or ())
+
+    def has_scope(self, perm):
+        """Whether the key may be used for `perm` (keys without scopes are unrestricted)."""
+        return not self.scopes or permission_granted(self.scopes, perm)
+
+    def allows(self, request, view):
+        """Whether the key's scopes allow `request` to `view` (see get_required_perm)."""
+        if not self.scopes:
+            return True
+        perm = get_required_perm(request, view)
+        return perm is not None and self.has_scope(perm)
+
+
+class APIKeyAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticates `Authorization: ApiKey <key>` requests as the key's user, with
+    `request.auth` set to an APIKeyAuth. Requests outside the key's scopes are
+    denied here, before the view's permission classes, so every view enforces them.
+    """
+    keyword = 'ApiKey'
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid API key header.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid API key header.'))
+        user, auth = self.authenticate_credentials(key)
+        view = (request.parser_context or {}).get('view')
+        if view is not None and not auth.allows(request, view):
+            raise exceptions.PermissionDenied(_('This API key is not allowed to perform this action.'))
+        return user, auth
+
+    def authenticate_credentials(self, key):
+        key_hash = hash_api_key(key)
+        cache_key = api_key_cache_key(key_hash)
+        entry = cache.get(cache_key)
+        if entry is None:
+            entry = self.resolve_key(key_hash)
+            cache.set(cache_key, entry, timeout=API_KEY_CACHE_TIMEOUT)
+        if entry == INVALID_KEY:
+            raise exceptions.AuthenticationFailed(_('Invalid or inactive API key.'))
+        user, key_id, scopes = entry
+        record_api_key_usage(key_id)
+        auth = APIKeyAuth(key_id, scopes)
+        user.api_key_scopes = auth.scopes # Limits user.has_perm to the key's scopes
+        return user, auth
+
+    def resolve_key(self, key_hash):
+        """(user, key id, scopes) for an active key of an active user, otherwise INVALID_KEY."""
+        api_key = APIKey.objects.select_related('user').filter(key_hash=key_hash, is_active=True).first()
+        if api_key is None or not api_key.user.is_active:
+            return INVALID_KEY
+        return api_key.user, api_key.pk, api_key.scopes
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+def record_api_key_usage(key_id, used_at=None):
+    """Records a use of the key in the shared cache, for the next flush_api_key_usage run."""
+    now = time.monotonic()
+    if used_at is None and now - _last_recorded.get(key_id, float('-inf')) < API_KEY_USAGE_RESOLUTION:
+        return
+    _last_recorded[key_id] = now
+    used_at = used_at or timezone.now()
+    try:
+        cache.set(api_key_usage_cache_key(key_id), used_at.isoformat(), timeout=API_KEY_USAGE_TIMEOUT)
+    except Exception as e: # Usage tracking must not fail the request
+        logger.warning(f"Could not record use of API key {key_id}: {e}")
+
+
+def flush_api_key_usage():
+    """
+    Writes the last_used_at values recorded since the previous flush, with one
+    query to read the current values and a single UPDATE. Returns the number of keys updated.
+    """
+    stored = dict(APIKey.objects.filter(is_active=True).values_list('pk', 'last_used_at'))
+    recorded = cache.get_many([api_key_usage_cache_key(key_id) for key_id in stored])
+    changed = {}
+    for key_id, last_used_at in stored.items():
+        used_at = recorded.get(api_key_usage_cache_key(key_id))
+        used_at = parse_datetime(used_at) if used_at else None
+        if used_at is not None and (last_used_at is None or used_at > last_used_at):
+            changed[key_id] = used_at
+    if not changed:
+        return 0
+    APIKey.objects.filter(pk__in=list(changed)).update(
+        last_used_at=Case(*[When(pk=key_id, then=Value(used_at)) for key_id, used_at in changed.items()])
+    )
+    return len(changed)
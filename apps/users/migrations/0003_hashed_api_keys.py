@@ -0,0 +1,54 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_keys(apps, schema_editor):
+    """Replaces the stored plaintext keys by their hash and prefix (see models.hash_api_key)."""
+    APIKey = apps.get_model('users', 'APIKey')
+    for api_key in APIKey.objects.only('pk', 'key').iterator():
+        APIKey.objects.filter(pk=api_key.pk).update(
+            key_hash=hashlib.sha256(api_key.key.encode('utf-8')).hexdigest(),
+            key_prefix=api_key.key[:8],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_remove_role_permissions_delete_permission_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='key_hash',
+            field=models.CharField(editable=False, help_text='SHA-256 of the API key.', max_length=64, null=True, verbose_name='Key Hash'),
+        ),
+        migrations.AddField(
+            model_name='apikey',
+            name='key_prefix',
+            field=models.CharField(default='', editable=False, help_text='First characters of the key, to tell keys apart.', max_length=8, verbose_name='Key Prefix'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='apikey',
+            name='scopes',
+            field=models.JSONField(blank=True, default=list, help_text="Permission strings the key is limited to, wildcards allowed (e.g. ['content.add_*']). Empty: no restriction.", verbose_name='Scopes'),
+        ),
+        migrations.RunPython(hash_existing_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='apikey',
+            name='key_hash',
+            field=models.CharField(editable=False, help_text='SHA-256 of the API key.', max_length=64, unique=True, verbose_name='Key Hash'),
+        ),
+        migrations.RemoveField(
+            model_name='apikey',
+            name='key',
+        ),
+        migrations.AlterField(
+            model_name='role',
+            name='permissions',
+            field=models.JSONField(blank=True, default=list, help_text="List of permission strings granted to this role (e.g., ['content.add_contentinstance', 'content.publish_blogpost']). Use '*' for all permissions, 'content.*' for all of an app, 'content.publish_*' or 'content.*_blogpost' for an action or content type.", verbose_name='Permissions'),
+        ),
+    ]
@@ -2,9 +2,12 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager, PermissionsMixin
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+import hashlib
 import secrets
 import uuid
 
+from .permissions import get_user_permissions, permission_granted
+
 # Removed the Permission model. Permissions will be string-based.
 
 class Role(models.Model):
@@ -38,7 +41,7 @@ class Role(models.Model):
         _("Permissions"),
         default=list,
         blank=True,
-        help_text=_("List of permission strings granted to this role (e.g., ['content.add_contentinstance', 'content.publish_blogpost']). Use '*' for all permissions.")
+        help_text=_("List of permission strings granted to this role (e.g., ['content.add_contentinstance', 'content.publish_blogpost']). Use '*' for all permissions, 'content.*' for all of an app, 'content.publish_*' or 'content.*_blogpost' for an action or content type.")
     )
     is_system_role = models.BooleanField(
         _("Is System Role"),
@@ -156,20 +159,24 @@ class CMSUser(AbstractUser, PermissionsMixin):
         Checks if the user has a specific permission codename.
         Overrides the default Django permission check.
         Checks permissions directly assigned via roles.
-        Superusers implicitly have all permissions.
+        Superusers implicitly have all permissions. For requests made with a
+        scoped API key, only permissions within its scopes are granted.
         """
+        scopes = getattr(self, 'api_key_scopes', None) # Set by APIKeyAuthentication
+        if scopes and not permission_granted(scopes, perm):
+            return False
         # Active superusers have all permissions
         if self.is_active and self.is_superuser:
             return True
 
-        # Check permissions granted through assigned roles
-        # Use prefetch_related('roles') in views for efficiency
-        for role in self.roles.all():
-            if "*" in role.permissions: # Check for wildcard permission
-                return True
-            if perm in role.permissions:
-                return True
-        return False # Permission not found in any role
+        # Check permissions granted through assigned roles (see apps.users.permissions)
+        return permission_granted(self.get_role_permissions(), perm)
+
+    def get_role_permissions(self):
+        """Compiled permission set of the user's roles, memoized on the instance (i.e. per request)."""
+        if not hasattr(self, '_role_permissions'):
+            self._role_permissions = get_user_permissions(self)
+        return self._role_permissions
 
     # has_perms (plural) is usually handled by checking has_perm for each perm in the list
     # has_module_perms is often used by the Django admin
@@ -186,18 +193,39 @@ def generate_api_key():
     """Generates a secure random API key."""
     return secrets.token_urlsafe(32) # Generates a 32-byte key
 
+
+def hash_api_key(key):
+    """SHA-256 of a key; keys are random and long enough not to need a salt or slow hash."""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
 class APIKey(models.Model):
     """
     Represents an API key for external system access.
+    Only a hash of the key is stored: the key itself is available as `key` on the
+    instance that generated it (i.e. in the creation response) and never again.
     """
+    API_KEY_PREFIX_LENGTH = 8
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    key = models.CharField(
-        _("API Key"),
-        max_length=100, # Adjust length based on generation method
-        unique=True,
-        default=generate_api_key,
-        editable=False, # Key should not be editable after creation
-        help_text=_("The unique API key string.")
+    key_hash = models.CharField(
+        _("Key Hash"),
+        max_length=64,
+        unique=True, # Indexed lookup on every keyed request
+        editable=False,
+        help_text=_("SHA-256 of the API key.")
+    )
+    key_prefix = models.CharField(
+        _("Key Prefix"),
+        max_length=API_KEY_PREFIX_LENGTH,
+        editable=False,
+        help_text=_("First characters of the key, to tell keys apart.")
+    )
+    scopes = models.JSONField(
+        _("Scopes"),
+        default=list,
+        blank=True,
+        help_text=_("Permission strings the key is limited to, wildcards allowed (e.g. ['content.add_*']). Empty: no restriction.")
     )
     user = models.ForeignKey(
         CMSUser,
@@ -226,12 +254,23 @@ class APIKey(models.Model):
         verbose_name_plural = _("API Keys")
         ordering = ['-created_at']
 
+    key = None # The plain key, only set on the instance that generated it
+
     def __str__(self):
         return f"{self.name} ({self.user.email})"
 
+    def save(self, *args, **kwargs):
+        if not self.key_hash:
+            self.set_key(generate_api_key())
+        super().save(*args, **kwargs)
+
+    def set_key(self, key):
+        self.key = key
+        self.key_hash = hash_api_key(key)
+        self.key_prefix = key[:self.API_KEY_PREFIX_LENGTH]
+
     def record_usage(self):
-        """Updates the last used timestamp."""
+        """Updates the last used timestamp (written behind by the flush_api_key_usage task)."""
+        from .authentication import record_api_key_usage
         self.last_used_at = timezone.now()
-        self.save(update_fields=['last_used_at'])
-
-    # Consider adding permission scoping to API keys in the future
+        record_api_key_usage(self.pk, self.last_used_at)
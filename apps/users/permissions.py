@@ -0,0 +1,52 @@
+"""
+Compiled role permissions for CMSUser.has_perm.
+
+The permission strings of a user's roles are merged once into a frozenset,
+cached per user in process memory and in the shared cache (see
+apps.core.cache.VersionedLocalCache) and invalidated by the signal handlers in
+apps.users.signals. Checks are then set lookups, including wildcards:
+
+    '*'                       every permission
+    'content.*'               every permission of an app
+    'content.publish_*'       an action on every content type
+    'content.*_blogpost'      every action on one content type
+"""
+from django.conf import settings
+
+from apps.core.cache import VersionedLocalCache
+
+# Seconds compiled permission sets stay in the shared cache
+PERMISSIONS_CACHE_TIMEOUT = getattr(settings, 'PERMISSIONS_CACHE_TIMEOUT', 60 * 60)
+ALL_ROLES_TAG = 'permissions:roles' # Any role's permissions changed
+
+permission_cache = VersionedLocalCache('permissions', timeout=PERMISSIONS_CACHE_TIMEOUT)
+
+
+def user_roles_tag(user_pk):
+    return f"permissions:user:{user_pk}"
+
+
+def get_user_permissions(user):
+    """Returns the compiled permission set of the user's roles."""
+    from .models import Role
+
+    def build():
+        return frozenset(
+            perm
+            for perms in Role.objects.filter(users=user).values_list('permissions', flat=True)
+            for perm in perms or ()
+        )
+    return permission_cache.get_or_set(str(user.pk), [ALL_ROLES_TAG, user_roles_tag(user.pk)], build)
+
+
+def permission_granted(granted, perm):
+    """Whether `perm` ('<app_label>.<action>_<model>') is granted by the compiled set `granted`."""
+    if perm in granted or '*' in granted:
+        return True
+    app_label, sep, codename = perm.partition('.')
+    if not sep:
+        return False
+    if f"{app_label}.*" in granted:
+        return True
+    action, sep, model = codename.partition('_')
+    return bool(sep) and (f"{app_label}.{action}_*" in granted or f"{app_label}.*_{model}" in granted)
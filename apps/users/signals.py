@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.core.cache import invalidate_tags_now_and_on_commit
+from .authentication import api_key_cache_key
+from .models import APIKey, CMSUser, Role
+from .permissions import ALL_ROLES_TAG, user_roles_tag
+
+# --- Compiled permission invalidation (see apps.users.permissions) ---
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def role_changed_handler(sender, instance, **kwargs):
+    """A role's permissions may be shared by any number of users: invalidate them all."""
+    invalidate_tags_now_and_on_commit(ALL_ROLES_TAG)
+
+
+@receiver(m2m_changed, sender=CMSUser.roles.through)
+def user_roles_changed_handler(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse: # user.roles.add(...)
+        instance.__dict__.pop('_role_permissions', None)
+        invalidate_tags_now_and_on_commit(user_roles_tag(instance.pk))
+    elif pk_set: # role.users.add(...)
+        invalidate_tags_now_and_on_commit(*[user_roles_tag(pk) for pk in pk_set])
+    else: # role.users.clear(): the affected users are no longer known
+        invalidate_tags_now_and_on_commit(ALL_ROLES_TAG)
+
+
+# --- Resolved API key invalidation (see apps.users.authentication) ---
+
+def drop_cached_api_keys_on_commit(key_hashes):
+    key_hashes = list(key_hashes)
+    if key_hashes:
+        transaction.on_commit(lambda: cache.delete_many([api_key_cache_key(key_hash) for key_hash in key_hashes]))
+
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+def api_key_changed_handler(sender, instance, **kwargs):
+    drop_cached_api_keys_on_commit([instance.key_hash])
+
+
+@receiver(post_save, sender=CMSUser)
+def user_changed_handler(sender, instance, created, **kwargs):
+    """Cached keys hold a copy of the user (e.g. is_active, is_staff)."""
+    if not created:
+        drop_cached_api_keys_on_commit(APIKey.objects.filter(user=instance).values_list('key_hash', flat=True))
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+
+@shared_task
+def flush_api_key_usage():
+    """Celery task writing recorded API key uses to last_used_at (scheduled, see CELERY_BEAT_SCHEDULE)."""
+    from .authentication import flush_api_key_usage as flush
+    return f"Updated last_used_at of {flush()} API key(s)."
@@ -1,3 +1,227 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.webhooks.models import WebhookEndpoint
+from . import authentication
+from .authentication import APIKeyAuthentication, flush_api_key_usage, record_api_key_usage
+from .models import APIKey, CMSUser, Role
+from .permissions import permission_cache
+
+
+class Rollback(Exception):
+    pass
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PermissionCacheTests(TransactionTestCase):
+    """Changes commit here (no test-wide transaction), as in requests."""
+
+    def setUp(self):
+        permission_cache.clear()
+        self.addCleanup(permission_cache.clear)
+        self.role = Role.objects.create(name='Editor', permissions=['content.view_blogpost'])
+        self.user = CMSUser.objects.create_user(email='editor@example.com', password='x')
+        self.user.roles.add(self.role)
+
+    def fresh_user(self):
+        """A new instance, as on the next request (has_perm is memoized per instance)."""
+        return CMSUser.objects.get(pk=self.user.pk)
+
+    def test_compiled_permissions_are_cached(self):
+        self.assertTrue(self.fresh_user().has_perm('content.view_blogpost'))
+
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('content.view_blogpost'))
+            self.assertFalse(user.has_perm('content.publish_blogpost'))
+
+    def test_wildcards(self):
+        cases = {
+            '*': ['content.publish_blogpost', 'media.delete_mediaasset'],
+            'content.*': ['content.publish_blogpost', 'content.delete_page'],
+            'content.publish_*': ['content.publish_blogpost', 'content.publish_page'],
+            'content.*_blogpost': ['content.publish_blogpost', 'content.delete_blogpost'],
+        }
+        denied = {
+            'content.*': ['media.delete_mediaasset'],
+            'content.publish_*': ['content.delete_page'],
+            'content.*_blogpost': ['content.publish_page'],
+        }
+        for granted, perms in cases.items():
+            with self.subTest(granted=granted):
+                self.role.permissions = [granted]
+                self.role.save()
+            user = self.fresh_user()
+            for perm in perms:
+                self.assertTrue(user.has_perm(perm), (granted, perm))
+            for perm in denied.get(granted, []):
+                self.assertFalse(user.has_perm(perm), (granted, perm))
+
+    def test_role_change_is_seen_inside_its_transaction(self):
+        self.assertFalse(self.fresh_user().has_perm('content.publish_blogpost'))
+
+        with transaction.atomic():
+            self.role.permissions = ['content.view_blogpost', 'content.publish_blogpost']
+            self.role.save()
+            self.assertTrue(self.fresh_user().has_perm('content.publish_blogpost'))
+
+        self.assertTrue(self.fresh_user().has_perm('content.publish_blogpost'))
+
+    def test_rolled_back_grant_is_not_cached(self):
+        with self.assertRaises(Rollback), transaction.atomic():
+            self.role.permissions = ['content.view_blogpost', 'content.publish_blogpost']
+            self.role.save()
+            self.assertTrue(self.fresh_user().has_perm('content.publish_blogpost'))
+            raise Rollback
+
+        self.assertFalse(self.fresh_user().has_perm('content.publish_blogpost'))
+        permission_cache.clear() # Another worker: nothing local, only the shared cache
+        self.assertFalse(self.fresh_user().has_perm('content.publish_blogpost'))
+
+    def test_rolled_back_role_assignment_is_not_cached(self):
+        publisher = Role.objects.create(name='Publisher', permissions=['content.publish_blogpost'])
+        self.assertFalse(self.fresh_user().has_perm('content.publish_blogpost'))
+
+        with self.assertRaises(Rollback), transaction.atomic():
+            self.user.roles.add(publisher)
+            self.assertTrue(self.fresh_user().has_perm('content.publish_blogpost'))
+            raise Rollback
+
+        self.assertFalse(self.fresh_user().has_perm('content.publish_blogpost'))
+
+    def test_role_delete_invalidates(self):
+        self.assertTrue(self.fresh_user().has_perm('content.view_blogpost'))
+
+        self.role.delete()
+
+        self.assertFalse(self.fresh_user().has_perm('content.view_blogpost'))
+
+    def test_user_roles_change_invalidates(self):
+        publisher = Role.objects.create(name='Publisher', permissions=['content.publish_blogpost'])
+        self.assertFalse(self.fresh_user().has_perm('content.publish_blogpost'))
+
+        self.user.roles.add(publisher)
+        self.assertTrue(self.fresh_user().has_perm('content.publish_blogpost'))
+
+        publisher.users.remove(self.user)
+        self.assertFalse(self.fresh_user().has_perm('content.publish_blogpost'))
+
+    def test_role_users_clear_invalidates(self):
+        self.assertTrue(self.fresh_user().has_perm('content.view_blogpost'))
+
+        self.role.users.clear()
+
+        self.assertFalse(self.fresh_user().has_perm('content.view_blogpost'))
+
+    def test_other_process_sees_invalidation(self):
+        self.assertFalse(self.fresh_user().has_perm('content.publish_blogpost'))
+        self.role.permissions = ['content.publish_blogpost']
+        self.role.save()
+        permission_cache.clear() # Another worker: nothing local, only the shared cache
+
+        self.assertTrue(self.fresh_user().has_perm('content.publish_blogpost'))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class APIKeyAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        authentication._last_recorded.clear()
+        self.user = CMSUser.objects.create_user(email='agent@example.com', password='x', is_staff=True)
+        self.api_key = APIKey.objects.create(user=self.user, name='Agent')
+        self.client = APIClient()
+
+    def request(self, method, path, key=None, **kwargs):
+        key = key or self.api_key.key
+        return getattr(self.client, method)(path, HTTP_AUTHORIZATION=f"ApiKey {key}", format='json', **kwargs)
+
+    def test_resolved_key_is_cached(self):
+        APIKeyAuthentication().authenticate_credentials(self.api_key.key)
+
+        with self.assertNumQueries(0):
+            user, auth = APIKeyAuthentication().authenticate_credentials(self.api_key.key)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(auth.key_id, self.api_key.pk)
+
+    def test_unknown_key_is_cached_as_invalid(self):
+        with self.assertRaises(AuthenticationFailed):
+            APIKeyAuthentication().authenticate_credentials('unknown')
+        with self.assertNumQueries(0), self.assertRaises(AuthenticationFailed):
+            APIKeyAuthentication().authenticate_credentials('unknown')
+
+    def test_deactivated_key_is_dropped_from_cache(self):
+        self.assertEqual(self.request('get', '/api/v1/webhook-endpoints/').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api_key.is_active = False
+            self.api_key.save()
+
+        self.assertEqual(self.request('get', '/api/v1/webhook-endpoints/').status_code, 401)
+
+    def test_deleted_key_is_dropped_from_cache(self):
+        key = self.api_key.key
+        self.assertEqual(self.request('get', '/api/v1/webhook-endpoints/', key=key).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api_key.delete()
+
+        self.assertEqual(self.request('get', '/api/v1/webhook-endpoints/', key=key).status_code, 401)
+
+    def test_user_changes_drop_cached_keys(self):
+        self.assertEqual(self.request('get', '/api/v1/webhook-endpoints/').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = False
+            self.user.save()
+        self.assertEqual(self.request('get', '/api/v1/webhook-endpoints/').status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.request('get', '/api/v1/webhook-endpoints/').status_code, 401)
+
+    def test_scoped_key_is_denied_outside_its_scopes(self):
+        self.api_key.scopes = ['webhooks.view_*']
+        self.api_key.save()
+        data = {'target_url': 'https://receiver.example/hook', 'subscribed_events': ['*'], 'secret': 's3cret'}
+
+        self.assertEqual(self.request('get', '/api/v1/webhook-endpoints/').status_code, 200)
+        self.assertEqual(self.request('post', '/api/v1/webhook-endpoints/', data=data).status_code, 403)
+        self.assertEqual(self.request('get', '/api/v1/roles/').status_code, 403)
+        self.assertFalse(WebhookEndpoint.objects.exists())
+
+    def test_unscoped_key_has_the_users_access(self):
+        data = {'target_url': 'https://receiver.example/hook', 'subscribed_events': ['*'], 'secret': 's3cret'}
+
+        self.assertEqual(self.request('post', '/api/v1/webhook-endpoints/', data=data).status_code, 201)
+        self.assertEqual(self.request('get', '/api/v1/roles/').status_code, 200)
+
+    def test_scopes_limit_has_perm(self):
+        self.user.is_superuser = True
+        self.user.save()
+        self.api_key.scopes = ['content.add_*']
+        self.api_key.save()
+
+        user, __ = APIKeyAuthentication().authenticate_credentials(self.api_key.key)
+
+        self.assertTrue(user.has_perm('content.add_contentinstance'))
+        self.assertFalse(user.has_perm('content.delete_contentinstance'))
+        self.assertTrue(CMSUser.objects.get(pk=self.user.pk).has_perm('content.delete_contentinstance'))
+
+    def test_usage_is_flushed_with_one_update(self):
+        other = APIKey.objects.create(user=self.user, name='Other')
+        self.request('get', '/api/v1/webhook-endpoints/')
+        record_api_key_usage(other.pk)
+        self.api_key.refresh_from_db()
+        self.assertIsNone(self.api_key.last_used_at) # Not written by the request
+
+        with self.assertNumQueries(2): # Current values, then one UPDATE
+            self.assertEqual(flush_api_key_usage(), 2)
+
+        self.api_key.refresh_from_db()
+        self.assertIsNotNone(self.api_key.last_used_at)
+        self.assertEqual(flush_api_key_usage(), 0) # Nothing new since
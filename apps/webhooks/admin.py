@@ -1,21 +1,26 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
-from .models import WebhookEndpoint, WebhookEventLog
+from .models import WebhookEndpoint, WebhookEventLog, WebhookDeliveryRollup
 
 @admin.register(WebhookEndpoint)
 class WebhookEndpointAdmin(admin.ModelAdmin):
     """Admin configuration for the WebhookEndpoint model."""
-    list_display = ('target_url', 'get_event_summary', 'is_active', 'created_by_email', 'created_at')
-    list_filter = ('is_active', 'created_at')
+    list_display = ('target_url', 'get_event_summary', 'is_active', 'circuit_state', 'created_by_email', 'created_at')
+    list_filter = ('is_active', 'circuit_state', 'batch_delivery', 'created_at')
     search_fields = ('target_url', 'created_by__email', 'subscribed_events') # Search JSONField might need DB specific setup
     ordering = ('-created_at',)
-    readonly_fields = ('created_at', 'updated_at', 'secret_display') # Don't show full secret
+    readonly_fields = (
+        'created_at', 'updated_at', 'secret_display', # Don't show full secret
+        'circuit_state', 'consecutive_failures', 'circuit_opened_at', 'last_failure_at', 'last_error',
+    )
     raw_id_fields = ('created_by',) # Use simpler widget for user FK
 
     fieldsets = (
         (None, {'fields': ('target_url', 'subscribed_events', 'is_active')}),
+        (_('Delivery'), {'fields': ('batch_delivery', 'max_batch_size', 'max_concurrency', 'coalesce_window_seconds')}),
         # TODO: Use a better widget (e.g., CheckboxSelectMultiple based on WEBHOOK_EVENT_CHOICES)
         # for the 'subscribed_events' JSON field via a custom form.
+        (_('Health'), {'fields': ('circuit_state', 'consecutive_failures', 'circuit_opened_at', 'last_failure_at', 'last_error')}),
         (_('Security'), {'fields': ('secret',)}), # Use 'secret' for input
         (_('Metadata'), {'fields': ('created_by', 'created_at', 'updated_at')}),
     )
@@ -70,6 +75,7 @@ class WebhookEventLogAdmin(admin.ModelAdmin):
     readonly_fields = [f.name for f in WebhookEventLog._meta.fields] # Make all fields read-only
 
     list_select_related = ('endpoint',) # Optimize query for endpoint URL
+    show_full_result_count = False # Avoid an unfiltered COUNT(*) on a very large table
 
     def endpoint_url(self, obj):
         return obj.endpoint.target_url
@@ -85,3 +91,18 @@ class WebhookEventLogAdmin(admin.ModelAdmin):
 
     def has_delete_permission(self, request, obj=None):
         return False
+
+
+@admin.register(WebhookDeliveryRollup)
+class WebhookDeliveryRollupAdmin(admin.ModelAdmin):
+    """Daily delivery counts kept after logs are pruned (read-only)."""
+    list_display = ('day', 'endpoint', 'event_type', 'success_count', 'failure_count')
+    list_filter = ('day', 'event_type', 'endpoint')
+    ordering = ('-day',)
+    list_select_related = ('endpoint',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
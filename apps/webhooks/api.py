@@ -21,10 +21,15 @@ class WebhookEndpointSerializer(serializers.ModelSerializer):
         model = WebhookEndpoint
         fields = [
             'id', 'target_url', 'subscribed_events', 'is_active',
+            'batch_delivery', 'max_batch_size', 'max_concurrency', 'coalesce_window_seconds',
+            'circuit_state', 'consecutive_failures', 'circuit_opened_at', 'last_failure_at', 'last_error',
             'created_at', 'updated_at', 'created_by', 'created_by_detail',
             'secret' # Include secret for creation/update
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = [
+            'id', 'created_at', 'updated_at',
+            'circuit_state', 'consecutive_failures', 'circuit_opened_at', 'last_failure_at', 'last_error',
+        ]
         extra_kwargs = {
             # Make secret write-only for security - it shouldn't be exposed via API once set.
             # Consider a separate endpoint or mechanism if secret retrieval is needed.
@@ -49,7 +54,7 @@ class WebhookEventLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = WebhookEventLog
         fields = [
-            'id', 'endpoint_url', 'event_type', 'payload',
+            'id', 'endpoint_url', 'event_type', 'payload', 'payload_hash', 'outbox_event_ids',
             'request_headers', 'response_status_code', 'response_headers', 'response_body',
             'status', 'timestamp', 'is_successful'
         ]
@@ -0,0 +1,169 @@
+"""
+HTTP delivery of webhook requests, shared by the delivery tasks.
+
+Each worker process keeps one pooled keep-alive `requests.Session` per target
+host, so repeated deliveries reuse connections (and TLS sessions) instead of
+opening a new one per request. Endpoints limit the number of requests in
+flight to them via cache-based slots (`max_concurrency`).
+"""
+import hashlib
+import json
+import logging
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import WebhookEventLog
+
+logger = logging.getLogger(__name__)
+
+# Define webhook request timeout (in seconds)
+WEBHOOK_TIMEOUT = getattr(settings, 'WEBHOOK_TIMEOUT', 10)
+# Connections kept alive per target host and worker process
+WEBHOOK_POOL_MAXSIZE = getattr(settings, 'WEBHOOK_POOL_MAXSIZE', 10)
+USER_AGENT = f'Lithographer-Webhook-Agent/1.0 (+{settings.SITE_ID})' # Example User-Agent
+SIGNATURE_HEADER = 'X-Lithographer-Signature-256'
+RESPONSE_BODY_MAX_LENGTH = 2000
+# Store successful attempts without their payload, referencing the outbox events (see WebhookEventLog)
+WEBHOOK_LOG_COMPACT_SUCCESS = getattr(settings, 'WEBHOOK_LOG_COMPACT_SUCCESS', True)
+
+DeliveryResult = namedtuple('DeliveryResult', ['success', 'status_code', 'headers', 'body', 'retryable'])
+
+_http_sessions = {} # {(scheme, host:port): requests.Session}, per worker process
+
+
+def get_http_session(url):
+    """Returns the pooled keep-alive session for the host of `url`."""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    session = _http_sessions.get(key)
+    if session is None:
+        session = requests.Session()
+        session.mount(f"{parts.scheme}://", HTTPAdapter(pool_connections=1, pool_maxsize=WEBHOOK_POOL_MAXSIZE))
+        session.headers['User-Agent'] = USER_AGENT
+        _http_sessions[key] = session
+    return session
+
+
+def build_payload(event_name, data_payload, timestamp=None, change_count=None):
+    """
+    Single event payload; `timestamp` is when the event occurred (ISO 8601),
+    defaults to now. Coalesced events carry the number of changes they stand for.
+    """
+    payload = {
+        'event': event_name,
+        'timestamp': timestamp or timezone.now().isoformat(),
+        'data': data_payload
+    }
+    if change_count is not None:
+        payload['change_count'] = change_count
+    return payload
+
+
+def build_batch_payload(payloads):
+    """Payload of a batched request: the individual event payloads, in order."""
+    return {
+        'event': 'batch',
+        'timestamp': timezone.now().isoformat(),
+        'events': payloads,
+    }
+
+
+def serialize_payload(payload):
+    return json.dumps(payload, sort_keys=True) # Consistent order for signature
+
+
+def get_payload_hash(payload):
+    """SHA-256 of the payload as sent (the request body)."""
+    return hashlib.sha256(serialize_payload(payload).encode('utf-8')).hexdigest()
+
+
+def encode_payload(endpoint, payload):
+    """Returns (body bytes, request headers) for `payload`, signed with the endpoint secret."""
+    payload_json = serialize_payload(payload)
+    headers = {'Content-Type': 'application/json', 'User-Agent': USER_AGENT}
+    signature = endpoint.generate_signature(payload_json)
+    if signature:
+        headers[SIGNATURE_HEADER] = f"sha256={signature}" # Common signature format
+    return payload_json.encode('utf-8'), headers
+
+
+def post(endpoint, body, headers):
+    """Sends one request to the endpoint using the pooled session of its host."""
+    session = get_http_session(endpoint.target_url)
+    try:
+        response = session.post(endpoint.target_url, data=body, headers=headers, timeout=WEBHOOK_TIMEOUT)
+    except requests.exceptions.Timeout as exc:
+        logger.warning(f"Webhook request timed out for {endpoint.target_url}: {exc}")
+        return DeliveryResult(False, None, None, f"Request timed out after {WEBHOOK_TIMEOUT} seconds.", True)
+    except requests.exceptions.ConnectionError as exc:
+        logger.warning(f"Webhook connection failed for {endpoint.target_url}: {exc}")
+        return DeliveryResult(False, None, None, str(exc), True) # Receiver down or unreachable: retry later
+    except requests.exceptions.RequestException as exc:
+        logger.error(f"Webhook request failed for {endpoint.target_url}: {exc}")
+        return DeliveryResult(False, None, None, str(exc), False)
+    return make_result(response.status_code, dict(response.headers), response.text)
+
+
+def make_result(status_code, headers, text):
+    success = 200 <= status_code < 300
+    return DeliveryResult(
+        success=success,
+        status_code=status_code,
+        headers=headers,
+        body=text[:RESPONSE_BODY_MAX_LENGTH],
+        # Other client errors (4xx) are not retried; 429 asks us to back off
+        retryable=status_code == 429 or 500 <= status_code < 600,
+    )
+
+
+def build_log(endpoint, event_type, payload, headers, result, outbox_event_ids=None):
+    """
+    Unsaved WebhookEventLog for one delivery attempt (one row per attempt,
+    written once). `outbox_event_ids` are the outbox events delivered; without
+    them, the payload is kept even for successful attempts.
+    """
+    outbox_event_ids = [str(pk) for pk in outbox_event_ids] if outbox_event_ids and all(outbox_event_ids) else None
+    if result.success and WEBHOOK_LOG_COMPACT_SUCCESS and outbox_event_ids:
+        return WebhookEventLog(
+            endpoint=endpoint,
+            event_type=event_type,
+            payload_hash=get_payload_hash(payload),
+            outbox_event_ids=outbox_event_ids,
+            response_status_code=result.status_code,
+            status=WebhookEventLog.STATUS_SUCCESS,
+        )
+    return WebhookEventLog(
+        endpoint=endpoint,
+        event_type=event_type,
+        payload=payload,
+        payload_hash=get_payload_hash(payload),
+        outbox_event_ids=outbox_event_ids,
+        request_headers=headers,
+        response_status_code=result.status_code,
+        response_headers=result.headers,
+        response_body=result.body or '',
+        status=WebhookEventLog.STATUS_SUCCESS if result.success else WebhookEventLog.STATUS_FAILED,
+    )
+
+
+def acquire_delivery_slot(endpoint):
+    """
+    Claims one of the endpoint's `max_concurrency` in-flight slots. Returns the
+    slot key, or None if all are taken. Slots expire on their own in case a
+    worker dies before releasing them.
+    """
+    for slot in range(max(endpoint.max_concurrency, 1)):
+        key = f"webhooks:slot:{endpoint.pk}:{slot}"
+        if cache.add(key, 1, timeout=WEBHOOK_TIMEOUT + 5):
+            return key
+    return None
+
+
+def release_delivery_slot(key):
+    cache.delete(key)
@@ -0,0 +1,232 @@
+"""
+Asyncio webhook dispatcher, used when WEBHOOK_DISPATCH_MODE = 'async'.
+
+Instead of one blocking Celery task per delivery, deliveries are handed to the
+`dispatch_webhooks_async` task (routed to its own queue, served by a dedicated
+worker). Each worker process keeps one dispatcher (see get_dispatcher): an
+event loop running in a background thread with a single httpx.AsyncClient, so
+connections are reused across events. The task only submits an event's
+deliveries and returns, so slow receivers hold a coroutine rather than the
+worker, and the deliveries of many events are in flight together. Concurrency
+is capped per process (submitting blocks once it is reached), per target host
+and per endpoint (`max_concurrency`). Completed deliveries are handed back on
+a writer thread, which saves their WebhookEventLog rows with one bulk INSERT.
+
+Requires the optional `httpx` package.
+"""
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections
+
+from .delivery import WEBHOOK_TIMEOUT, USER_AGENT, build_log, make_result, DeliveryResult
+from .models import WebhookEventLog
+
+try:
+    import httpx
+except ImportError: # Optional dependency, only needed for the async dispatch mode
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# Deliveries in flight at once per dispatcher process
+WEBHOOK_ASYNC_MAX_IN_FLIGHT = getattr(settings, 'WEBHOOK_ASYNC_MAX_IN_FLIGHT', 1000)
+# Deliveries in flight at once per target host
+WEBHOOK_ASYNC_PER_HOST_LIMIT = getattr(settings, 'WEBHOOK_ASYNC_PER_HOST_LIMIT', 20)
+
+# One prepared request: payload already encoded and signed (see delivery.encode_payload)
+Delivery = namedtuple(
+    'Delivery', ['endpoint', 'event_type', 'payload', 'body', 'headers', 'outbox_event_id'], defaults=[None]
+)
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """The dispatcher shared by the async delivery tasks of this process."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AsyncWebhookDispatcher()
+        return _dispatcher
+
+
+def close_dispatcher(timeout=None):
+    """Lets the deliveries in flight finish (see AsyncWebhookDispatcher.close), e.g. on worker shutdown."""
+    global _dispatcher
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        dispatcher.close(timeout)
+
+
+def save_logs(results):
+    """Saves one WebhookEventLog per delivery attempt with a single INSERT."""
+    WebhookEventLog.objects.bulk_create([
+        build_log(
+            delivery.endpoint, delivery.event_type, delivery.payload, delivery.headers, result,
+            outbox_event_ids=[delivery.outbox_event_id]
+        )
+        for delivery, result in results
+    ])
+
+
+class AsyncWebhookDispatcher:
+    """
+    Sends webhook deliveries concurrently from a long-lived event loop and
+    client, started on first use and stopped by close().
+    """
+
+    def __init__(self, max_in_flight=WEBHOOK_ASYNC_MAX_IN_FLIGHT, per_host_limit=WEBHOOK_ASYNC_PER_HOST_LIMIT,
+                 timeout=WEBHOOK_TIMEOUT):
+        if httpx is None:
+            raise ImproperlyConfigured("The async webhook dispatcher requires the 'httpx' package.")
+        self.max_in_flight = max_in_flight
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._writer = None
+        self._capacity = threading.Semaphore(max_in_flight)
+        self._in_flight = set() # concurrent.futures.Future per delivery
+        # Only used on the event loop thread
+        self._host_limits = {}
+        self._endpoint_limits = {}
+
+    def start(self):
+        """Starts the event loop thread and opens the client (no-op if running)."""
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='webhook-dispatcher', daemon=True)
+            thread.start()
+            self._client = asyncio.run_coroutine_threadsafe(self._open_client(), loop).result()
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='webhook-dispatcher-writer')
+            self._loop, self._thread = loop, thread
+
+    def close(self, timeout=None):
+        """Waits up to `timeout` seconds for the deliveries in flight, then stops the loop and client."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+            if loop is None:
+                return
+            in_flight = list(self._in_flight)
+        wait(in_flight, timeout=timeout)
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+        self._writer.shutdown(wait=True) # Completion callbacks of finished deliveries still run
+        self._host_limits.clear()
+        self._endpoint_limits.clear()
+
+    def submit(self, deliveries, on_complete):
+        """
+        Starts sending `deliveries` and returns once they are all in flight
+        (blocking while the process is at max_in_flight). on_complete is then
+        called on the writer thread with [(delivery, result)], in order, once
+        every delivery is done.
+        """
+        if not deliveries:
+            on_complete([])
+            return
+        self.start()
+        futures = []
+        remaining = len(deliveries)
+        lock = threading.Lock()
+
+        def delivery_done(future):
+            nonlocal remaining
+            with self._lock:
+                self._in_flight.discard(future)
+            with lock:
+                remaining -= 1
+                if remaining:
+                    return
+            self._writer.submit(self._complete, deliveries, futures, on_complete)
+
+        for delivery in deliveries:
+            self._capacity.acquire()
+            future = asyncio.run_coroutine_threadsafe(self._send_limited(delivery), self._loop)
+            with self._lock:
+                self._in_flight.add(future)
+            futures.append(future)
+            future.add_done_callback(delivery_done)
+
+    def run(self, deliveries):
+        """Sends `deliveries`, waits for them and saves one log per attempt. Returns [(delivery, result)]."""
+        if not deliveries:
+            return []
+        done = threading.Event()
+        results = []
+
+        def on_complete(completed):
+            results.extend(completed)
+            done.set()
+        self.submit(deliveries, on_complete)
+        done.wait()
+        save_logs(results)
+        return results
+
+    def _complete(self, deliveries, futures, on_complete):
+        results = []
+        for delivery, future in zip(deliveries, futures):
+            exc = future.exception()
+            if exc is not None:
+                logger.error(f"Webhook request failed for {delivery.endpoint.target_url}: {exc!r}")
+                results.append((delivery, DeliveryResult(False, None, None, repr(exc), False)))
+            else:
+                results.append((delivery, future.result()))
+        try:
+            on_complete(results)
+        except Exception:
+            logger.exception("Failed to record completed webhook deliveries.")
+        finally:
+            close_old_connections()
+
+    async def _open_client(self):
+        limits = httpx.Limits(
+            max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight
+        )
+        return httpx.AsyncClient(timeout=self.timeout, limits=limits, headers={'User-Agent': USER_AGENT})
+
+    async def _send_limited(self, delivery):
+        try:
+            host = urlsplit(delivery.endpoint.target_url).netloc
+            host_limit = self._host_limits.get(host)
+            if host_limit is None:
+                host_limit = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+            endpoint_key = (delivery.endpoint.pk, max(delivery.endpoint.max_concurrency, 1))
+            endpoint_limit = self._endpoint_limits.get(endpoint_key)
+            if endpoint_limit is None:
+                endpoint_limit = self._endpoint_limits[endpoint_key] = asyncio.Semaphore(endpoint_key[1])
+            # Narrowest limit first, so waiting deliveries don't hold a host slot
+            async with endpoint_limit, host_limit:
+                return await self._send(self._client, delivery)
+        finally:
+            self._capacity.release()
+
+    async def _send(self, client, delivery):
+        target_url = delivery.endpoint.target_url
+        try:
+            response = await client.post(target_url, content=delivery.body, headers=delivery.headers)
+        except httpx.TimeoutException as exc:
+            logger.warning(f"Webhook request timed out for {target_url}: {exc}")
+            return DeliveryResult(False, None, None, f"Request timed out after {self.timeout} seconds.", True)
+        except httpx.TransportError as exc:
+            logger.warning(f"Webhook connection failed for {target_url}: {exc}")
+            return DeliveryResult(False, None, None, str(exc) or exc.__class__.__name__, True)
+        except httpx.HTTPError as exc:
+            logger.error(f"Webhook request failed for {target_url}: {exc}")
+            return DeliveryResult(False, None, None, str(exc) or exc.__class__.__name__, False)
+        return make_result(response.status_code, dict(response.headers), response.text)
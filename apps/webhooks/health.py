@@ -0,0 +1,123 @@
+"""
+Per-endpoint delivery health: retry backoff and circuit breaker.
+
+Failed deliveries that can be retried (timeouts, connection errors, 429 and
+5xx responses) are retried with exponential backoff and full jitter. After
+WEBHOOK_CIRCUIT_FAILURE_THRESHOLD consecutive failures the endpoint's circuit
+opens: deliveries are deferred rather than attempted. Once
+WEBHOOK_CIRCUIT_COOLDOWN has passed, a single probe request is let through
+(half-open). Its success closes the circuit; its failure opens it again.
+Deliveries held back for longer than WEBHOOK_CIRCUIT_MAX_DEFERRAL are given up
+on and logged as failed.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .delivery import WEBHOOK_TIMEOUT, DeliveryResult
+from .models import WebhookEndpoint
+
+WEBHOOK_MAX_RETRIES = getattr(settings, 'WEBHOOK_MAX_RETRIES', 5)
+WEBHOOK_RETRY_BASE_DELAY = getattr(settings, 'WEBHOOK_RETRY_BASE_DELAY', 10)
+WEBHOOK_RETRY_MAX_DELAY = getattr(settings, 'WEBHOOK_RETRY_MAX_DELAY', 60 * 60)
+WEBHOOK_CIRCUIT_FAILURE_THRESHOLD = getattr(settings, 'WEBHOOK_CIRCUIT_FAILURE_THRESHOLD', 5)
+WEBHOOK_CIRCUIT_COOLDOWN = getattr(settings, 'WEBHOOK_CIRCUIT_COOLDOWN', 5 * 60)
+# Seconds a delivery may be held back by an open circuit before it is given up on
+WEBHOOK_CIRCUIT_MAX_DEFERRAL = getattr(settings, 'WEBHOOK_CIRCUIT_MAX_DEFERRAL', 24 * 60 * 60)
+
+
+def get_retry_delay(retries):
+    """Exponential backoff with full jitter: uniform in [0, min(max, base * 2^retries)] seconds."""
+    return random.uniform(0, min(WEBHOOK_RETRY_MAX_DELAY, WEBHOOK_RETRY_BASE_DELAY * 2 ** retries))
+
+
+def get_deferral_delay(endpoint):
+    """Seconds until an open circuit may be probed again (plus jitter, so deferred deliveries spread out)."""
+    opened_at = endpoint.circuit_opened_at or timezone.now()
+    remaining = (opened_at + timedelta(seconds=WEBHOOK_CIRCUIT_COOLDOWN) - timezone.now()).total_seconds()
+    return max(remaining, 0) + random.uniform(1, WEBHOOK_RETRY_BASE_DELAY)
+
+
+def deferral_expired(deferred_since):
+    """Whether a delivery first held back at `deferred_since` (ISO 8601, None if never) has waited too long."""
+    if deferred_since is None:
+        return False
+    return timezone.now() >= parse_datetime(deferred_since) + timedelta(seconds=WEBHOOK_CIRCUIT_MAX_DEFERRAL)
+
+
+def circuit_open_result():
+    """Result logged for a delivery given up on because the endpoint's circuit stayed open."""
+    return DeliveryResult(
+        False, None, None, f"Circuit open: not delivered within {WEBHOOK_CIRCUIT_MAX_DEFERRAL} seconds.", False
+    )
+
+
+def allow_request(endpoint):
+    """
+    Whether a delivery to `endpoint` may be attempted now. With an open circuit
+    past its cooldown, only the caller that claims the probe lock may proceed.
+    """
+    if endpoint.circuit_state == WebhookEndpoint.CIRCUIT_CLOSED:
+        return True
+    if endpoint.circuit_state == WebhookEndpoint.CIRCUIT_OPEN:
+        cooldown_over = (
+            endpoint.circuit_opened_at is None
+            or timezone.now() >= endpoint.circuit_opened_at + timedelta(seconds=WEBHOOK_CIRCUIT_COOLDOWN)
+        )
+        if not cooldown_over:
+            return False
+    # Half-open: a single probe at a time
+    if not cache.add(_probe_key(endpoint), 1, timeout=WEBHOOK_TIMEOUT + 5):
+        return False
+    WebhookEndpoint.objects.filter(pk=endpoint.pk).update(circuit_state=WebhookEndpoint.CIRCUIT_HALF_OPEN)
+    endpoint.circuit_state = WebhookEndpoint.CIRCUIT_HALF_OPEN
+    return True
+
+
+def record_result(endpoint, result):
+    """Updates the endpoint's health after a delivery attempt (see delivery.DeliveryResult)."""
+    if result.retryable:
+        record_failure(endpoint, result.body if result.status_code is None else f"HTTP {result.status_code}")
+    else:
+        record_success(endpoint) # The receiver responded (2xx, or a 4xx it won't change its mind on)
+
+
+def record_success(endpoint):
+    if endpoint.circuit_state == WebhookEndpoint.CIRCUIT_CLOSED and not endpoint.consecutive_failures:
+        return # Healthy: no write per delivery
+    WebhookEndpoint.objects.filter(pk=endpoint.pk).update(
+        circuit_state=WebhookEndpoint.CIRCUIT_CLOSED, consecutive_failures=0, circuit_opened_at=None
+    )
+    endpoint.circuit_state, endpoint.consecutive_failures = WebhookEndpoint.CIRCUIT_CLOSED, 0
+    cache.delete(_probe_key(endpoint))
+
+
+def record_failure(endpoint, error=''):
+    now = timezone.now()
+    WebhookEndpoint.objects.filter(pk=endpoint.pk).update(
+        consecutive_failures=F('consecutive_failures') + 1, last_failure_at=now, last_error=(error or '')[:500]
+    )
+    failures = WebhookEndpoint.objects.filter(pk=endpoint.pk).values_list('consecutive_failures', flat=True).first() or 0
+    endpoint.consecutive_failures = failures
+    probe_failed = endpoint.circuit_state == WebhookEndpoint.CIRCUIT_HALF_OPEN
+    if probe_failed or failures >= WEBHOOK_CIRCUIT_FAILURE_THRESHOLD:
+        WebhookEndpoint.objects.filter(pk=endpoint.pk).update(
+            circuit_state=WebhookEndpoint.CIRCUIT_OPEN, circuit_opened_at=now
+        )
+        endpoint.circuit_state, endpoint.circuit_opened_at = WebhookEndpoint.CIRCUIT_OPEN, now
+    cache.delete(_probe_key(endpoint))
+
+
+def reset_circuit(endpoint):
+    """Closes the circuit manually (e.g. after the receiver has been fixed)."""
+    endpoint.consecutive_failures = 1 # Forces the write in record_success
+    record_success(endpoint)
+
+
+def _probe_key(endpoint):
+    return f"webhooks:probe:{endpoint.pk}"
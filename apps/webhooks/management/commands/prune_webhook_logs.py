@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.webhooks.retention import WEBHOOK_PRUNE_BATCH_SIZE, compact_logs, prune_logs, prune_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Rolls up and deletes webhook delivery logs past their retention, and deletes old dispatched "
+        "outbox events, in bounded batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=WEBHOOK_PRUNE_BATCH_SIZE,
+                            help="Rows deleted per transaction.")
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between batches.")
+        parser.add_argument('--compact', action='store_true',
+                            help="Also compact successful logs still holding full payloads to their outbox event references.")
+
+    def handle(self, *args, **options):
+        batch_size, pause = options['batch_size'], options['pause']
+        if options['compact']:
+            compacted = compact_logs(batch_size=batch_size, pause=pause)
+            self.stdout.write(f"Compacted {compacted} webhook event log(s).")
+        logs = prune_logs(batch_size=batch_size, pause=pause)
+        events = prune_outbox(batch_size=batch_size, pause=pause)
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {logs} webhook event log(s) and {events} outbox event(s)."
+        ))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.webhooks.outbox import WEBHOOK_OUTBOX_BATCH_SIZE, relay_outbox
+
+
+class Command(BaseCommand):
+    help = "Relays undispatched webhook outbox events to delivery, once or continuously (--loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=WEBHOOK_OUTBOX_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help="Keep polling the outbox until interrupted.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            relayed = relay_outbox(batch_size=options['batch_size'])
+            if relayed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"Relayed {relayed} webhook outbox event(s)."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.webhooks.outbox import replay_events
+
+
+def parse_moment(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise CommandError(f"Invalid date/time '{value}', expected ISO 8601 (e.g. 2025-01-31T14:00).")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = "Dispatches webhook events recorded in the outbox between --since and --until again (e.g. after an outage)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', required=True, help="Start of the range (ISO 8601, inclusive).")
+        parser.add_argument('--until', help="End of the range (ISO 8601, exclusive, default: now).")
+        parser.add_argument('--event-type', action='append', dest='event_types',
+                            help="Only replay this event type (repeatable).")
+
+    def handle(self, *args, **options):
+        since = parse_moment(options['since'])
+        until = parse_moment(options['until']) if options['until'] else None
+        if until and until <= since:
+            raise CommandError("--until must be after --since.")
+        replayed = replay_events(since, until, event_types=options['event_types'])
+        self.stdout.write(self.style.SUCCESS(f"Replayed {replayed} webhook event(s)."))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='webhookendpoint',
+            name='subscribed_events',
+            field=models.JSONField(blank=True, default=list, help_text="List of event types this webhook listens for (e.g., ['content_published', 'media_uploaded']). Use '*' for all events.", verbose_name='Subscribed Events'),
+        ),
+        migrations.AlterField(
+            model_name='webhookeventlog',
+            name='event_type',
+            field=models.CharField(db_index=True, help_text="The specific event that triggered this webhook (e.g., 'content_published').", max_length=100, verbose_name='Event Type'),
+        ),
+        migrations.AddIndex(
+            model_name='webhookeventlog',
+            index=models.Index(fields=['-timestamp', '-id'], name='webhooks_we_timesta_b4410b_idx'),
+        ),
+    ]
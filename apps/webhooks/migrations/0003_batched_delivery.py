@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:01
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0002_alter_webhookendpoint_subscribed_events_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookendpoint',
+            name='batch_delivery',
+            field=models.BooleanField(default=False, help_text='Receiver accepts batched requests: events are buffered briefly and sent together in one signed request.', verbose_name='Batch Delivery'),
+        ),
+        migrations.AddField(
+            model_name='webhookendpoint',
+            name='max_batch_size',
+            field=models.PositiveIntegerField(default=100, help_text='Maximum number of events per batched request.', verbose_name='Max Batch Size'),
+        ),
+        migrations.AddField(
+            model_name='webhookendpoint',
+            name='max_concurrency',
+            field=models.PositiveIntegerField(default=4, help_text='Maximum number of requests in flight to this endpoint at the same time.', verbose_name='Max Concurrency'),
+        ),
+        migrations.CreateModel(
+            name='PendingWebhookEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('event_type', models.CharField(max_length=100, verbose_name='Event Type')),
+                ('payload', models.JSONField(help_text='The event payload (event, timestamp, data).', verbose_name='Payload')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Created At')),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_events', to='webhooks.webhookendpoint', verbose_name='Webhook Endpoint')),
+            ],
+            options={
+                'verbose_name': 'Pending Webhook Event',
+                'verbose_name_plural': 'Pending Webhook Events',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['endpoint', 'created_at'], name='webhooks_pe_endpoin_114ef3_idx')],
+            },
+        ),
+    ]
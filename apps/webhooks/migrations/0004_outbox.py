@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:04
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0003_batched_delivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookOutboxEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('event_type', models.CharField(max_length=100, verbose_name='Event Type')),
+                ('data', models.JSONField(help_text='The event-specific data payload.', verbose_name='Data')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Created At')),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True, verbose_name='Dispatched At')),
+            ],
+            options={
+                'verbose_name': 'Webhook Outbox Event',
+                'verbose_name_plural': 'Webhook Outbox Events',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(condition=models.Q(('dispatched_at__isnull', True)), fields=['created_at'], name='webhooks_outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0004_outbox'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pendingwebhookevent',
+            name='webhooks_pe_endpoin_114ef3_idx',
+        ),
+        migrations.AddField(
+            model_name='pendingwebhookevent',
+            name='change_count',
+            field=models.PositiveIntegerField(default=1, verbose_name='Change Count'),
+        ),
+        migrations.AddField(
+            model_name='pendingwebhookevent',
+            name='coalesce_key',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Coalesce Key'),
+        ),
+        migrations.AddField(
+            model_name='pendingwebhookevent',
+            name='deliver_after',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Deliver After'),
+        ),
+        migrations.AddField(
+            model_name='webhookendpoint',
+            name='coalesce_window_seconds',
+            field=models.PositiveIntegerField(default=0, help_text='Collapse repeated events for the same item (e.g. content_updated) within this window into one delivery with the latest state and a change count. 0 disables coalescing.', verbose_name='Coalesce Window (seconds)'),
+        ),
+        migrations.AddIndex(
+            model_name='pendingwebhookevent',
+            index=models.Index(fields=['endpoint', 'deliver_after'], name='webhooks_pe_endpoin_0154d7_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='pendingwebhookevent',
+            constraint=models.UniqueConstraint(fields=('endpoint', 'coalesce_key'), name='webhooks_pending_coalesce_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0005_coalescing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookendpoint',
+            name='circuit_opened_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Circuit Opened At'),
+        ),
+        migrations.AddField(
+            model_name='webhookendpoint',
+            name='circuit_state',
+            field=models.CharField(choices=[('closed', 'Closed (delivering)'), ('open', 'Open (paused after failures)'), ('half_open', 'Half-open (probing)')], default='closed', editable=False, max_length=20, verbose_name='Circuit State'),
+        ),
+        migrations.AddField(
+            model_name='webhookendpoint',
+            name='consecutive_failures',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Consecutive Failures'),
+        ),
+        migrations.AddField(
+            model_name='webhookendpoint',
+            name='last_error',
+            field=models.CharField(blank=True, editable=False, max_length=500, verbose_name='Last Error'),
+        ),
+        migrations.AddField(
+            model_name='webhookendpoint',
+            name='last_failure_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Last Failure At'),
+        ),
+    ]
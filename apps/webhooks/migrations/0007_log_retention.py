@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0006_endpoint_health'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookDeliveryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=100, verbose_name='Event Type')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('success_count', models.PositiveIntegerField(default=0, verbose_name='Successful Attempts')),
+                ('failure_count', models.PositiveIntegerField(default=0, verbose_name='Failed Attempts')),
+            ],
+            options={
+                'verbose_name': 'Webhook Delivery Rollup',
+                'verbose_name_plural': 'Webhook Delivery Rollups',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddField(
+            model_name='webhookeventlog',
+            name='payload_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 of the JSON payload sent.', max_length=64, verbose_name='Payload Hash'),
+        ),
+        migrations.AlterField(
+            model_name='webhookeventlog',
+            name='endpoint',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='event_logs', to='webhooks.webhookendpoint', verbose_name='Webhook Endpoint'),
+        ),
+        migrations.AlterField(
+            model_name='webhookeventlog',
+            name='payload',
+            field=models.JSONField(blank=True, help_text='The JSON data sent in the webhook request (not kept for successful deliveries).', null=True, verbose_name='Payload'),
+        ),
+        migrations.AlterField(
+            model_name='webhookeventlog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('success', 'Success'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Delivery Status'),
+        ),
+        migrations.AddIndex(
+            model_name='webhookeventlog',
+            index=models.Index(fields=['endpoint', '-timestamp', '-id'], name='webhooks_log_endpoint_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='webhookeventlog',
+            index=models.Index(fields=['status', 'timestamp'], name='webhooks_log_status_idx'),
+        ),
+        migrations.AddField(
+            model_name='webhookdeliveryrollup',
+            name='endpoint',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_rollups', to='webhooks.webhookendpoint', verbose_name='Webhook Endpoint'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='webhookdeliveryrollup',
+            unique_together={('endpoint', 'event_type', 'day')},
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0007_log_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingwebhookevent',
+            name='outbox_event_id',
+            field=models.UUIDField(blank=True, help_text='The WebhookOutboxEvent the payload comes from (the latest one, for coalesced events).', null=True, verbose_name='Outbox Event ID'),
+        ),
+        migrations.AddField(
+            model_name='webhookeventlog',
+            name='outbox_event_ids',
+            field=models.JSONField(blank=True, help_text='IDs of the WebhookOutboxEvents delivered (one, or several for a batch).', null=True, verbose_name='Outbox Event IDs'),
+        ),
+    ]
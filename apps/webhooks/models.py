@@ -13,6 +13,7 @@ WEBHOOK_EVENT_CHOICES = [
     ('content_published', _('Content: Published')),
     ('content_updated', _('Content: Updated')),
     ('content_deleted', _('Content: Deleted')),
+    ('content_batch_ingested', _('Content: Batch Ingested')), # One event per bulk import batch
     # Add content-type specific events if needed, e.g.:
     # ('content_published:article', _('Content: Article Published')),
     ('media_uploaded', _('Media: Uploaded')),
@@ -23,12 +24,25 @@ WEBHOOK_EVENT_CHOICES = [
 ]
 # Generate a flat list of event names for validation/use elsewhere
 AVAILABLE_EVENT_NAMES = [choice[0] for choice in WEBHOOK_EVENT_CHOICES]
+# Events that can be coalesced per subject: event name -> data key identifying the subject
+COALESCIBLE_EVENTS = {
+    'content_updated': 'content_instance_id',
+}
 
 
 class WebhookEndpoint(models.Model):
     """
     Represents a configured endpoint to send webhook notifications to.
     """
+    CIRCUIT_CLOSED = 'closed'
+    CIRCUIT_OPEN = 'open'
+    CIRCUIT_HALF_OPEN = 'half_open'
+    CIRCUIT_STATE_CHOICES = [
+        (CIRCUIT_CLOSED, _('Closed (delivering)')),
+        (CIRCUIT_OPEN, _('Open (paused after failures)')),
+        (CIRCUIT_HALF_OPEN, _('Half-open (probing)')),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     target_url = models.URLField(
         _("Target URL"),
@@ -54,6 +68,35 @@ class WebhookEndpoint(models.Model):
         default=True,
         help_text=_("Whether this webhook endpoint is currently active and should receive events.")
     )
+    # Delivery options
+    batch_delivery = models.BooleanField(
+        _("Batch Delivery"),
+        default=False,
+        help_text=_("Receiver accepts batched requests: events are buffered briefly and sent together in one signed request.")
+    )
+    max_batch_size = models.PositiveIntegerField(
+        _("Max Batch Size"),
+        default=100,
+        help_text=_("Maximum number of events per batched request.")
+    )
+    max_concurrency = models.PositiveIntegerField(
+        _("Max Concurrency"),
+        default=4,
+        help_text=_("Maximum number of requests in flight to this endpoint at the same time.")
+    )
+    coalesce_window_seconds = models.PositiveIntegerField(
+        _("Coalesce Window (seconds)"),
+        default=0,
+        help_text=_("Collapse repeated events for the same item (e.g. content_updated) within this window into one delivery with the latest state and a change count. 0 disables coalescing.")
+    )
+    # Delivery health (circuit breaker, see apps.webhooks.health)
+    circuit_state = models.CharField(
+        _("Circuit State"), max_length=20, choices=CIRCUIT_STATE_CHOICES, default=CIRCUIT_CLOSED, editable=False
+    )
+    consecutive_failures = models.PositiveIntegerField(_("Consecutive Failures"), default=0, editable=False)
+    circuit_opened_at = models.DateTimeField(_("Circuit Opened At"), null=True, blank=True, editable=False)
+    last_failure_at = models.DateTimeField(_("Last Failure At"), null=True, blank=True, editable=False)
+    last_error = models.CharField(_("Last Error"), max_length=500, blank=True, editable=False)
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL, # Link to CMSUser
         on_delete=models.SET_NULL, # Keep endpoint if user is deleted
@@ -87,6 +130,11 @@ class WebhookEndpoint(models.Model):
 class WebhookEventLog(models.Model):
     """
     Logs the delivery attempt of a specific webhook event.
+
+    Successful attempts are stored compacted: the payload is dropped, and is
+    found through `outbox_event_ids` (outbox events are kept at least as long as
+    these logs, see apps.webhooks.retention); request/response details are dropped too. Old rows are summarised into
+    WebhookDeliveryRollup and deleted by `manage.py prune_webhook_logs`.
     """
     STATUS_PENDING = 'pending'
     STATUS_SUCCESS = 'success'
@@ -102,7 +150,8 @@ class WebhookEventLog(models.Model):
         WebhookEndpoint,
         on_delete=models.CASCADE, # If endpoint is deleted, logs are too
         related_name="event_logs",
-        verbose_name=_("Webhook Endpoint")
+        verbose_name=_("Webhook Endpoint"),
+        db_index=False, # Covered by the (endpoint, -timestamp, -id) index
     )
     event_type = models.CharField(
         _("Event Type"),
@@ -112,7 +161,19 @@ class WebhookEventLog(models.Model):
     )
     payload = models.JSONField(
         _("Payload"),
-        help_text=_("The JSON data sent in the webhook request.")
+        null=True, blank=True,
+        help_text=_("The JSON data sent in the webhook request (not kept for successful deliveries).")
+    )
+    payload_hash = models.CharField(
+        _("Payload Hash"),
+        max_length=64,
+        blank=True,
+        help_text=_("SHA-256 of the JSON payload sent.")
+    )
+    outbox_event_ids = models.JSONField(
+        _("Outbox Event IDs"),
+        null=True, blank=True,
+        help_text=_("IDs of the WebhookOutboxEvents delivered (one, or several for a batch).")
     )
     # Store request headers sent (e.g., signature)
     request_headers = models.JSONField(
@@ -142,7 +203,6 @@ class WebhookEventLog(models.Model):
         max_length=20,
         choices=STATUS_CHOICES,
         default=STATUS_PENDING,
-        db_index=True
     )
     timestamp = models.DateTimeField(
         _("Timestamp"),
@@ -157,14 +217,118 @@ class WebhookEventLog(models.Model):
         verbose_name = _("Webhook Event Log")
         verbose_name_plural = _("Webhook Event Logs")
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id']), # Keyset pagination
+            models.Index(fields=['endpoint', '-timestamp', '-id'], name='webhooks_log_endpoint_idx'), # Per endpoint
+            models.Index(fields=['status', 'timestamp'], name='webhooks_log_status_idx'), # Filtering and pruning
+        ]
 
     def __str__(self):
         return f"{self.event_type} to {self.endpoint.target_url} ({self.status} at {self.timestamp})"
 
+    def get_outbox_events(self):
+        """The outbox events this attempt delivered (holding their data), while they are retained."""
+        return WebhookOutboxEvent.objects.filter(pk__in=self.outbox_event_ids or [])
+
     @property
     def is_successful(self):
         return self.status == self.STATUS_SUCCESS and self.response_status_code is not None and 200 <= self.response_status_code < 300
 
+class WebhookDeliveryRollup(models.Model):
+    """
+    Daily delivery counts per endpoint and event type, kept after the
+    individual WebhookEventLog rows have been pruned.
+    """
+    endpoint = models.ForeignKey(
+        WebhookEndpoint,
+        on_delete=models.CASCADE,
+        related_name="delivery_rollups",
+        verbose_name=_("Webhook Endpoint")
+    )
+    event_type = models.CharField(_("Event Type"), max_length=100)
+    day = models.DateField(_("Day"))
+    success_count = models.PositiveIntegerField(_("Successful Attempts"), default=0)
+    failure_count = models.PositiveIntegerField(_("Failed Attempts"), default=0)
+
+    class Meta:
+        verbose_name = _("Webhook Delivery Rollup")
+        verbose_name_plural = _("Webhook Delivery Rollups")
+        ordering = ['-day']
+        unique_together = ('endpoint', 'event_type', 'day')
+
+    def __str__(self):
+        return f"{self.event_type} to {self.endpoint_id} on {self.day}"
+
+
+class WebhookOutboxEvent(models.Model):
+    """
+    Transactional outbox: events are written in the same transaction as the
+    change that caused them and relayed to delivery after commit (see
+    apps.webhooks.outbox). Relayed rows are kept for replays.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event_type = models.CharField(_("Event Type"), max_length=100)
+    data = models.JSONField(_("Data"), help_text=_("The event-specific data payload."))
+    created_at = models.DateTimeField(_("Created At"), default=timezone.now, db_index=True)
+    dispatched_at = models.DateTimeField(_("Dispatched At"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Webhook Outbox Event")
+        verbose_name_plural = _("Webhook Outbox Events")
+        ordering = ['created_at']
+        indexes = [
+            # Only undispatched rows are scanned by the relay
+            models.Index(
+                fields=['created_at'], condition=models.Q(dispatched_at__isnull=True),
+                name='webhooks_outbox_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} at {self.created_at}"
+
+
+class PendingWebhookEvent(models.Model):
+    """
+    An event buffered for an endpoint (batch delivery or coalescing) until the
+    flush_pending_webhooks run after `deliver_after` sends it (see apps.webhooks.tasks).
+    Coalesced events have a `coalesce_key`; repeats overwrite the payload and
+    increment `change_count` instead of adding rows.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    endpoint = models.ForeignKey(
+        WebhookEndpoint,
+        on_delete=models.CASCADE,
+        related_name="pending_events",
+        verbose_name=_("Webhook Endpoint")
+    )
+    event_type = models.CharField(_("Event Type"), max_length=100)
+    payload = models.JSONField(_("Payload"), help_text=_("The event payload (event, timestamp, data)."))
+    coalesce_key = models.CharField(_("Coalesce Key"), max_length=255, null=True, blank=True)
+    change_count = models.PositiveIntegerField(_("Change Count"), default=1)
+    outbox_event_id = models.UUIDField(
+        _("Outbox Event ID"), null=True, blank=True,
+        help_text=_("The WebhookOutboxEvent the payload comes from (the latest one, for coalesced events).")
+    )
+    created_at = models.DateTimeField(_("Created At"), default=timezone.now)
+    deliver_after = models.DateTimeField(_("Deliver After"), default=timezone.now)
+
+    class Meta:
+        verbose_name = _("Pending Webhook Event")
+        verbose_name_plural = _("Pending Webhook Events")
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['endpoint', 'deliver_after']),
+        ]
+        constraints = [
+            # One pending row per coalesced subject (NULL keys are not coalesced)
+            models.UniqueConstraint(fields=['endpoint', 'coalesce_key'], name='webhooks_pending_coalesce_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} for {self.endpoint_id}"
+
+
 # Placeholder for the actual webhook sending logic (likely using Celery)
 # def trigger_webhook(event_type, data):
 #     endpoints = WebhookEndpoint.objects.filter(is_active=True)
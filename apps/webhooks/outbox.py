@@ -0,0 +1,90 @@
+"""
+Transactional webhook outbox.
+
+Signal handlers call `enqueue_webhook_event`, which inserts a
+WebhookOutboxEvent in the current transaction (ATOMIC_REQUESTS), so rolled
+back writes never produce deliveries and committed ones are never lost. After
+commit, the relay drains undispatched rows in batches and fans them out to the
+delivery tasks. Relayed rows are kept, so a time range can be replayed after
+an outage (`manage.py replay_webhook_events`). Delivery tasks are queued when
+a batch's transaction commits, together with its `dispatched_at`, so a
+rolled back batch is relayed again without having sent anything.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import WebhookOutboxEvent
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_OUTBOX_BATCH_SIZE = getattr(settings, 'WEBHOOK_OUTBOX_BATCH_SIZE', 500)
+RELAY_SCHEDULED_KEY = 'webhooks:outbox:relay-scheduled'
+
+
+def enqueue_webhook_event(event_name, data_payload):
+    """Records an event in the outbox; it is relayed once the current transaction commits."""
+    event = WebhookOutboxEvent.objects.create(event_type=event_name, data=data_payload)
+    transaction.on_commit(schedule_outbox_relay)
+    return event
+
+
+def schedule_outbox_relay():
+    """Queues a relay run, unless one is already queued (many events per transaction share one run)."""
+    from .tasks import relay_webhook_outbox
+    if cache.add(RELAY_SCHEDULED_KEY, 1, timeout=60):
+        relay_webhook_outbox.delay()
+
+
+def relay_outbox(batch_size=WEBHOOK_OUTBOX_BATCH_SIZE):
+    """Fans out undispatched outbox events, oldest first, one batch per transaction. Returns the count."""
+    from .tasks import get_active_endpoints
+    cache.delete(RELAY_SCHEDULED_KEY) # Events committed from now on schedule a new run
+    relayed = 0
+    while True:
+        with transaction.atomic():
+            # Concurrent relays skip each other's rows instead of sending them twice
+            events = list(
+                WebhookOutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(dispatched_at__isnull=True).order_by('created_at')[:batch_size]
+            )
+            if not events:
+                break
+            endpoints = get_active_endpoints()
+            for event in events:
+                dispatch_event(event, endpoints)
+            WebhookOutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                dispatched_at=timezone.now()
+            )
+        relayed += len(events)
+    if relayed:
+        logger.info(f"Relayed {relayed} webhook outbox event(s).")
+    return relayed
+
+
+def dispatch_event(event, endpoints=None):
+    """Hands one outbox event to delivery (see tasks.fan_out_event)."""
+    from .tasks import fan_out_event
+    fan_out_event(
+        event.event_type, event.data, timestamp=event.created_at.isoformat(), endpoints=endpoints,
+        outbox_event_id=str(event.pk)
+    )
+
+
+def replay_events(since, until=None, event_types=None, batch_size=WEBHOOK_OUTBOX_BATCH_SIZE):
+    """Dispatches again every outbox event created in [since, until). Returns the count."""
+    from .tasks import get_active_endpoints
+    endpoints = get_active_endpoints()
+    events = WebhookOutboxEvent.objects.filter(created_at__gte=since, dispatched_at__isnull=False)
+    if until:
+        events = events.filter(created_at__lt=until)
+    if event_types:
+        events = events.filter(event_type__in=event_types)
+    replayed = 0
+    for event in events.order_by('created_at').iterator(chunk_size=batch_size):
+        dispatch_event(event, endpoints)
+        replayed += 1
+    return replayed
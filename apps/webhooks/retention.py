@@ -0,0 +1,136 @@
+"""
+Retention of webhook delivery history.
+
+WebhookEventLog gets a row per delivery attempt and is the fastest-growing
+table. Rows older than the retention period are summarised into daily
+WebhookDeliveryRollup counts and deleted, in bounded batches (one short
+transaction each), so pruning never holds long locks or builds up huge
+transactions. Failed attempts are kept longer than successful ones, which are
+only useful as counts. Dispatched outbox events are pruned the same way; they
+can no longer be replayed afterwards. Successful logs don't keep their
+payload but reference their outbox events, so while logs are compacted the
+events are kept at least as long as successful logs.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .delivery import WEBHOOK_LOG_COMPACT_SUCCESS, get_payload_hash
+from .models import WebhookDeliveryRollup, WebhookEventLog, WebhookOutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Days successful / failed delivery attempts are kept in WebhookEventLog
+WEBHOOK_LOG_RETENTION_DAYS = getattr(settings, 'WEBHOOK_LOG_RETENTION_DAYS', 30)
+WEBHOOK_FAILED_LOG_RETENTION_DAYS = getattr(settings, 'WEBHOOK_FAILED_LOG_RETENTION_DAYS', 90)
+# Days dispatched outbox events are kept (the window available to replay_webhook_events)
+WEBHOOK_OUTBOX_RETENTION_DAYS = getattr(settings, 'WEBHOOK_OUTBOX_RETENTION_DAYS', 7)
+# Rows deleted per transaction
+WEBHOOK_PRUNE_BATCH_SIZE = getattr(settings, 'WEBHOOK_PRUNE_BATCH_SIZE', 5000)
+
+
+def prune_logs(batch_size=WEBHOOK_PRUNE_BATCH_SIZE, pause=0, now=None):
+    """Rolls up and deletes expired delivery logs. Returns the number of rows deleted."""
+    now = now or timezone.now()
+    success_cutoff = now - timedelta(days=WEBHOOK_LOG_RETENTION_DAYS)
+    failed_cutoff = now - timedelta(days=WEBHOOK_FAILED_LOG_RETENTION_DAYS)
+    deleted = 0
+    for status, cutoff in (
+        (WebhookEventLog.STATUS_SUCCESS, success_cutoff),
+        (WebhookEventLog.STATUS_FAILED, failed_cutoff),
+        (WebhookEventLog.STATUS_PENDING, failed_cutoff),
+    ):
+        # Oldest first, along the (status, timestamp) index
+        expired = WebhookEventLog.objects.filter(status=status, timestamp__lt=cutoff).order_by('timestamp')
+        deleted += _delete_in_batches(expired, batch_size, pause, rollup=True)
+    if deleted:
+        logger.info(f"Pruned {deleted} webhook event log(s).")
+    return deleted
+
+
+def get_outbox_retention_days():
+    """Days dispatched outbox events are kept: also as long as the successful logs referencing them."""
+    if WEBHOOK_LOG_COMPACT_SUCCESS:
+        return max(WEBHOOK_OUTBOX_RETENTION_DAYS, WEBHOOK_LOG_RETENTION_DAYS)
+    return WEBHOOK_OUTBOX_RETENTION_DAYS
+
+
+def prune_outbox(batch_size=WEBHOOK_PRUNE_BATCH_SIZE, pause=0, now=None):
+    """Deletes dispatched outbox events past their retention. Returns the number of rows deleted."""
+    cutoff = (now or timezone.now()) - timedelta(days=get_outbox_retention_days())
+    expired = WebhookOutboxEvent.objects.filter(
+        created_at__lt=cutoff, dispatched_at__isnull=False
+    ).order_by('created_at')
+    return _delete_in_batches(expired, batch_size, pause)
+
+
+def compact_logs(batch_size=WEBHOOK_PRUNE_BATCH_SIZE, pause=0):
+    """
+    Compacts successful delivery logs still holding their full payload (written
+    before compaction was enabled) to their outbox event references. Logs
+    without references keep their payload. Returns the number of rows compacted.
+    """
+    compacted = 0
+    while True:
+        with transaction.atomic():
+            logs = list(
+                WebhookEventLog.objects.filter(
+                    status=WebhookEventLog.STATUS_SUCCESS, payload__isnull=False, outbox_event_ids__isnull=False
+                ).only('pk', 'payload')[:batch_size]
+            )
+            for log in logs:
+                log.payload_hash = get_payload_hash(log.payload)
+                log.payload = log.request_headers = log.response_headers = None
+                log.response_body = ''
+            WebhookEventLog.objects.bulk_update(
+                logs, ['payload_hash', 'payload', 'request_headers', 'response_headers', 'response_body']
+            )
+        compacted += len(logs)
+        if len(logs) < batch_size:
+            return compacted
+        time.sleep(pause)
+
+
+def rollup_logs(logs):
+    """Adds the attempts in `logs` (a queryset) to the daily WebhookDeliveryRollup counts."""
+    groups = (
+        logs.order_by().annotate(day=TruncDate('timestamp'))
+        .values('endpoint_id', 'event_type', 'day')
+        .annotate(
+            successes=Count('pk', filter=Q(status=WebhookEventLog.STATUS_SUCCESS)),
+            failures=Count('pk', filter=~Q(status=WebhookEventLog.STATUS_SUCCESS)),
+        )
+    )
+    for group in groups:
+        rollup, created = WebhookDeliveryRollup.objects.get_or_create(
+            endpoint_id=group['endpoint_id'], event_type=group['event_type'], day=group['day'],
+            defaults={'success_count': group['successes'], 'failure_count': group['failures']},
+        )
+        if not created:
+            WebhookDeliveryRollup.objects.filter(pk=rollup.pk).update(
+                success_count=F('success_count') + group['successes'],
+                failure_count=F('failure_count') + group['failures'],
+            )
+
+
+def _delete_in_batches(queryset, batch_size, pause, rollup=False):
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            batch = queryset.model.objects.filter(pk__in=pks)
+            if rollup:
+                rollup_logs(batch)
+            batch.delete() # No dependent rows or signals, so a single DELETE
+        deleted += len(pks)
+        if len(pks) < batch_size:
+            return deleted
+        time.sleep(pause) # Let replication and other writers catch up
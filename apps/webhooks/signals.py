@@ -4,10 +4,11 @@ from django.dispatch import receiver
 
 # Import models from other apps
 from apps.content.models import ContentInstance, STATUS_PUBLISHED
+from apps.content.signals import content_batch_ingested
 from apps.media.models import MediaAsset
 
-# Import the trigger task
-from .tasks import trigger_webhooks_for_event
+# Events go through the transactional outbox (relayed after commit)
+from .outbox import enqueue_webhook_event
 
 logger = logging.getLogger(__name__)
 
@@ -46,7 +47,7 @@ def content_instance_post_save_handler(sender, instance, created, **kwargs):
             'updated_at': instance.updated_at.isoformat(),
             # Include basic field data? Be careful about size/sensitivity
         }
-        trigger_webhooks_for_event.delay(event_name, payload)
+        enqueue_webhook_event(event_name, payload)
 
 
 @receiver(post_delete, sender=ContentInstance)
@@ -58,7 +59,21 @@ def content_instance_post_delete_handler(sender, instance, **kwargs):
         'content_instance_id': str(instance.id),
         'content_type_api_id': instance.content_type.api_id,
     }
-    trigger_webhooks_for_event.delay(event_name, payload)
+    enqueue_webhook_event(event_name, payload)
+
+
+@receiver(content_batch_ingested)
+def content_batch_ingested_handler(sender, instance_ids, content_type_api_ids, published_ids, **kwargs):
+    """Trigger a single grouped webhook for a bulk ingestion batch."""
+    event_name = 'content_batch_ingested'
+    logger.info(f"Batch of {len(instance_ids)} content instances ingested, triggering webhook.")
+    payload = {
+        'content_instance_ids': instance_ids,
+        'content_type_api_ids': content_type_api_ids,
+        'published_content_instance_ids': published_ids,
+        'count': len(instance_ids),
+    }
+    enqueue_webhook_event(event_name, payload)
 
 
 # --- MediaAsset Signals ---
@@ -76,7 +91,7 @@ def media_asset_post_save_handler(sender, instance, created, **kwargs):
             'size': instance.size,
             'uploader_id': str(instance.uploader_id) if instance.uploader_id else None,
         }
-        trigger_webhooks_for_event.delay(event_name, payload)
+        enqueue_webhook_event(event_name, payload)
     # else:
         # Trigger 'media_updated' if metadata changes? Might be too noisy.
         # pass
@@ -91,7 +106,7 @@ def media_asset_post_delete_handler(sender, instance, **kwargs):
         'media_asset_id': str(instance.id),
         'filename': instance.filename,
     }
-    trigger_webhooks_for_event.delay(event_name, payload)
+    enqueue_webhook_event(event_name, payload)
 
 
 # Note: Need to connect signals in apps.webhooks.apps.WebhooksConfig ready() method
@@ -1,23 +1,46 @@
 import logging
-import requests
-import json
-import hmac
-import hashlib
+import time
+from datetime import timedelta
+from functools import partial
+
 from celery import shared_task
-from django.utils import timezone
+from celery.signals import worker_process_shutdown
 from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 
-from .models import WebhookEndpoint, WebhookEventLog, AVAILABLE_EVENT_NAMES
+from .models import WebhookEndpoint, WebhookEventLog, PendingWebhookEvent, AVAILABLE_EVENT_NAMES, COALESCIBLE_EVENTS
+from .delivery import (
+    WEBHOOK_TIMEOUT, build_payload, build_batch_payload, encode_payload, post, build_log,
+    acquire_delivery_slot, release_delivery_slot
+)
+from .dispatcher import Delivery, close_dispatcher, get_dispatcher, save_logs
+from .health import (
+    WEBHOOK_MAX_RETRIES, allow_request, circuit_open_result, deferral_expired, get_deferral_delay, get_retry_delay,
+    record_result
+)
 
 logger = logging.getLogger(__name__)
 
-# Define webhook request timeout (in seconds)
-WEBHOOK_TIMEOUT = 10 # Adjust as needed
+# Seconds events are buffered for batch delivery endpoints before being sent
+WEBHOOK_BATCH_WINDOW = getattr(settings, 'WEBHOOK_BATCH_WINDOW', 5)
+# Seconds to wait before trying again when an endpoint has no free concurrency slot
+WEBHOOK_SLOT_RETRY_DELAY = 2
+# Seconds buffered events claimed by a batch flush stay hidden from other flushes
+WEBHOOK_BATCH_CLAIM_TIMEOUT = WEBHOOK_TIMEOUT + 30
+# 'celery': one blocking send_webhook task per delivery
+# 'async': deliveries of an event go to dispatch_webhooks_async (asyncio, dedicated worker)
+WEBHOOK_DISPATCH_MODE = getattr(settings, 'WEBHOOK_DISPATCH_MODE', 'celery')
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60) # Add retry logic
-def send_webhook(self, event_name, data_payload, endpoint_id):
+@shared_task(bind=True, max_retries=WEBHOOK_MAX_RETRIES)
+def send_webhook(self, event_name, data_payload, endpoint_id, timestamp=None, change_count=None, deferred_since=None,
+                 outbox_event_id=None):
     """
     Celery task to send a single webhook event to a specific endpoint.
+    `deferred_since` is when an open circuit first held the delivery back;
+    `outbox_event_id` is the outbox event delivered, referenced by the log.
     """
     try:
         endpoint = WebhookEndpoint.objects.get(id=endpoint_id, is_active=True)
@@ -30,14 +53,9 @@ def send_webhook(self, event_name, data_payload, endpoint_id):
         logger.info(f"Endpoint {endpoint.target_url} not subscribed to event '{event_name}'. Skipping.")
         return f"Endpoint not subscribed to {event_name}."
 
-    # Prepare payload and headers
-    payload = {
-        'event': event_name,
-        'timestamp': timezone.now().isoformat(),
-        'data': data_payload
-    }
+    payload = build_payload(event_name, data_payload, timestamp, change_count)
     try:
-        payload_json = json.dumps(payload, sort_keys=True) # Consistent order for signature
+        body, headers = encode_payload(endpoint, payload)
     except TypeError:
         logger.error(f"Failed to serialize webhook payload for event {event_name} to {endpoint.target_url}.")
         # Log failure but don't retry serialization errors
@@ -49,85 +67,321 @@ def send_webhook(self, event_name, data_payload, endpoint_id):
         )
         return "Payload serialization failed."
 
-    headers = {
-        'Content-Type': 'application/json',
-        'User-Agent': f'Lithographer-Webhook-Agent/1.0 (+{settings.SITE_ID})' # Example User-Agent
-    }
-
-    # Generate signature if secret exists
-    signature = endpoint.generate_signature(payload_json)
-    if signature:
-        headers['X-Lithographer-Signature-256'] = f"sha256={signature}" # Common signature format
-
-    # Log the attempt (initially pending)
-    log_entry = WebhookEventLog.objects.create(
-        endpoint=endpoint,
-        event_type=event_name,
-        payload=payload, # Store the dict payload
-        request_headers=headers,
-        status=WebhookEventLog.STATUS_PENDING,
-    )
-
-    # Make the request
+    args = [event_name, data_payload, endpoint_id, timestamp, change_count]
+    kwargs = {'outbox_event_id': outbox_event_id}
+    if not allow_request(endpoint):
+        if deferral_expired(deferred_since):
+            logger.error(f"Giving up on webhook event '{event_name}' to {endpoint.target_url}: circuit still open.")
+            build_log(
+                endpoint, event_name, payload, headers, circuit_open_result(), outbox_event_ids=[outbox_event_id]
+            ).save(force_insert=True)
+            return "Failed: circuit open."
+        # Circuit open: hold the delivery until the endpoint may be probed, without using up a retry
+        send_webhook.apply_async(
+            args=args + [deferred_since or timezone.now().isoformat()], kwargs=kwargs,
+            countdown=get_deferral_delay(endpoint)
+        )
+        return "Deferred: circuit open."
+    slot = acquire_delivery_slot(endpoint)
+    if slot is None:
+        # Endpoint is at max_concurrency; requeue without using up a retry
+        send_webhook.apply_async(args=args + [deferred_since], kwargs=kwargs, countdown=WEBHOOK_SLOT_RETRY_DELAY)
+        return "Deferred: endpoint at max concurrency."
     try:
         logger.info(f"Sending webhook for event '{event_name}' to {endpoint.target_url}")
-        response = requests.post(
-            endpoint.target_url,
-            data=payload_json.encode('utf-8'),
-            headers=headers,
-            timeout=WEBHOOK_TIMEOUT
-        )
-        response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-
-        # Success
-        log_entry.response_status_code = response.status_code
-        log_entry.response_headers = dict(response.headers)
-        # Limit response body size stored?
-        log_entry.response_body = response.text[:2000] # Store first 2000 chars
-        log_entry.status = WebhookEventLog.STATUS_SUCCESS
-        log_entry.save()
-        logger.info(f"Webhook delivered successfully to {endpoint.target_url} (Status: {response.status_code})")
-        return f"Success: {response.status_code}"
-
-    except requests.exceptions.Timeout as exc:
-        logger.warning(f"Webhook request timed out for {endpoint.target_url}: {exc}")
-        log_entry.response_body = f"Request timed out after {WEBHOOK_TIMEOUT} seconds."
-        log_entry.status = WebhookEventLog.STATUS_FAILED
-        log_entry.save()
-        # Retry based on task decorator settings
-        raise self.retry(exc=exc)
-
-    except requests.exceptions.RequestException as exc:
-        logger.error(f"Webhook request failed for {endpoint.target_url}: {exc}")
-        log_entry.response_body = str(exc)
-        if exc.response is not None:
-            log_entry.response_status_code = exc.response.status_code
-            log_entry.response_headers = dict(exc.response.headers)
-            # Limit response body size stored?
-            log_entry.response_body += "\n\n" + exc.response.text[:2000]
-        log_entry.status = WebhookEventLog.STATUS_FAILED
-        log_entry.save()
-        # Retry based on task decorator settings (especially for 5xx errors)
-        if exc.response is not None and 500 <= exc.response.status_code < 600:
-             raise self.retry(exc=exc)
+        result = post(endpoint, body, headers)
+    finally:
+        release_delivery_slot(slot)
+
+    # A single log row per attempt, written with the outcome
+    build_log(endpoint, event_name, payload, headers, result, outbox_event_ids=[outbox_event_id]).save(force_insert=True)
+    record_result(endpoint, result)
+    if result.success:
+        logger.info(f"Webhook delivered successfully to {endpoint.target_url} (Status: {result.status_code})")
+        return f"Success: {result.status_code}"
+    if result.retryable:
+        # Timeouts, connection errors, 429 and 5xx: exponential backoff with jitter
+        raise self.retry(countdown=get_retry_delay(self.request.retries))
+    return f"Failed: {result.status_code or result.body}" # Don't retry other client errors (4xx)
+
+
+@shared_task(bind=True, max_retries=WEBHOOK_MAX_RETRIES)
+def flush_pending_webhooks(self, endpoint_id, deferred_since=None):
+    """
+    Celery task sending the buffered events of an endpoint that are due: up to
+    `max_batch_size` per signed request for batch delivery endpoints, otherwise
+    one send_webhook task per (coalesced) event. Requeues itself while events
+    remain. `deferred_since` is when an open circuit first held the flush back.
+    """
+    cache.delete(f"webhooks:flush:{endpoint_id}") # Events buffered from now on schedule a new flush
+    try:
+        endpoint = WebhookEndpoint.objects.get(id=endpoint_id, is_active=True)
+    except WebhookEndpoint.DoesNotExist:
+        logger.warning(f"Webhook endpoint {endpoint_id} not found or inactive. Dropping buffered events.")
+        PendingWebhookEvent.objects.filter(endpoint_id=endpoint_id).delete()
+        return f"Endpoint {endpoint_id} not found or inactive."
+
+    if endpoint.batch_delivery:
+        if not allow_request(endpoint):
+            if deferral_expired(deferred_since):
+                dropped = _drop_due_events(endpoint)
+                return f"Failed: circuit open ({dropped} events dropped)"
+            flush_pending_webhooks.apply_async(
+                args=[endpoint_id, deferred_since or timezone.now().isoformat()],
+                countdown=get_deferral_delay(endpoint)
+            )
+            return "Deferred: circuit open."
+        slot = acquire_delivery_slot(endpoint)
+        if slot is None:
+            flush_pending_webhooks.apply_async(args=[endpoint_id, deferred_since], countdown=WEBHOOK_SLOT_RETRY_DELAY)
+            return "Deferred: endpoint at max concurrency."
+    else:
+        slot = None
+    result, retry = None, False
+    try:
+        if endpoint.batch_delivery:
+            # Claimed in a short transaction; the request is sent without holding row locks
+            pending = _claim_pending_events(endpoint)
+            if pending:
+                result = _send_batch(endpoint, pending)
+                record_result(endpoint, result)
+                retry = not result.success and result.retryable and self.request.retries < self.max_retries
+                if retry:
+                    countdown = get_retry_delay(self.request.retries)
+                    _release_claimed_events(pending, deliver_after=timezone.now() + timedelta(seconds=countdown))
+                else:
+                    _release_claimed_events(pending, delete=True)
         else:
-             return f"Failed: {exc}" # Don't retry client errors (4xx) or connection errors immediately
+            with transaction.atomic():
+                pending = list(_due_pending_events(endpoint))
+                if pending:
+                    PendingWebhookEvent.objects.filter(pk__in=[event.pk for event in pending]).delete()
+                    # Queued once the rows are gone, so a rolled back flush doesn't send them twice
+                    transaction.on_commit(partial(queue_tasks, [
+                        send_webhook.s(
+                            event.event_type, event.payload['data'], str(endpoint.id),
+                            event.payload['timestamp'], event.change_count if event.coalesce_key else None,
+                            outbox_event_id=event.outbox_event_id and str(event.outbox_event_id)
+                        )
+                        for event in pending
+                    ]))
+    finally:
+        if slot:
+            release_delivery_slot(slot)
 
-    except Exception as exc:
-        # Catch any other unexpected errors during processing
-        logger.exception(f"Unexpected error sending webhook to {endpoint.target_url}: {exc}")
-        log_entry.response_body = f"Unexpected error: {exc}"
-        log_entry.status = WebhookEventLog.STATUS_FAILED
-        log_entry.save()
-        # Decide whether to retry unexpected errors
-        # raise self.retry(exc=exc)
-        return f"Unexpected error: {exc}"
+    if retry:
+        raise self.retry(countdown=countdown)
+    next_due = (
+        PendingWebhookEvent.objects.filter(endpoint=endpoint).order_by('deliver_after')
+        .values_list('deliver_after', flat=True).first()
+    )
+    if next_due is not None:
+        schedule_pending_flush(endpoint_id, countdown=max((next_due - timezone.now()).total_seconds(), 0))
+    if not pending:
+        return "No buffered events due."
+    if result is None:
+        return f"Queued {len(pending)} event(s)."
+    if result.success:
+        return f"Success: {result.status_code} ({len(pending)} events)"
+    return f"Failed: {result.status_code or result.body} ({len(pending)} events dropped)"
+
+
+def _due_pending_events(endpoint):
+    """The endpoint's buffered events that are due, oldest first, locked (inside a transaction)."""
+    # Rows locked by a concurrent flush are skipped rather than sent twice
+    return (
+        PendingWebhookEvent.objects.select_for_update(skip_locked=True)
+        .filter(endpoint=endpoint, deliver_after__lte=timezone.now())
+        .order_by('created_at')[:max(endpoint.max_batch_size, 1)]
+    )
+
+
+def _claim_pending_events(endpoint):
+    """
+    Claims the endpoint's due buffered events for one batch request: their
+    `deliver_after` is pushed past the time the request can take, so concurrent
+    flushes skip them while they are being sent. If the worker dies meanwhile,
+    the claim lapses and the next flush sends them. Returns the claimed events.
+    """
+    with transaction.atomic():
+        pending = list(_due_pending_events(endpoint))
+        if pending:
+            PendingWebhookEvent.objects.filter(pk__in=[event.pk for event in pending]).update(
+                deliver_after=timezone.now() + timedelta(seconds=WEBHOOK_BATCH_CLAIM_TIMEOUT)
+            )
+    return pending
+
+
+def _release_claimed_events(pending, deliver_after=None, delete=False):
+    """
+    Deletes claimed events once sent (or given up on), or makes them due again
+    at `deliver_after`. A coalesced event updated while it was being sent holds
+    a newer state: it is kept and made due now.
+    """
+    pks = [event.pk for event in pending]
+    if delete:
+        unchanged = Q()
+        for event in pending:
+            unchanged |= Q(pk=event.pk, change_count=event.change_count)
+        PendingWebhookEvent.objects.filter(unchanged).delete()
+    PendingWebhookEvent.objects.filter(pk__in=pks).update(deliver_after=deliver_after or timezone.now())
+
+
+def _drop_due_events(endpoint):
+    """
+    Gives up on the endpoint's due buffered events while its circuit stays
+    open: each batch is logged as a failed attempt and deleted. Returns the count.
+    """
+    dropped = 0
+    while pending := _claim_pending_events(endpoint):
+        payload = _build_batch(pending)
+        __, headers = encode_payload(endpoint, payload)
+        build_log(
+            endpoint, 'batch', payload, headers, circuit_open_result(),
+            outbox_event_ids=[event.outbox_event_id for event in pending]
+        ).save(force_insert=True)
+        _release_claimed_events(pending, delete=True)
+        dropped += len(pending)
+    logger.error(f"Gave up on {dropped} buffered webhook event(s) to {endpoint.target_url}: circuit still open.")
+    return dropped
+
+
+def _build_batch(pending):
+    payloads = []
+    for event in pending:
+        payload = dict(event.payload)
+        if event.coalesce_key:
+            payload['change_count'] = event.change_count
+        payloads.append(payload)
+    return build_batch_payload(payloads)
+
+
+def _send_batch(endpoint, pending):
+    """Sends buffered events as one signed batch request and logs the attempt."""
+    payload = _build_batch(pending)
+    body, headers = encode_payload(endpoint, payload)
+    logger.info(f"Sending batch of {len(pending)} webhook event(s) to {endpoint.target_url}")
+    result = post(endpoint, body, headers)
+    build_log(
+        endpoint, 'batch', payload, headers, result, outbox_event_ids=[event.outbox_event_id for event in pending]
+    ).save(force_insert=True)
+    return result
+
+
+@shared_task(bind=True, max_retries=WEBHOOK_MAX_RETRIES)
+def dispatch_webhooks_async(self, event_name, data_payload, endpoint_ids, timestamp=None, deferred_since=None,
+                            outbox_event_id=None):
+    """
+    Celery task handing the deliveries of one event to the worker process's
+    asyncio dispatcher (see apps.webhooks.dispatcher). Meant for a dedicated
+    worker consuming the 'webhooks_async' queue: the task returns once the
+    deliveries are in flight, and their results are recorded as they complete.
+    Failed deliveries that can be retried are queued again together; endpoints
+    with an open circuit are deferred together (since `deferred_since`).
+    """
+    payload = build_payload(event_name, data_payload, timestamp)
+    deliveries, deferred = [], []
+    for endpoint in WebhookEndpoint.objects.filter(id__in=endpoint_ids, is_active=True):
+        body, headers = encode_payload(endpoint, payload)
+        delivery = Delivery(endpoint, event_name, payload, body, headers, outbox_event_id)
+        (deliveries if allow_request(endpoint) else deferred).append(delivery)
+    if deferred and deferral_expired(deferred_since):
+        logger.error(f"Giving up on webhook event '{event_name}' to {len(deferred)} endpoint(s): circuit still open.")
+        save_logs([(delivery, circuit_open_result()) for delivery in deferred])
+    elif deferred:
+        dispatch_webhooks_async.apply_async(
+            args=[
+                event_name, data_payload, [str(delivery.endpoint.pk) for delivery in deferred], timestamp,
+                deferred_since or timezone.now().isoformat()
+            ],
+            kwargs={'outbox_event_id': outbox_event_id},
+            countdown=min(get_deferral_delay(delivery.endpoint) for delivery in deferred)
+        )
+
+    logger.info(f"Dispatching event '{event_name}' to {len(deliveries)} endpoint(s)")
+    get_dispatcher().submit(
+        deliveries,
+        partial(record_async_results, event_name, data_payload, timestamp, self.request.retries, outbox_event_id)
+    )
+    return f"Dispatching {event_name} to {len(deliveries)} endpoint(s)."
+
+
+def record_async_results(event_name, data_payload, timestamp, retries, outbox_event_id, results):
+    """
+    Saves the logs and endpoint health of an event's completed async deliveries
+    and queues the retryable failures again (called on the dispatcher's writer thread).
+    """
+    save_logs(results)
+    for delivery, result in results:
+        record_result(delivery.endpoint, result)
+    retry_ids = [str(delivery.endpoint.pk) for delivery, result in results if result.retryable]
+    if retry_ids and retries < WEBHOOK_MAX_RETRIES:
+        dispatch_webhooks_async.apply_async(
+            args=[event_name, data_payload, retry_ids, timestamp], kwargs={'outbox_event_id': outbox_event_id},
+            countdown=get_retry_delay(retries), retries=retries + 1
+        )
+    succeeded = sum(1 for __, result in results if result.success)
+    logger.info(f"Delivered {succeeded}/{len(results)} for {event_name}.")
+
+
+@worker_process_shutdown.connect
+def close_async_dispatcher(**kwargs):
+    """Lets the async deliveries in flight finish before a worker process exits."""
+    close_dispatcher(timeout=WEBHOOK_TIMEOUT)
+
+
+def schedule_pending_flush(endpoint_id, countdown=WEBHOOK_BATCH_WINDOW):
+    """Queues a flush of the endpoint's buffered events, unless one is already queued to run by then."""
+    key = f"webhooks:flush:{endpoint_id}"
+    eta = time.time() + countdown
+    scheduled_eta = cache.get(key)
+    if scheduled_eta is not None and scheduled_eta <= eta:
+        return
+    cache.set(key, eta, timeout=countdown + 60)
+    flush_pending_webhooks.apply_async(args=[str(endpoint_id)], countdown=countdown)
+
+
+def buffer_coalesced_event(endpoint, event_name, payload, coalesce_key, outbox_event_id=None):
+    """
+    Buffers an event for the endpoint's coalescing window: a repeat within the
+    window replaces the buffered payload (latest state) and increments its change count.
+    """
+    window = endpoint.coalesce_window_seconds
+    pending = PendingWebhookEvent.objects.filter(endpoint=endpoint, coalesce_key=coalesce_key)
+    latest = {'payload': payload, 'outbox_event_id': outbox_event_id, 'change_count': F('change_count') + 1}
+    if pending.update(**latest):
+        return
+    try:
+        with transaction.atomic():
+            PendingWebhookEvent.objects.create(
+                endpoint=endpoint, event_type=event_name, payload=payload, coalesce_key=coalesce_key,
+                outbox_event_id=outbox_event_id, deliver_after=timezone.now() + timedelta(seconds=window)
+            )
+    except IntegrityError: # Buffered concurrently by another relay
+        pending.update(**latest)
+        return
+    transaction.on_commit(lambda: schedule_pending_flush(endpoint.id, countdown=window))
 
 
 @shared_task
-def trigger_webhooks_for_event(event_name, data_payload):
+def trigger_webhooks_for_event(event_name, data_payload, timestamp=None):
+    """Celery task queueing delivery of an event to all subscribed endpoints (see fan_out_event)."""
+    return fan_out_event(event_name, data_payload, timestamp)
+
+
+def get_active_endpoints():
+    return list(WebhookEndpoint.objects.filter(is_active=True))
+
+
+def fan_out_event(event_name, data_payload, timestamp=None, endpoints=None, outbox_event_id=None):
     """
-    Finds all active endpoints subscribed to an event and queues individual delivery tasks.
+    Finds the active endpoints subscribed to an event and queues delivery: one
+    task per endpoint, or buffered for endpoints using batch delivery. Tasks
+    are queued once the current transaction commits, so a rolled back relay
+    never sends. `endpoints` are the active endpoints, when already loaded
+    (the outbox relay loads them once per batch); `outbox_event_id` is the
+    outbox event relayed, referenced by the delivery logs. Called by the outbox relay
+    (see apps.webhooks.outbox) rather than queued directly.
     """
     if event_name not in AVAILABLE_EVENT_NAMES:
         logger.warning(f"Attempted to trigger unknown webhook event: {event_name}")
@@ -135,15 +389,76 @@ def trigger_webhooks_for_event(event_name, data_payload):
 
     logger.info(f"Triggering webhooks for event: {event_name}")
     # Find endpoints subscribed to this specific event OR the wildcard '*'
-    endpoints = WebhookEndpoint.objects.filter(
-        models.Q(subscribed_events__contains=event_name) | models.Q(subscribed_events__contains='"*"'),
-        is_active=True
-    )
+    # (filtered in Python: JSON containment lookups are not portable across databases)
+    endpoints = [
+        endpoint for endpoint in (get_active_endpoints() if endpoints is None else endpoints)
+        if "*" in endpoint.subscribed_events or event_name in endpoint.subscribed_events
+    ]
+
+    payload = build_payload(event_name, data_payload, timestamp)
+    subject = data_payload.get(COALESCIBLE_EVENTS[event_name]) if event_name in COALESCIBLE_EVENTS else None
+    coalesced_endpoints = [endpoint for endpoint in endpoints if subject and endpoint.coalesce_window_seconds]
+    for endpoint in coalesced_endpoints:
+        buffer_coalesced_event(endpoint, event_name, payload, f"{event_name}:{subject}", outbox_event_id)
+
+    batch_endpoints = [
+        endpoint for endpoint in endpoints if endpoint.batch_delivery and endpoint not in coalesced_endpoints
+    ]
+    if batch_endpoints:
+        deliver_after = timezone.now() + timedelta(seconds=WEBHOOK_BATCH_WINDOW)
+        PendingWebhookEvent.objects.bulk_create([
+            PendingWebhookEvent(
+                endpoint=endpoint, event_type=event_name, payload=payload, outbox_event_id=outbox_event_id,
+                deliver_after=deliver_after
+            )
+            for endpoint in batch_endpoints
+        ])
+        for endpoint in batch_endpoints:
+            # The flush must see the buffered rows, so queue it after commit
+            transaction.on_commit(lambda endpoint_id=endpoint.id: schedule_pending_flush(endpoint_id))
+
+    direct_endpoints = [
+        endpoint for endpoint in endpoints if not endpoint.batch_delivery and endpoint not in coalesced_endpoints
+    ]
+    if WEBHOOK_DISPATCH_MODE == 'async':
+        tasks = [dispatch_webhooks_async.s(
+            event_name, data_payload, [str(endpoint.id) for endpoint in direct_endpoints], timestamp,
+            outbox_event_id=outbox_event_id
+        )] if direct_endpoints else []
+    else:
+        tasks = [
+            send_webhook.s(event_name, data_payload, str(endpoint.id), timestamp, outbox_event_id=outbox_event_id)
+            for endpoint in direct_endpoints
+        ]
+    if tasks:
+        transaction.on_commit(partial(queue_tasks, tasks))
+    count = len(direct_endpoints)
+
+    buffered = len(batch_endpoints) + len(coalesced_endpoints)
+    logger.info(f"Queued delivery to {count} endpoint(s) and buffered {buffered} event(s) for event: {event_name}")
+    return f"Queued {count}, buffered for {buffered} endpoint(s) for {event_name}."
 
-    count = 0
-    for endpoint in endpoints:
-        send_webhook.delay(event_name, data_payload, endpoint.id)
-        count += 1
 
-    logger.info(f"Queued {count} webhook delivery tasks for event: {event_name}")
-    return f"Queued {count} tasks for {event_name}."
\ No newline at end of file
+def queue_tasks(signatures):
+    for signature in signatures:
+        signature.delay()
+
+
+@shared_task
+def prune_webhook_logs():
+    """Celery task applying the webhook log and outbox retention (run daily, see CELERY_BEAT_SCHEDULE)."""
+    from .retention import prune_logs, prune_outbox
+    logs, events = prune_logs(), prune_outbox()
+    return f"Pruned {logs} log(s) and {events} outbox event(s)."
+
+
+@shared_task
+def relay_webhook_outbox():
+    """
+    Celery task relaying committed outbox events to delivery. Queued after each
+    committing transaction, and scheduled periodically as a safety net (see CELERY_BEAT_SCHEDULE).
+    """
+    from .outbox import relay_outbox
+    relayed = relay_outbox()
+    return f"Relayed {relayed} event(s)."
+
@@ -1,3 +1,416 @@
-from django.test import TestCase
+import json
+import threading
+import time
+import unittest
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .delivery import build_payload, encode_payload, make_result, SIGNATURE_HEADER
+from .dispatcher import AsyncWebhookDispatcher, Delivery, httpx
+from .models import WebhookEndpoint, WebhookEventLog, WebhookOutboxEvent, PendingWebhookEvent
+from .health import WEBHOOK_CIRCUIT_COOLDOWN, WEBHOOK_CIRCUIT_FAILURE_THRESHOLD, WEBHOOK_CIRCUIT_MAX_DEFERRAL, record_failure
+from .outbox import relay_outbox
+from .retention import prune_outbox
+from .tasks import flush_pending_webhooks, send_webhook
+
+
+class StubReceiver(BaseHTTPRequestHandler):
+    """Local webhook receiver: fails paths containing 'fail', tracks concurrent requests."""
+    protocol_version = 'HTTP/1.1'
+    delay = 0.05
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    received = []
+
+    def do_POST(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(cls.delay)
+        with cls.lock:
+            cls.in_flight -= 1
+            cls.received.append((self.path, json.loads(body), self.headers.get(SIGNATURE_HEADER)))
+        status = 503 if 'fail' in self.path else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipUnless(httpx, "the async dispatcher requires httpx")
+class AsyncWebhookDispatcherTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubReceiver)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StubReceiver.in_flight = StubReceiver.max_in_flight = 0
+        StubReceiver.received = []
+
+    def make_dispatcher(self, **kwargs):
+        dispatcher = AsyncWebhookDispatcher(**kwargs)
+        self.addCleanup(dispatcher.close)
+        return dispatcher
+
+    def make_deliveries(self, endpoints, event_name='content_updated'):
+        payload = build_payload(event_name, {'content_instance_id': 'abc'})
+        deliveries = []
+        for endpoint in endpoints:
+            body, headers = encode_payload(endpoint, payload)
+            deliveries.append(Delivery(endpoint, event_name, payload, body, headers))
+        return deliveries
+
+    def test_delivers_signed_requests_and_bulk_writes_logs(self):
+        ok = WebhookEndpoint.objects.create(target_url=f"{self.base_url}/ok", secret='secret')
+        failing = WebhookEndpoint.objects.create(target_url=f"{self.base_url}/fail", secret='secret')
+
+        with self.assertNumQueries(1):
+            results = self.make_dispatcher().run(self.make_deliveries([ok, failing]))
+
+        outcomes = {delivery.endpoint.pk: result for delivery, result in results}
+        self.assertTrue(outcomes[ok.pk].success)
+        self.assertFalse(outcomes[failing.pk].success)
+        self.assertTrue(outcomes[failing.pk].retryable)
+        self.assertEqual(
+            dict(WebhookEventLog.objects.values_list('endpoint_id', 'status')),
+            {ok.pk: WebhookEventLog.STATUS_SUCCESS, failing.pk: WebhookEventLog.STATUS_FAILED}
+        )
+        path, body, signature = next(item for item in StubReceiver.received if item[0] == '/ok')
+        self.assertEqual(body['event'], 'content_updated')
+        expected = ok.generate_signature(json.dumps(body, sort_keys=True))
+        self.assertEqual(signature, f"sha256={expected}")
+
+    def test_per_host_limit(self):
+        endpoints = [
+            WebhookEndpoint.objects.create(target_url=f"{self.base_url}/ok/{i}", secret='secret', max_concurrency=10)
+            for i in range(12)
+        ]
+        results = self.make_dispatcher(per_host_limit=3).run(self.make_deliveries(endpoints))
+
+        self.assertTrue(all(result.success for __, result in results))
+        self.assertEqual(len(StubReceiver.received), 12)
+        self.assertLessEqual(StubReceiver.max_in_flight, 3)
+        self.assertGreater(StubReceiver.max_in_flight, 1)
+
+    def test_endpoint_max_concurrency(self):
+        endpoint = WebhookEndpoint.objects.create(target_url=f"{self.base_url}/ok", secret='secret', max_concurrency=1)
+        self.make_dispatcher().run(self.make_deliveries([endpoint] * 4))
+
+        self.assertEqual(len(StubReceiver.received), 4)
+        self.assertEqual(StubReceiver.max_in_flight, 1)
+
+    def test_connection_errors_are_logged(self):
+        endpoint = WebhookEndpoint.objects.create(target_url="http://127.0.0.1:9/hook", secret='secret')
+        [(__, result)] = self.make_dispatcher(timeout=2).run(self.make_deliveries([endpoint]))
+
+        self.assertFalse(result.success)
+        self.assertEqual(WebhookEventLog.objects.get().status, WebhookEventLog.STATUS_FAILED)
+
+    def test_submitted_events_are_in_flight_together(self):
+        StubReceiver.delay = 0.2
+        self.addCleanup(setattr, StubReceiver, 'delay', 0.05)
+        endpoints = [
+            WebhookEndpoint.objects.create(target_url=f"{self.base_url}/ok/{i}", secret='secret') for i in range(2)
+        ]
+        dispatcher = self.make_dispatcher()
+        completed = []
+        done = threading.Semaphore(0)
+
+        def on_complete(results):
+            completed.append(results)
+            done.release()
+        for endpoint in endpoints: # One event each: submitting doesn't wait for the receiver
+            dispatcher.submit(self.make_deliveries([endpoint]), on_complete)
+        self.assertEqual(completed, [])
+        for __ in endpoints:
+            self.assertTrue(done.acquire(timeout=5))
+
+        self.assertEqual(len(completed), 2)
+        self.assertTrue(all(result.success for results in completed for __, result in results))
+        self.assertEqual(StubReceiver.max_in_flight, 2)
+        client = dispatcher._client
+        dispatcher.run(self.make_deliveries(endpoints[:1]))
+        self.assertIs(dispatcher._client, client) # One client for the life of the dispatcher
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class WebhookTaskTestCase(TestCase):
+    """Caches in memory; HTTP requests are answered by `self.post` instead of being sent."""
+
+    def setUp(self):
+        cache.clear()
+        self.responses = []
+        self.sent = []
+        patcher = mock.patch('apps.webhooks.tasks.post', side_effect=self.fake_post)
+        self.post = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_post(self, endpoint, body, headers):
+        self.sent.append((endpoint, json.loads(body)))
+        status = self.responses.pop(0) if self.responses else 200
+        return make_result(status, {}, '')
+
+    def buffer(self, endpoint, count=1, **kwargs):
+        events = []
+        for i in range(count):
+            data = {'content_instance_id': str(i)}
+            outbox_event = WebhookOutboxEvent.objects.create(
+                event_type='content_updated', data=data, dispatched_at=timezone.now()
+            )
+            events.append(PendingWebhookEvent.objects.create(
+                endpoint=endpoint, event_type='content_updated', payload=build_payload('content_updated', data),
+                outbox_event_id=outbox_event.pk, deliver_after=timezone.now() - timedelta(seconds=1), **kwargs
+            ))
+        return events
+
+
+class FlushPendingWebhooksTests(WebhookTaskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('apps.webhooks.tasks.schedule_pending_flush')
+        self.schedule_pending_flush = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.endpoint = WebhookEndpoint.objects.create(
+            target_url='https://receiver.example/hook', secret='secret', batch_delivery=True, max_batch_size=10
+        )
+
+    def test_claims_events_before_sending(self):
+        events = self.buffer(self.endpoint, count=3)
+
+        def claimed_post(endpoint, body, headers):
+            # Hidden from concurrent flushes while the request is in flight
+            self.assertFalse(PendingWebhookEvent.objects.filter(deliver_after__lte=timezone.now()).exists())
+            return self.fake_post(endpoint, body, headers)
+        self.post.side_effect = claimed_post
+
+        flush_pending_webhooks.apply(args=[str(self.endpoint.pk)])
+
+        [(__, payload)] = self.sent
+        self.assertEqual(payload['event'], 'batch')
+        self.assertEqual(len(payload['events']), 3)
+        self.assertFalse(PendingWebhookEvent.objects.exists())
+        log = WebhookEventLog.objects.get()
+        self.assertEqual(log.status, WebhookEventLog.STATUS_SUCCESS)
+        self.assertIsNone(log.payload) # Compacted: the events are found through the outbox
+        self.assertEqual(
+            {event.data['content_instance_id'] for event in log.get_outbox_events()}, {'0', '1', '2'}
+        )
+        self.assertEqual(set(log.outbox_event_ids), {str(event.outbox_event_id) for event in events})
+
+    def test_retryable_failure_keeps_events(self):
+        self.buffer(self.endpoint, count=2)
+        self.responses = [503]
+
+        flush_pending_webhooks.apply(args=[str(self.endpoint.pk)])
+
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(PendingWebhookEvent.objects.count(), 2)
+        self.assertFalse(PendingWebhookEvent.objects.filter(deliver_after__lte=timezone.now()).exists())
+        self.schedule_pending_flush.assert_called()
+
+    def test_single_deliveries_are_queued_after_commit(self):
+        self.endpoint.batch_delivery = False
+        self.endpoint.save()
+        self.buffer(self.endpoint, count=2)
+
+        with mock.patch.object(send_webhook, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks() as callbacks:
+                flush_pending_webhooks.apply(args=[str(self.endpoint.pk)])
+                apply_async.assert_not_called()
+            self.assertFalse(PendingWebhookEvent.objects.exists())
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(apply_async.call_count, 2)
+        self.assertEqual(self.sent, [])
+
+    def test_coalesced_event_updated_while_sending_is_kept(self):
+        [event] = self.buffer(self.endpoint, coalesce_key='content_updated:1')
+
+        def concurrent_update(endpoint, body, headers):
+            PendingWebhookEvent.objects.filter(pk=event.pk).update(change_count=2)
+            return self.fake_post(endpoint, body, headers)
+        self.post.side_effect = concurrent_update
+
+        flush_pending_webhooks.apply(args=[str(self.endpoint.pk)])
+
+        kept = PendingWebhookEvent.objects.get()
+        self.assertEqual(kept.change_count, 2)
+        self.assertLessEqual(kept.deliver_after, timezone.now())
+
+
+class OutboxRelayTests(WebhookTaskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(send_webhook, 'apply_async')
+        self.send_webhook = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.endpoint = WebhookEndpoint.objects.create(
+            target_url='https://receiver.example/hook', secret='secret', subscribed_events=['*']
+        )
+
+    def record(self, count=1):
+        return [
+            WebhookOutboxEvent.objects.create(event_type='content_updated', data={'content_instance_id': str(i)})
+            for i in range(count)
+        ]
+
+    def test_deliveries_are_queued_after_commit(self):
+        events = self.record(2)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(relay_outbox(), 2)
+            self.send_webhook.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.send_webhook.call_count, 2)
+        self.assertEqual( # Referenced by the delivery logs
+            {call.args[1]['outbox_event_id'] for call in self.send_webhook.call_args_list},
+            {str(event.pk) for event in events}
+        )
+        self.assertFalse(WebhookOutboxEvent.objects.filter(dispatched_at__isnull=True).exists())
+
+    def test_rolled_back_relay_queues_nothing(self):
+        self.record()
+        with self.captureOnCommitCallbacks() as callbacks:
+            with mock.patch('apps.webhooks.outbox.timezone.now', side_effect=RuntimeError):
+                with self.assertRaises(RuntimeError):
+                    relay_outbox()
+
+        self.assertEqual(callbacks, [])
+        self.assertTrue(WebhookOutboxEvent.objects.filter(dispatched_at__isnull=True).exists())
+
+    def test_endpoints_are_loaded_once_per_batch(self):
+        def count_queries(events):
+            self.record(events)
+            with self.captureOnCommitCallbacks(), CaptureQueriesContext(connection) as queries:
+                relay_outbox()
+            return len(queries)
+
+        self.assertEqual(count_queries(1), count_queries(5))
+
+
+class CircuitBreakerTests(WebhookTaskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(send_webhook, 'apply_async')
+        self.requeue = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.endpoint = WebhookEndpoint.objects.create(
+            target_url='https://receiver.example/hook', secret='secret', subscribed_events=['*']
+        )
+
+    def send(self, deferred_since=None):
+        return send_webhook.apply(
+            args=['content_updated', {'content_instance_id': '1'}, str(self.endpoint.pk)],
+            kwargs={'deferred_since': deferred_since},
+        ).result
+
+    def open_circuit(self, opened_ago=0):
+        for __ in range(WEBHOOK_CIRCUIT_FAILURE_THRESHOLD):
+            record_failure(self.endpoint, 'HTTP 503')
+        WebhookEndpoint.objects.filter(pk=self.endpoint.pk).update(
+            circuit_opened_at=timezone.now() - timedelta(seconds=opened_ago)
+        )
+        self.endpoint.refresh_from_db()
+
+    def test_opens_after_consecutive_failures(self):
+        for __ in range(WEBHOOK_CIRCUIT_FAILURE_THRESHOLD - 1):
+            record_failure(self.endpoint, 'HTTP 503')
+        self.assertEqual(self.endpoint.circuit_state, WebhookEndpoint.CIRCUIT_CLOSED)
+        record_failure(self.endpoint, 'HTTP 503')
+        self.assertEqual(self.endpoint.circuit_state, WebhookEndpoint.CIRCUIT_OPEN)
+
+    def test_open_circuit_defers_delivery(self):
+        self.open_circuit()
+
+        self.assertEqual(self.send(), "Deferred: circuit open.")
+        self.assertEqual(self.sent, [])
+        deferred_since = self.requeue.call_args.kwargs['args'][-1]
+        self.assertIsNotNone(deferred_since)
+        self.send(deferred_since=deferred_since) # Still open: the first deferral time is kept
+        self.assertEqual(self.requeue.call_args.kwargs['args'][-1], deferred_since)
+
+    def test_deferral_is_capped(self):
+        self.open_circuit()
+        deferred_since = (timezone.now() - timedelta(seconds=WEBHOOK_CIRCUIT_MAX_DEFERRAL + 1)).isoformat()
+
+        self.assertEqual(self.send(deferred_since=deferred_since), "Failed: circuit open.")
+        self.requeue.assert_not_called()
+        self.assertEqual(self.sent, [])
+        log = WebhookEventLog.objects.get()
+        self.assertEqual(log.status, WebhookEventLog.STATUS_FAILED)
+        self.assertEqual(log.payload['data'], {'content_instance_id': '1'})
+
+    def test_successful_probe_closes_circuit(self):
+        self.open_circuit(opened_ago=WEBHOOK_CIRCUIT_COOLDOWN + 1)
+
+        self.assertEqual(self.send(), "Success: 200")
+        self.endpoint.refresh_from_db()
+        self.assertEqual(self.endpoint.circuit_state, WebhookEndpoint.CIRCUIT_CLOSED)
+        self.assertEqual(self.endpoint.consecutive_failures, 0)
+
+    def test_failed_probe_reopens_circuit(self):
+        self.open_circuit(opened_ago=WEBHOOK_CIRCUIT_COOLDOWN + 1)
+        self.responses = [503]
+
+        self.send()
+        self.endpoint.refresh_from_db()
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.endpoint.circuit_state, WebhookEndpoint.CIRCUIT_OPEN)
+        self.assertGreater(self.endpoint.circuit_opened_at, timezone.now() - timedelta(seconds=5))
+
+    def test_batch_deferral_is_capped(self):
+        self.endpoint.batch_delivery = True
+        self.endpoint.save()
+        self.buffer(self.endpoint, count=2)
+        self.open_circuit()
+        deferred_since = (timezone.now() - timedelta(seconds=WEBHOOK_CIRCUIT_MAX_DEFERRAL + 1)).isoformat()
+
+        result = flush_pending_webhooks.apply(args=[str(self.endpoint.pk), deferred_since]).result
+
+        self.assertEqual(result, "Failed: circuit open (2 events dropped)")
+        self.assertFalse(PendingWebhookEvent.objects.exists())
+        self.assertEqual(WebhookEventLog.objects.get().status, WebhookEventLog.STATUS_FAILED)
+
+
+class RetentionTests(TestCase):
+
+    def test_outbox_events_are_kept_as_long_as_successful_logs(self):
+        now = timezone.now()
+        kept, pruned = (
+            WebhookOutboxEvent.objects.create(
+                event_type='content_updated', data={}, created_at=now - timedelta(days=days), dispatched_at=now
+            )
+            for days in (10, 31)
+        )
+
+        self.assertEqual(prune_outbox(), 1)
+        self.assertTrue(WebhookOutboxEvent.objects.filter(pk=kept.pk).exists())
+        self.assertFalse(WebhookOutboxEvent.objects.filter(pk=pruned.pk).exists())
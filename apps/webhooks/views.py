@@ -1,8 +1,12 @@
 from rest_framework import viewsets, permissions, mixins
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from django.utils import timezone
 
+from apps.core.pagination import OptionalKeysetPagination
 from .models import WebhookEndpoint, WebhookEventLog
 from .api import WebhookEndpointSerializer, WebhookEventLogSerializer
+from .health import reset_circuit
 
 class WebhookEndpointViewSet(viewsets.ModelViewSet):
     """
@@ -21,6 +25,14 @@ class WebhookEndpointViewSet(viewsets.ModelViewSet):
 
     # perform_create is handled by the serializer default setting created_by
 
+    @action(detail=True, methods=['post'], url_path='reset-circuit')
+    def reset_circuit(self, request, pk=None):
+        """Closes the endpoint's circuit, so deferred deliveries go out on their next attempt."""
+        endpoint = self.get_object()
+        reset_circuit(endpoint)
+        endpoint.refresh_from_db()
+        return Response(self.get_serializer(endpoint).data)
+
 
 class WebhookEventLogViewSet(mixins.ListModelMixin,
                              mixins.RetrieveModelMixin,
@@ -32,12 +44,12 @@ class WebhookEventLogViewSet(mixins.ListModelMixin,
     queryset = WebhookEventLog.objects.all().select_related('endpoint').order_by('-timestamp')
     serializer_class = WebhookEventLogSerializer
     permission_classes = [permissions.IsAdminUser] # Only admins can view logs by default
+    pagination_class = OptionalKeysetPagination # ?pagination=cursor for keyset pages
+    keyset_ordering = ('-timestamp', '-id')
 
-    # Add filtering capabilities (e.g., by endpoint, status, event_type, date range)
-    # filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    # filterset_fields = ['endpoint', 'status', 'event_type']
-    # ordering_fields = ['timestamp', 'status', 'event_type']
-    # ordering = ['-timestamp']
+    # Endpoint and status filters are served by the (endpoint|status, timestamp) indexes
+    filterset_fields = ['endpoint', 'status', 'event_type']
+    ordering_fields = ['timestamp']
 
 # Placeholder for the view/task that actually triggers webhooks
 # This would likely involve:
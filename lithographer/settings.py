@@ -199,8 +199,9 @@ LOGOUT_REDIRECT_URL = '/' # Where to redirect after logout
 # https://www.django-rest-framework.org/api-guide/settings/
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        # Order matters: JWT first for frontend API, then Token for CMS API keys, then Session for Admin/Browsable API
+        # Order matters: JWT first for frontend API, then CMS API keys (ApiKey) and DRF tokens, then Session for Admin/Browsable API
         'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.APIKeyAuthentication',
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
@@ -209,6 +210,10 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
         # More specific permissions should be set per-viewset
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        # Generation of new on-demand image renditions per user / anonymous IP (stored renditions are not limited)
+        'media_render': env('MEDIA_RENDITION_RENDER_RATE', default='60/minute'),
+    },
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20, # Default page size for pagination
     'DEFAULT_FILTER_BACKENDS': [
@@ -239,7 +244,26 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE # Use Django's timezone
 CELERY_TASK_TRACK_STARTED = True
+CELERY_TASK_ROUTES = {
+    'apps.webhooks.tasks.dispatch_webhooks_async': {'queue': 'webhooks_async'}, # Dedicated asyncio dispatcher worker
+}
 # CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler' # If using scheduled tasks
+# Periodic tasks, run by `celery -A lithographer beat` (schedules in seconds)
+CELERY_BEAT_SCHEDULE = {
+    'cleanup-media-upload-sessions': {
+        'task': 'apps.media.tasks.cleanup_media_upload_sessions',
+        'schedule': 60 * 60,
+    },
+    # Safety net: relays outbox events whose post-commit relay was lost (e.g. broker down)
+    'relay-webhook-outbox': {
+        'task': 'apps.webhooks.tasks.relay_webhook_outbox',
+        'schedule': 60,
+    },
+    'prune-webhook-logs': {
+        'task': 'apps.webhooks.tasks.prune_webhook_logs',
+        'schedule': 24 * 60 * 60,
+    },
+}
 
 # Caching (Using Redis)
 # https://docs.djangoproject.com/en/5.2/topics/cache/
@@ -247,12 +271,80 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
         "LOCATION": env('REDIS_URL', default='redis://localhost:6379/0'), # Use DB 0 for cache
-        "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
-        }
+        # Note: CLIENT_CLASS is a django-redis option and is rejected by Django's built-in backend
     }
 }
 
+# Seconds a cached content delivery response may be served (see apps.content.cache).
+# Responses are invalidated by dependency tags on change, this is only an upper bound.
+CONTENT_RESPONSE_CACHE_TIMEOUT = env.int('CONTENT_RESPONSE_CACHE_TIMEOUT', default=60 * 15)
+# Seconds compiled per-user role permissions stay in the shared cache (see apps.users.permissions).
+# They are invalidated when roles or role assignments change; this is only an upper bound.
+PERMISSIONS_CACHE_TIMEOUT = env.int('PERMISSIONS_CACHE_TIMEOUT', default=60 * 60)
+# Seconds a resolved API key is cached, and between runs of the task writing recorded key
+# last_used_at values (see apps.users.authentication)
+API_KEY_CACHE_TIMEOUT = env.int('API_KEY_CACHE_TIMEOUT', default=5 * 60)
+API_KEY_USAGE_FLUSH_INTERVAL = env.int('API_KEY_USAGE_FLUSH_INTERVAL', default=60)
+CELERY_BEAT_SCHEDULE['flush-api-key-usage'] = {
+    'task': 'apps.users.tasks.flush_api_key_usage',
+    'schedule': API_KEY_USAGE_FLUSH_INTERVAL,
+}
+
+# Records inserted per batch (and per grouped webhook event) by POST /content-instances/bulk/
+CONTENT_BULK_BATCH_SIZE = env.int('CONTENT_BULK_BATCH_SIZE', default=1000)
+# Rows fetched per server-side cursor round trip by the NDJSON content export
+CONTENT_EXPORT_CHUNK_SIZE = env.int('CONTENT_EXPORT_CHUNK_SIZE', default=2000)
+# Content versions per full snapshot; versions in between are stored as patches against the previous one
+CONTENT_VERSION_KEYFRAME_INTERVAL = env.int('CONTENT_VERSION_KEYFRAME_INTERVAL', default=20)
+# Seconds a computed version diff is cached (versions are immutable)
+CONTENT_VERSION_DIFF_CACHE_TIMEOUT = env.int('CONTENT_VERSION_DIFF_CACHE_TIMEOUT', default=60 * 60 * 24)
+# Differing tokens above which a rich text value is shown replaced instead of diffed word by word
+CONTENT_VERSION_DIFF_MAX_TOKENS = env.int('CONTENT_VERSION_DIFF_MAX_TOKENS', default=2000)
+
+# On-demand image renditions (GET /media/assets/<id>/render/, see apps.media.renditions)
+MEDIA_RENDITION_MAX_DIMENSION = env.int('MEDIA_RENDITION_MAX_DIMENSION', default=4096)
+# Total size of stored renditions before least-recently-used ones are evicted
+MEDIA_RENDITION_CACHE_MAX_BYTES = env.int('MEDIA_RENDITION_CACHE_MAX_BYTES', default=5 * 1024 ** 3)
+# Cache-Control max-age of rendition responses (URLs are content-addressed via ETag)
+MEDIA_RENDITION_MAX_AGE = env.int('MEDIA_RENDITION_MAX_AGE', default=60 * 60 * 24 * 365)
+
+# Resumable chunked uploads (POST /media/uploads/, see apps.media.uploads)
+MEDIA_UPLOAD_CHUNK_SIZE = env.int('MEDIA_UPLOAD_CHUNK_SIZE', default=8 * 1024 * 1024) # Default per session
+MEDIA_UPLOAD_MAX_CHUNK_SIZE = env.int('MEDIA_UPLOAD_MAX_CHUNK_SIZE', default=64 * 1024 * 1024)
+# Seconds an upload session may stay open (expired ones are removed by cleanup_media_upload_sessions)
+MEDIA_UPLOAD_SESSION_TTL = env.int('MEDIA_UPLOAD_SESSION_TTL', default=60 * 60 * 24)
+
+# Webhook delivery (see apps.webhooks.delivery)
+WEBHOOK_TIMEOUT = env.int('WEBHOOK_TIMEOUT', default=10) # Seconds per request
+# Keep-alive connections pooled per target host and worker process
+WEBHOOK_POOL_MAXSIZE = env.int('WEBHOOK_POOL_MAXSIZE', default=10)
+# Seconds events are buffered for endpoints using batch delivery
+WEBHOOK_BATCH_WINDOW = env.int('WEBHOOK_BATCH_WINDOW', default=5)
+# Outbox events relayed to delivery per transaction (see apps.webhooks.outbox)
+WEBHOOK_OUTBOX_BATCH_SIZE = env.int('WEBHOOK_OUTBOX_BATCH_SIZE', default=500)
+# 'celery' (one blocking task per delivery) or 'async' (asyncio dispatcher, requires httpx).
+# In async mode run a dedicated worker: celery -A lithographer worker -Q webhooks_async
+WEBHOOK_DISPATCH_MODE = env('WEBHOOK_DISPATCH_MODE', default='celery')
+WEBHOOK_ASYNC_MAX_IN_FLIGHT = env.int('WEBHOOK_ASYNC_MAX_IN_FLIGHT', default=1000) # Per dispatcher process
+WEBHOOK_ASYNC_PER_HOST_LIMIT = env.int('WEBHOOK_ASYNC_PER_HOST_LIMIT', default=20)
+# Retries of failed deliveries, with exponential backoff and jitter (see apps.webhooks.health)
+WEBHOOK_MAX_RETRIES = env.int('WEBHOOK_MAX_RETRIES', default=5)
+WEBHOOK_RETRY_BASE_DELAY = env.int('WEBHOOK_RETRY_BASE_DELAY', default=10) # Seconds, doubled per retry
+WEBHOOK_RETRY_MAX_DELAY = env.int('WEBHOOK_RETRY_MAX_DELAY', default=60 * 60)
+# Consecutive failures that open an endpoint's circuit, and seconds before it is probed again
+WEBHOOK_CIRCUIT_FAILURE_THRESHOLD = env.int('WEBHOOK_CIRCUIT_FAILURE_THRESHOLD', default=5)
+WEBHOOK_CIRCUIT_COOLDOWN = env.int('WEBHOOK_CIRCUIT_COOLDOWN', default=5 * 60)
+# Seconds a delivery is held back by an open circuit before it is logged as failed and dropped
+WEBHOOK_CIRCUIT_MAX_DEFERRAL = env.int('WEBHOOK_CIRCUIT_MAX_DEFERRAL', default=24 * 60 * 60)
+# Retention of delivery history (see apps.webhooks.retention, manage.py prune_webhook_logs).
+# Successful attempts are logged without their payload, referencing their outbox events, unless
+# WEBHOOK_LOG_COMPACT_SUCCESS is off; outbox events are then kept as long as successful logs.
+WEBHOOK_LOG_COMPACT_SUCCESS = env.bool('WEBHOOK_LOG_COMPACT_SUCCESS', default=True)
+WEBHOOK_LOG_RETENTION_DAYS = env.int('WEBHOOK_LOG_RETENTION_DAYS', default=30)
+WEBHOOK_FAILED_LOG_RETENTION_DAYS = env.int('WEBHOOK_FAILED_LOG_RETENTION_DAYS', default=90)
+WEBHOOK_OUTBOX_RETENTION_DAYS = env.int('WEBHOOK_OUTBOX_RETENTION_DAYS', default=7) # Minimum replayable window
+WEBHOOK_PRUNE_BATCH_SIZE = env.int('WEBHOOK_PRUNE_BATCH_SIZE', default=5000) # Rows deleted per transaction
+
 # Email Settings
 # https://docs.djangoproject.com/en/5.2/topics/email/
 EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
@@ -31,7 +31,9 @@ from apps.users.views import RoleViewSet, CMSUserViewSet, APIKeyViewSet
 from apps.frontend_users.views import UserRegistrationView, UserProfileView #, password_reset_request, password_reset_confirm
 from apps.webhooks.views import WebhookEndpointViewSet, WebhookEventLogViewSet
 # Import media viewsets
-from apps.media.views import FolderViewSet, MediaTagViewSet, MediaAssetViewSet, ImageOptimizationProfileViewSet
+from apps.media.views import (
+    FolderViewSet, MediaTagViewSet, MediaAssetViewSet, ImageOptimizationProfileViewSet, MediaUploadViewSet
+)
 # Import JWT views
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -70,6 +72,7 @@ router.register(r'media/folders', FolderViewSet)
 router.register(r'media/tags', MediaTagViewSet, basename='mediatag') # Use basename as lookup is slug
 router.register(r'media/assets', MediaAssetViewSet)
 router.register(r'media/optimization-profiles', ImageOptimizationProfileViewSet)
+router.register(r'media/uploads', MediaUploadViewSet, basename='mediaupload') # Resumable chunked uploads
 # Register component viewsets
 router.register(r'component-definitions', ComponentDefinitionViewSet, basename='componentdefinition') # Use basename as lookup is api_id
 
@@ -78,12 +81,18 @@ router.register(r'component-definitions', ComponentDefinitionViewSet, basename='
 # This pattern allows /taxonomies/{taxonomy_api_id}/terms/
 taxonomy_terms_list = TermViewSet.as_view({'get': 'list', 'post': 'create'})
 taxonomy_terms_detail = TermViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'})
+taxonomy_terms_tree = TermViewSet.as_view({'get': 'tree'})
+taxonomy_terms_descendants = TermViewSet.as_view({'get': 'descendants'})
+taxonomy_terms_ancestors = TermViewSet.as_view({'get': 'ancestors'})
 
 
 urlpatterns = [
     # Add nested term routes BEFORE the main router include
     path('api/v1/taxonomies/<str:taxonomy_api_id>/terms/', taxonomy_terms_list, name='taxonomy-terms-list'),
+    path('api/v1/taxonomies/<str:taxonomy_api_id>/terms/tree/', taxonomy_terms_tree, name='taxonomy-terms-tree'),
     path('api/v1/taxonomies/<str:taxonomy_api_id>/terms/<uuid:pk>/', taxonomy_terms_detail, name='taxonomy-terms-detail'),
+    path('api/v1/taxonomies/<str:taxonomy_api_id>/terms/<uuid:pk>/descendants/', taxonomy_terms_descendants, name='taxonomy-terms-descendants'),
+    path('api/v1/taxonomies/<str:taxonomy_api_id>/terms/<uuid:pk>/ancestors/', taxonomy_terms_ancestors, name='taxonomy-terms-ancestors'),
     # Nested comment routes
     path('api/v1/content-instances/<uuid:instance_pk>/comments/', CommentCreateView.as_view(), name='comment-create'), # POST only
     # path('api/v1/content-instances/<uuid:instance_pk>/comments/', CommentListView.as_view(), name='comment-list'), # GET only - Use query param on instance detail instead?